@@ -1,2 +1,2 @@
-__all__ = ["quantum_risk_engine", "secure_channel", "tools"]
+__all__ = ["quantum_risk_engine", "secure_channel", "tools", "inventory", "metrics", "profiling", "keyfactory"]
 __version__ = "0.1.0"
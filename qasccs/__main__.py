@@ -5,9 +5,30 @@ def main():
     if len(sys.argv) >= 2 and sys.argv[1] == "risk":
         sys.argv = [sys.argv[0]] + sys.argv[2:]
         risk_main()
+    elif len(sys.argv) >= 2 and sys.argv[1] == "scan":
+        from qasccs.inventory.scanner import main as scan_main
+        sys.argv = [sys.argv[0]] + sys.argv[2:]
+        scan_main()
+    elif len(sys.argv) >= 2 and sys.argv[1] == "probe":
+        from qasccs.inventory.prober import main as probe_main
+        sys.argv = [sys.argv[0]] + sys.argv[2:]
+        probe_main()
+    elif len(sys.argv) >= 2 and sys.argv[1] == "plan":
+        from qasccs.inventory.planner import main as plan_main
+        sys.argv = [sys.argv[0]] + sys.argv[2:]
+        plan_main()
+    elif len(sys.argv) >= 2 and sys.argv[1] == "report":
+        from qasccs.inventory.report import main as report_main
+        sys.argv = [sys.argv[0]] + sys.argv[2:]
+        report_main()
     else:
         print("Usage:")
         print("  python -m qasccs risk --algorithm ECC-P256 --data-lifetime-years 10 --data-classification high")
+        print("  python -m qasccs risk query --db fleet.db --risk HIGH --algorithm ECC --expires-before 2035")
+        print("  python -m qasccs scan /etc/ssl/certs --data-lifetime-years 10")
+        print("  python -m qasccs probe example.com:443 --data-lifetime-years 10")
+        print("  python -m qasccs plan /etc/ssl/certs --data-lifetime-years 10 --before 2035")
+        print("  python -m qasccs scan /etc/ssl/certs --data-lifetime-years 10 | python -m qasccs report --format json")
 
 if __name__ == "__main__":
     main()
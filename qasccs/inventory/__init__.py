@@ -0,0 +1,9 @@
+from .scanner import InventoryItem, scan, scan_file, evaluate_inventory, algorithm_for_key
+from .cache import ParseCache
+from .prober import Prober, ProbeResult, evaluate_probe
+from .planner import MigrationPlan, MigrationTask
+from .report import FleetReport
+
+__all__ = ["InventoryItem", "scan", "scan_file", "evaluate_inventory", "algorithm_for_key", "ParseCache",
+           "Prober", "ProbeResult", "evaluate_probe",
+           "MigrationPlan", "MigrationTask", "FleetReport"]
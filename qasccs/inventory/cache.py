@@ -0,0 +1,226 @@
+"""
+Content-addressed parse cache for the inventory scanner.
+
+Parsed items are stored per SHA-256 of the file content; a second table maps
+(path, mtime_ns, size) to that hash. A rescan of an unchanged store therefore
+costs one `stat` and one indexed lookup per file. A touched-but-identical file
+costs a hash, never a reparse. Hashing and parsing run in the worker pool, so a
+cold scan is as parallel as an uncached one. Entries are evicted
+least-recently-used once the cache exceeds `max_entries` or `max_bytes` of stored
+payload.
+"""
+from __future__ import annotations
+import dataclasses, hashlib, json, os, sqlite3, time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Iterable, Iterator, Optional
+
+from qasccs import metrics
+from .scanner import EXTENSIONS, InventoryItem, iter_files, scan_file
+
+CACHE_HITS = metrics.counter("qasccs_cache_hits_total", "Cache hits, by cache and kind")
+CACHE_MISSES = metrics.counter("qasccs_cache_misses_total", "Cache misses, by cache")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash      TEXT PRIMARY KEY,
+    items     TEXT NOT NULL,
+    nbytes    INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blobs_last_used ON blobs(last_used);
+CREATE TABLE IF NOT EXISTS files (
+    path     TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size     INTEGER NOT NULL,
+    hash     TEXT NOT NULL
+);
+"""
+
+def _digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class ParseCache:
+    def __init__(self, path: str | os.PathLike, max_entries: Optional[int] = None,
+                 max_bytes: Optional[int] = None, commit_every: int = 1000):
+        self.path = os.fspath(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.commit_every = commit_every
+        self.hits = 0
+        self.misses = 0
+        self._dirty = 0
+        self._db = sqlite3.connect(self.path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+
+    def _touch(self, h: str):
+        self._db.execute("UPDATE blobs SET last_used = ? WHERE hash = ?", (time.time(), h))
+        self._bump()
+
+    def _bump(self):
+        self._dirty += 1
+        if self._dirty >= self.commit_every:
+            self.flush()
+
+    def _load(self, path: str, h: str) -> Optional[list[InventoryItem]]:
+        row = self._db.execute("SELECT items FROM blobs WHERE hash = ?", (h,)).fetchone()
+        if row is None:
+            return None
+        self._touch(h)
+        return [InventoryItem.from_dict({**d, "path": path}) for d in json.loads(row[0])]
+
+    def lookup(self, path: str, st: os.stat_result) -> tuple[Optional[list[InventoryItem]], Optional[str]]:
+        """Return (items, content hash). Items is None on a miss; the hash is then
+        the key to `store` the parse under."""
+        hit = self._lookup_stat(path, st)
+        if hit is not None:
+            return hit
+        h = _digest(path)
+        return self._lookup_content(path, st, h), h
+
+    def _lookup_stat(self, path: str, st: os.stat_result) -> Optional[tuple[list[InventoryItem], str]]:
+        row = self._db.execute("SELECT mtime_ns, size, hash FROM files WHERE path = ?", (path,)).fetchone()
+        if row is not None and row[0] == st.st_mtime_ns and row[1] == st.st_size:
+            items = self._load(path, row[2])
+            if items is not None:
+                self.hits += 1
+                CACHE_HITS.inc(cache="inventory", kind="stat")
+                return items, row[2]
+        return None
+
+    def _lookup_content(self, path: str, st: os.stat_result, h: str) -> Optional[list[InventoryItem]]:
+        items = self._load(path, h)
+        if items is not None:
+            self._remember(path, st, h)
+            self.hits += 1
+            CACHE_HITS.inc(cache="inventory", kind="content")
+            return items
+        self.misses += 1
+        CACHE_MISSES.inc(cache="inventory")
+        return None
+
+    def _remember(self, path: str, st: os.stat_result, h: str):
+        self._db.execute("INSERT OR REPLACE INTO files(path, mtime_ns, size, hash) VALUES (?, ?, ?, ?)",
+                         (path, st.st_mtime_ns, st.st_size, h))
+        self._bump()
+
+    def store(self, path: str, st: os.stat_result, h: str, items: list[InventoryItem]):
+        # Errors (e.g. unreadable file) are not cached so they are retried next scan.
+        if any(i.error for i in items):
+            return
+        payload = json.dumps([{k: v for k, v in i.to_dict().items() if k != "path"} for i in items])
+        self._db.execute("INSERT OR REPLACE INTO blobs(hash, items, nbytes, last_used) VALUES (?, ?, ?, ?)",
+                         (h, payload, len(payload), time.time()))
+        self._remember(path, st, h)
+
+    def evict(self):
+        """Drop least-recently-used blobs beyond the configured bounds."""
+        before = self._db.total_changes
+        if self.max_entries is not None:
+            self._db.execute(
+                "DELETE FROM blobs WHERE hash IN (SELECT hash FROM blobs ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,))
+        if self.max_bytes is not None:
+            total = self._db.execute("SELECT COALESCE(SUM(nbytes), 0) FROM blobs").fetchone()[0]
+            if total > self.max_bytes:
+                doomed = []
+                for h, n in self._db.execute("SELECT hash, nbytes FROM blobs ORDER BY last_used ASC"):
+                    if total <= self.max_bytes:
+                        break
+                    doomed.append((h,))
+                    total -= n
+                self._db.executemany("DELETE FROM blobs WHERE hash = ?", doomed)
+        if self._db.total_changes > before:
+            self._db.execute("DELETE FROM files WHERE hash NOT IN (SELECT hash FROM blobs)")
+
+    def flush(self):
+        self._db.commit()
+        self._dirty = 0
+
+    def close(self):
+        self.evict()
+        self.flush()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+
+    def scan(self, roots: Iterable[str | os.PathLike], workers: Optional[int] = None,
+             processes: bool = False, extensions=EXTENSIONS) -> Iterator[InventoryItem]:
+        """Serve unchanged files from the cache; hash and parse the rest in the pool.
+
+        Stat hits are yielded during the walk. A stat miss is hashed in the pool, and
+        only a content miss is then parsed there (once per content, however many copies
+        are in flight); results are yielded in completion order with at most
+        `4 * workers` files in flight. The database is only touched from the calling thread.
+        """
+        workers = workers or min(32, (os.cpu_count() or 1) + 4)
+        pool_cls = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        window = 4 * workers
+        with pool_cls(max_workers=workers) as pool:
+            pending: dict = {}      # future -> (stage, path, stat, hash)
+            parsing: dict[str, list] = {}   # hash being parsed -> other (path, stat) with that content
+
+            def finish(fut) -> list[InventoryItem]:
+                stage, path, st, h = pending.pop(fut)
+                if stage == "parse":
+                    items = fut.result()
+                    if st is not None:
+                        self.store(path, st, h, items)
+                    for other, ost in parsing.pop(h, ()):
+                        items += [dataclasses.replace(i, path=other) for i in items if i.path == path]
+                        if not any(i.error for i in items):
+                            self._remember(other, ost, h)
+                            self.hits += 1
+                            CACHE_HITS.inc(cache="inventory", kind="content")
+                        else:
+                            self.misses += 1
+                            CACHE_MISSES.inc(cache="inventory")
+                    return items
+                try:
+                    h = fut.result()
+                except OSError:
+                    st = None       # vanished or unreadable: let scan_file report it
+                else:
+                    if h in parsing:
+                        parsing[h].append((path, st))
+                        return []
+                    items = self._lookup_content(path, st, h)
+                    if items is not None:
+                        return items
+                    parsing[h] = []
+                pending[pool.submit(scan_file, path)] = ("parse", path, st, h)
+                return []
+
+            for path in iter_files(roots, extensions):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    pending[pool.submit(scan_file, path)] = ("parse", path, None, None)
+                else:
+                    hit = self._lookup_stat(path, st)
+                    if hit is not None:
+                        yield from hit[0]
+                        continue
+                    pending[pool.submit(_digest, path)] = ("hash", path, st, None)
+                while len(pending) >= window:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        yield from finish(fut)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    yield from finish(fut)
+        self.evict()
+        self.flush()
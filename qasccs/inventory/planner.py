@@ -0,0 +1,151 @@
+"""
+Migration planner: certificate expiry vs. quantum-safe year.
+
+For each assessed asset the migration deadline is the earlier of its certificate's
+expiry year and `RiskResponse.quantum_safe_until_year`. When the certificate expires
+first the migration can ride along with the renewal ("renewal"); otherwise the asset
+must be migrated before it would naturally rotate ("quantum").
+
+`MigrationPlan` keeps tasks in a list sorted by deadline with a parallel key array,
+so "what must migrate before year X" is a `bisect` (O(log n)) plus the k results.
+"""
+from __future__ import annotations
+import argparse, bisect, json, sys
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Optional
+
+from qasccs.quantum_risk_engine.models import RiskResponse
+from qasccs.quantum_risk_engine.policy import EvaluationContext
+from .scanner import InventoryItem, evaluate_inventory, scan
+
+@dataclass(frozen=True)
+class MigrationTask:
+    deadline_year: int
+    driver: str                     # renewal | quantum
+    path: str
+    index: int
+    kind: str
+    algorithm: str
+    risk: str
+    recommended_mode: str
+    quantum_safe_until_year: int
+    not_after: Optional[datetime]
+
+    def to_dict(self) -> dict:
+        d = {k: getattr(self, k) for k in self.__dataclass_fields__}
+        d["not_after"] = self.not_after.isoformat() if self.not_after else None
+        return d
+
+def plan_task(item: InventoryItem, resp: RiskResponse) -> MigrationTask:
+    safe = resp.quantum_safe_until_year
+    expiry = item.not_after.year if item.not_after is not None else None
+    if expiry is not None and expiry <= safe:
+        deadline, driver = expiry, "renewal"
+    else:
+        deadline, driver = safe, "quantum"
+    return MigrationTask(deadline, driver, item.path, item.index, item.kind, item.algorithm,
+                         resp.risk, resp.recommended_mode, safe, item.not_after)
+
+class MigrationPlan:
+    def __init__(self, tasks: Iterable[MigrationTask] = ()):
+        self._tasks = sorted(tasks, key=lambda t: t.deadline_year)
+        self._years = [t.deadline_year for t in self._tasks]
+        self.unassessed = 0
+
+    @classmethod
+    def from_assessments(cls, pairs: Iterable[tuple[InventoryItem, Optional[RiskResponse]]]) -> "MigrationPlan":
+        tasks = []
+        unassessed = 0
+        for item, resp in pairs:
+            if resp is None:
+                unassessed += 1
+            else:
+                tasks.append(plan_task(item, resp))
+        plan = cls(tasks)
+        plan.unassessed = unassessed
+        return plan
+
+    def add(self, task: MigrationTask):
+        i = bisect.bisect_right(self._years, task.deadline_year)
+        self._years.insert(i, task.deadline_year)
+        self._tasks.insert(i, task)
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def __iter__(self):
+        return iter(self._tasks)
+
+    def count_due_before(self, year: int) -> int:
+        return bisect.bisect_left(self._years, year)
+
+    def due_before(self, year: int) -> list[MigrationTask]:
+        """Tasks whose deadline is strictly before `year`, earliest first."""
+        return self._tasks[:bisect.bisect_left(self._years, year)]
+
+    def due_between(self, start: int, end: int) -> list[MigrationTask]:
+        """Tasks with `start <= deadline < end`."""
+        return self._tasks[bisect.bisect_left(self._years, start):bisect.bisect_left(self._years, end)]
+
+    def earliest(self) -> Optional[MigrationTask]:
+        return self._tasks[0] if self._tasks else None
+
+    def workload_by_year(self) -> dict[int, int]:
+        out: dict[int, int] = {}
+        for y in self._years:
+            out[y] = out.get(y, 0) + 1
+        return out
+
+    def workload_by_year_and_driver(self) -> dict[int, dict[str, int]]:
+        out: dict[int, Counter] = {}
+        for t in self._tasks:
+            out.setdefault(t.deadline_year, Counter())[t.driver] += 1
+        return {y: dict(c) for y, c in out.items()}
+
+    def summary(self, before: Optional[int] = None) -> dict:
+        first = self.earliest()
+        d = {
+            "assets": len(self) + self.unassessed,
+            "planned": len(self),
+            "unassessed": self.unassessed,
+            "earliest_deadline": first.deadline_year if first else None,
+            "workload_by_year": self.workload_by_year_and_driver(),
+        }
+        if before is not None:
+            d["due_before"] = before
+            d["schedule"] = [t.to_dict() for t in self.due_before(before)]
+        else:
+            d["schedule"] = [t.to_dict() for t in self._tasks]
+        return d
+
+def main():
+    ap = argparse.ArgumentParser(description="QASCS migration planner (cert expiry vs quantum-safe year)")
+    ap.add_argument("paths", nargs="+", help="Certificate/key files or directories")
+    ap.add_argument("--data-lifetime-years", type=int, required=True)
+    ap.add_argument("--data-classification", default="medium", choices=["low","medium","high","critical"])
+    ap.add_argument("--scenario", default="moderate", choices=["conservative","moderate","aggressive"])
+    ap.add_argument("--as-of-year", type=int, default=None, help="Evaluate as of this year instead of the current one.")
+    ap.add_argument("--before", type=int, default=None, help="Only list tasks due before this year.")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--cache", default=None, help="Persistent parse cache (SQLite file).")
+    args = ap.parse_args()
+
+    cache = None
+    if args.cache:
+        from .cache import ParseCache
+        cache = ParseCache(args.cache)
+    try:
+        pairs = evaluate_inventory(scan(args.paths, args.workers, cache=cache), args.data_lifetime_years,
+                                   args.data_classification, args.scenario,
+                                   EvaluationContext.create(reference_year=args.as_of_year))
+        plan = MigrationPlan.from_assessments(pairs)
+    finally:
+        if cache is not None:
+            cache.close()
+    json.dump(plan.summary(args.before), sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+Live TLS endpoint prober.
+
+Connects to many host:port targets concurrently (bounded by a semaphore, each
+with a timeout), records the negotiated protocol, cipher, key exchange and the
+peer certificate's key type, and maps them to `RiskRequest`s for `evaluate_risk`.
+
+Duplicate targets are collapsed, concurrent probes of the same endpoint share
+one connection attempt, and results are cached per endpoint for `cache_ttl` seconds.
+"""
+from __future__ import annotations
+import argparse, asyncio, ipaddress, json, ssl, sys, time
+from dataclasses import dataclass, field, asdict
+from typing import Iterable, Optional
+
+from cryptography import x509
+
+from qasccs import metrics
+from qasccs.quantum_risk_engine.models import RiskRequest, RiskResponse
+from qasccs.quantum_risk_engine.policy import EvaluationContext, evaluate_risk
+from .scanner import certificate_item
+
+CACHE_HITS = metrics.counter("qasccs_cache_hits_total", "Cache hits, by cache and kind")
+CACHE_MISSES = metrics.counter("qasccs_cache_misses_total", "Cache misses, by cache")
+PROBES = metrics.counter("qasccs_probes_total", "TLS endpoint probes, by outcome")
+
+DEFAULT_PORT = 443
+
+@dataclass
+class ProbeResult:
+    host: str
+    port: int
+    ok: bool = False
+    error: Optional[str] = None
+    elapsed: float = 0.0
+    protocol: Optional[str] = None
+    cipher: Optional[str] = None
+    cipher_bits: Optional[int] = None
+    key_exchange: Optional[str] = None      # group when the runtime exposes it, else ECDHE/DHE/RSA
+    cert_key_type: Optional[str] = None
+    cert_key_size: Optional[int] = None
+    cert_algorithm: Optional[str] = None    # `Algorithm` literal
+    subject: Optional[str] = None
+    not_after: Optional[str] = None
+    sans: list[str] = field(default_factory=list)
+
+    @property
+    def target(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    def to_dict(self) -> dict:
+        return {"target": self.target, **asdict(self)}
+
+    def risk_requests(self, data_lifetime_years: int, data_classification: str = "medium",
+                      scenario: str = "moderate") -> dict[str, RiskRequest]:
+        """One `RiskRequest` per modeled component: certificate key, key exchange, bulk cipher."""
+        algs = {
+            "certificate": self.cert_algorithm,
+            "key_exchange": _kx_algorithm(self.key_exchange, self.cert_algorithm),
+            "cipher": _cipher_algorithm(self.cipher),
+        }
+        return {
+            component: RiskRequest(algorithm=alg, data_lifetime_years=data_lifetime_years,
+                                   data_classification=data_classification, scenario=scenario)
+            for component, alg in algs.items() if alg is not None
+        }
+
+def _kx_algorithm(kx: Optional[str], cert_alg: Optional[str]) -> Optional[str]:
+    if kx is None:
+        return None
+    k = kx.lower()
+    if "kyber" in k or "mlkem" in k:
+        return "HYBRID-ECDHE+KYBER"
+    if k == "rsa":
+        return cert_alg
+    if "384" in k or "521" in k or "448" in k:
+        return "ECC-P384"
+    # ECDHE over X25519/P-256 or finite-field DHE: Shor-vulnerable, ~128-bit classical.
+    return "ECC-P256"
+
+def _cipher_algorithm(cipher: Optional[str]) -> Optional[str]:
+    if cipher is None:
+        return None
+    c = cipher.upper()
+    if "AES_128" in c or "AES128" in c:
+        return "AES-128"
+    if "AES_256" in c or "AES256" in c or "CHACHA20" in c:
+        return "AES-256"
+    return None
+
+def _key_exchange(sslobj: ssl.SSLObject, protocol: Optional[str], cipher: Optional[str]) -> Optional[str]:
+    group = getattr(sslobj, "group", None)
+    if callable(group):
+        g = group()
+        if g:
+            return g
+    if protocol == "TLSv1.3":
+        return "ECDHE"
+    if cipher is None:
+        return None
+    if cipher.startswith("ECDHE"):
+        return "ECDHE"
+    if cipher.startswith("DHE"):
+        return "DHE"
+    return "RSA"
+
+def parse_target(target: str, default_port: int = DEFAULT_PORT) -> tuple[str, int]:
+    """`(host, port)` from `host`, `host:port` or `[v6]:port`; ValueError if either is unusable."""
+    t = target.strip()
+    if t.startswith("["):
+        host, _, rest = t[1:].partition("]")
+        port = rest[1:] if rest.startswith(":") else default_port
+    elif t.count(":") == 1:
+        host, port = t.split(":")
+    else:
+        host, port = t, default_port
+    if not host:
+        raise ValueError(f"missing host in {target!r}")
+    if not str(port).isdigit() or not 0 < int(port) < 65536:
+        raise ValueError(f"invalid port in {target!r}")
+    return host.lower(), int(port)
+
+def _inventory_context() -> ssl.SSLContext:
+    # Inventory must see every endpoint, including self-signed and expired ones.
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    ctx.check_hostname = False
+    ctx.verify_mode = ssl.CERT_NONE
+    return ctx
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+class Prober:
+    def __init__(self, concurrency: int = 256, timeout: float = 5.0, cache_ttl: float = 300.0,
+                 ctx: Optional[ssl.SSLContext] = None):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.ctx = ctx or _inventory_context()
+        self._cache: dict[tuple[str, int], tuple[float, ProbeResult]] = {}
+        self._inflight: dict[tuple[str, int], asyncio.Future] = {}
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._sem_loop = None
+
+    async def _connect(self, host: str, port: int) -> ProbeResult:
+        res = ProbeResult(host, port)
+        t0 = time.perf_counter()
+        writer = None
+        try:
+            async with self._sem:
+                _, writer = await asyncio.wait_for(
+                    asyncio.open_connection(host, port, ssl=self.ctx,
+                                            server_hostname=None if _is_ip(host) else host),
+                    self.timeout)
+            sslobj = writer.get_extra_info("ssl_object")
+            res.protocol = sslobj.version()
+            cipher = sslobj.cipher()
+            if cipher:
+                res.cipher, _, res.cipher_bits = cipher
+            res.key_exchange = _key_exchange(sslobj, res.protocol, res.cipher)
+            der = sslobj.getpeercert(binary_form=True)
+            if der:
+                item = certificate_item(res.target, 0, x509.load_der_x509_certificate(der))
+                res.cert_key_type, res.cert_key_size = item.key_type, item.key_size
+                res.cert_algorithm, res.subject, res.sans = item.algorithm, item.subject, item.sans
+                res.not_after = item.not_after.isoformat() if item.not_after else None
+            res.ok = True
+        except asyncio.TimeoutError:
+            res.error = "timeout"
+        except (OSError, ssl.SSLError, ValueError) as e:
+            res.error = f"{type(e).__name__}: {e}"
+        finally:
+            res.elapsed = time.perf_counter() - t0
+            if writer is not None:
+                writer.close()
+        PROBES.inc(outcome="ok" if res.ok else "error")
+        return res
+
+    async def probe(self, host: str, port: int) -> ProbeResult:
+        key = (host.lower(), port)
+        hit = self._cache.get(key)
+        if hit is not None and time.monotonic() - hit[0] < self.cache_ttl:
+            CACHE_HITS.inc(cache="prober", kind="result")
+            return hit[1]
+        fut = self._inflight.get(key)
+        if fut is not None:
+            CACHE_HITS.inc(cache="prober", kind="inflight")
+            return await asyncio.shield(fut)
+        CACHE_MISSES.inc(cache="prober")
+        loop = asyncio.get_running_loop()
+        if self._sem_loop is not loop:
+            self._sem, self._sem_loop = asyncio.Semaphore(self.concurrency), loop
+        fut = loop.create_future()
+        self._inflight[key] = fut
+        try:
+            res = await self._connect(*key)
+            self._cache[key] = (time.monotonic(), res)
+            fut.set_result(res)
+            return res
+        finally:
+            del self._inflight[key]
+            if not fut.done():
+                fut.cancel()
+
+    async def probe_many(self, targets: Iterable[str]) -> list[ProbeResult]:
+        """Probe unique targets concurrently; results keep first-seen target order.
+
+        A target that does not parse gets a result with `error` set (and port 0) instead
+        of failing the whole batch.
+        """
+        keys: dict = {}
+        for t in targets:
+            try:
+                keys.setdefault(parse_target(t), None)
+            except ValueError as e:
+                keys.setdefault(t.strip(), str(e))
+        return await asyncio.gather(*(self.probe(*key) if error is None else self._invalid(key, error)
+                                      for key, error in keys.items()))
+
+    async def _invalid(self, target: str, error: str) -> ProbeResult:
+        PROBES.inc(outcome="error")
+        return ProbeResult(target, 0, error=error)
+
+def evaluate_probe(result: ProbeResult, data_lifetime_years: int, data_classification: str = "medium",
+                   scenario: str = "moderate", ctx: Optional[EvaluationContext] = None,
+                   ) -> dict[str, RiskResponse]:
+    reqs = result.risk_requests(data_lifetime_years, data_classification, scenario)
+    ctx = ctx or EvaluationContext.create()
+    return {component: evaluate_risk(req, ctx) for component, req in reqs.items()}
+
+def main():
+    ap = argparse.ArgumentParser(description="QASCS live TLS endpoint prober")
+    ap.add_argument("targets", nargs="*", help="host[:port] targets")
+    ap.add_argument("--file", default=None, help="Read targets from a file, one per line.")
+    ap.add_argument("--concurrency", type=int, default=256)
+    ap.add_argument("--timeout", type=float, default=5.0)
+    ap.add_argument("--data-lifetime-years", type=int, required=True)
+    ap.add_argument("--data-classification", default="medium", choices=["low","medium","high","critical"])
+    ap.add_argument("--scenario", default="moderate", choices=["conservative","moderate","aggressive"])
+    ap.add_argument("--as-of-year", type=int, default=None, help="Evaluate as of this year instead of the current one.")
+    args = ap.parse_args()
+
+    targets = list(args.targets)
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            targets += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    if not targets:
+        ap.error("no targets given")
+
+    results = asyncio.run(Prober(args.concurrency, args.timeout).probe_many(targets))
+    ctx = EvaluationContext.create(reference_year=args.as_of_year)
+    for res in results:
+        row = res.to_dict()
+        row["assessment"] = {
+            component: resp.model_dump()
+            for component, resp in evaluate_probe(res, args.data_lifetime_years,
+                                                  args.data_classification, args.scenario, ctx).items()
+        } if res.ok else None
+        sys.stdout.write(json.dumps(row) + "\n")
+
+if __name__ == "__main__":
+    main()
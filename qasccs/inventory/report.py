@@ -0,0 +1,235 @@
+"""
+Fleet risk report.
+
+Consumes the assessment stream produced by `scan`/`probe` (or any RiskResponse rows,
+or a .qrsk result file) in one pass with constant-memory aggregators:
+
+  - counters by risk, recommended mode, algorithm and data classification
+  - per business unit: assets, HIGH count and earliest quantum-safe-until year
+  - top-K offenders (HIGH first, then earliest safe-until year) in a bounded min-heap
+  - a year histogram of quantum-safe-until years; years are small integers, so the
+    histogram is an exact quantile sketch bounded by the range of years, not the fleet
+
+Results are never materialized; `FleetReport.to_dict()` / `to_markdown()` render the summary.
+"""
+from __future__ import annotations
+import argparse, heapq, json, sys
+from collections import Counter
+from dataclasses import dataclass
+from itertools import count
+from typing import Iterable, Iterator, Mapping, Optional
+
+from qasccs.quantum_risk_engine.models import RiskResponse
+from .prober import ProbeResult
+
+RISK_RANK = {"LOW": 0, "MEDIUM": 1, "HIGH": 2}
+UNASSIGNED = "unassigned"
+
+@dataclass
+class Assessment:
+    asset: Optional[str]
+    algorithm: Optional[str]
+    classification: Optional[str]
+    unit: Optional[str]
+    resp: RiskResponse
+    not_after: Optional[str] = None
+
+def _probe_algorithms(row: dict) -> dict[str, str]:
+    fields = {k: v for k, v in row.items() if k in ProbeResult.__dataclass_fields__}
+    try:
+        reqs = ProbeResult(**fields).risk_requests(1)
+    except TypeError:
+        return {}
+    return {component: req.algorithm for component, req in reqs.items()}
+
+def assessments(rows: Iterable[dict], classification: Optional[str] = None) -> Iterator[Assessment]:
+    """Normalize scanner rows, prober rows and bare RiskResponse dicts.
+
+    Rows without an assessment (unmodeled keys, failed probes) are skipped.
+    """
+    for row in rows:
+        cls = row.get("data_classification", classification)
+        unit = row.get("business_unit")
+        if "assessment" not in row:
+            resp = RiskResponse(**{k: row[k] for k in RiskResponse.model_fields if k in row})
+            yield Assessment(row.get("asset"), row.get("algorithm"), cls, unit, resp, row.get("not_after"))
+            continue
+        a = row["assessment"]
+        if a is None:
+            continue
+        asset = row.get("path") or row.get("target")
+        if "risk" in a:
+            yield Assessment(asset, row.get("algorithm"), cls, unit, RiskResponse(**a), row.get("not_after"))
+            continue
+        algs = _probe_algorithms(row)
+        for component, resp in a.items():
+            yield Assessment(f"{asset}#{component}", algs.get(component), cls, unit, RiskResponse(**resp),
+                             row.get("not_after") if component == "certificate" else None)
+
+def iter_rows(path: str) -> Iterator[dict]:
+    """Stream JSON lines (or a JSON array) from `path` ("-" for stdin)."""
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        first = f.read(1)
+        while first.isspace():
+            first = f.read(1)
+        if first == "[":
+            yield from json.loads(first + f.read())
+            return
+        line = first + f.readline()
+        while line:
+            if line.strip():
+                yield json.loads(line)
+            line = f.readline()
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def iter_result_file(path: str) -> Iterator[dict]:
+    from qasccs.quantum_risk_engine.resultfile import ResultReader
+    with ResultReader(path) as r:
+        for i in range(len(r)):
+            yield dict(r[i].model_dump(), asset=r.asset_id(i))
+
+class UnitMap:
+    """Longest-prefix match of asset path/target to a business unit."""
+
+    def __init__(self, prefixes: Mapping[str, str]):
+        self._prefixes = sorted(prefixes.items(), key=lambda kv: len(kv[0]), reverse=True)
+
+    def __call__(self, asset: Optional[str]) -> str:
+        if asset:
+            for prefix, unit in self._prefixes:
+                if asset.startswith(prefix):
+                    return unit
+        return UNASSIGNED
+
+class FleetReport:
+    def __init__(self, top: int = 10, unit_map: Optional[UnitMap] = None):
+        self.top = top
+        self.unit_map = unit_map
+        self.total = 0
+        self.by_risk: Counter = Counter()
+        self.by_mode: Counter = Counter()
+        self.by_algorithm: Counter = Counter()
+        self.by_classification: Counter = Counter()
+        self.safe_until: Counter = Counter()
+        self.units: dict[str, dict] = {}
+        self._heap: list = []
+        self._seq = count()
+
+    def add(self, a: Assessment):
+        resp = a.resp
+        year = resp.quantum_safe_until_year
+        self.total += 1
+        self.by_risk[resp.risk] += 1
+        self.by_mode[resp.recommended_mode] += 1
+        self.by_algorithm[a.algorithm or "unknown"] += 1
+        self.by_classification[a.classification or "unknown"] += 1
+        self.safe_until[year] += 1
+
+        unit = a.unit or (self.unit_map(a.asset) if self.unit_map else UNASSIGNED)
+        u = self.units.get(unit)
+        if u is None:
+            u = self.units[unit] = {"assets": 0, "high": 0, "earliest_safe_until": year, "earliest_asset": a.asset}
+        u["assets"] += 1
+        u["high"] += resp.risk == "HIGH"
+        if year < u["earliest_safe_until"]:
+            u["earliest_safe_until"], u["earliest_asset"] = year, a.asset
+
+        if self.top:
+            # Min-heap of the K worst: the root is the mildest offender kept so far.
+            key = (RISK_RANK[resp.risk], -year, next(self._seq))
+            entry = (key, a.asset, a.algorithm, resp.risk, year)
+            if len(self._heap) < self.top:
+                heapq.heappush(self._heap, entry)
+            elif key > self._heap[0][0]:
+                heapq.heapreplace(self._heap, entry)
+
+    def consume(self, items: Iterable[Assessment]) -> "FleetReport":
+        for a in items:
+            self.add(a)
+        return self
+
+    def quantile(self, q: float) -> Optional[int]:
+        if not self.total:
+            return None
+        rank = q * (self.total - 1)
+        seen = 0
+        for year in sorted(self.safe_until):
+            seen += self.safe_until[year]
+            if seen > rank:
+                return year
+        return max(self.safe_until)
+
+    def offenders(self) -> list[dict]:
+        return [{"asset": asset, "algorithm": alg, "risk": risk, "quantum_safe_until_year": year}
+                for _, asset, alg, risk, year in sorted(self._heap, reverse=True)]
+
+    def to_dict(self) -> dict:
+        return {
+            "assets": self.total,
+            "by_risk": dict(self.by_risk.most_common()),
+            "by_mode": dict(self.by_mode.most_common()),
+            "by_algorithm": dict(self.by_algorithm.most_common()),
+            "by_classification": dict(self.by_classification.most_common()),
+            "safe_until": {
+                "min": min(self.safe_until) if self.safe_until else None,
+                "p10": self.quantile(0.1),
+                "p50": self.quantile(0.5),
+                "p90": self.quantile(0.9),
+                "max": max(self.safe_until) if self.safe_until else None,
+                "histogram": dict(sorted(self.safe_until.items())),
+            },
+            "business_units": dict(sorted(self.units.items(), key=lambda kv: kv[1]["earliest_safe_until"])),
+            "top_offenders": self.offenders(),
+        }
+
+    def to_markdown(self) -> str:
+        d = self.to_dict()
+        out = ["# Fleet quantum risk report", "", f"Assessed assets: **{d['assets']}**", ""]
+
+        def table(title, header, rows):
+            out.extend([f"## {title}", "", "| " + " | ".join(header) + " |",
+                        "|" + "---|" * len(header)])
+            out.extend("| " + " | ".join("" if c is None else str(c) for c in r) + " |" for r in rows)
+            out.append("")
+
+        for title, key in (("By risk", "by_risk"), ("By recommended mode", "by_mode"),
+                           ("By algorithm", "by_algorithm"), ("By classification", "by_classification")):
+            table(title, ["value", "assets"], d[key].items())
+        s = d["safe_until"]
+        table("Quantum-safe-until year", ["min", "p10", "p50", "p90", "max"],
+              [(s["min"], s["p10"], s["p50"], s["p90"], s["max"])])
+        table("Business units", ["unit", "assets", "HIGH", "earliest safe-until", "earliest asset"],
+              [(k, v["assets"], v["high"], v["earliest_safe_until"], v["earliest_asset"])
+               for k, v in d["business_units"].items()])
+        table(f"Top {self.top} offenders", ["asset", "algorithm", "risk", "safe-until"],
+              [(o["asset"], o["algorithm"], o["risk"], o["quantum_safe_until_year"]) for o in d["top_offenders"]])
+        return "\n".join(out)
+
+def main():
+    ap = argparse.ArgumentParser(description="QASCS fleet risk report (streams scan/probe output)")
+    ap.add_argument("input", nargs="?", default="-", help="JSON lines from scan/probe, a JSON array, or '-' for stdin")
+    ap.add_argument("--qrsk", action="store_true", help="Input is a .qrsk result file.")
+    ap.add_argument("--format", default="markdown", choices=["markdown", "json"])
+    ap.add_argument("--top", type=int, default=10, help="Number of top offenders to list.")
+    ap.add_argument("--units", default=None, help="JSON file mapping path/target prefixes to business units.")
+    ap.add_argument("--data-classification", default=None, choices=["low","medium","high","critical"],
+                    help="Classification to attribute to rows that do not carry one.")
+    args = ap.parse_args()
+
+    unit_map = None
+    if args.units:
+        with open(args.units, encoding="utf-8") as f:
+            unit_map = UnitMap(json.load(f))
+    rows = iter_result_file(args.input) if args.qrsk else iter_rows(args.input)
+    report = FleetReport(args.top, unit_map).consume(assessments(rows, args.data_classification))
+    if args.format == "json":
+        json.dump(report.to_dict(), sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        sys.stdout.write(report.to_markdown() + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Crypto inventory scanner.
+
+Walks directories of PEM/DER certificates and keys, maps each public key to the
+Quantum Risk Engine's `Algorithm` literals and streams the results into `evaluate_risk`.
+Files are parsed in parallel (thread or process pool, bounded in-flight window) and
+large bundles are read through `mmap` so only the PEM blocks themselves are copied.
+"""
+from __future__ import annotations
+import argparse, json, mmap, os, re, sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+from cryptography import x509
+from cryptography.exceptions import UnsupportedAlgorithm
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import dsa, dh, ec, ed448, ed25519, rsa, x448, x25519
+
+from qasccs.quantum_risk_engine.models import RiskRequest, RiskResponse
+from qasccs.quantum_risk_engine.policy import EvaluationContext, evaluate_risk
+
+EXTENSIONS = frozenset({".pem", ".crt", ".cer", ".der", ".key", ".pub"})
+MMAP_THRESHOLD = 1 << 20
+
+_PEM_BLOCK = re.compile(rb"-----BEGIN ([A-Z0-9 ]+)-----.*?-----END \1-----", re.DOTALL)
+
+# Curves the policy models by security level; the engine treats every ECC-* alike (Shor).
+_CURVE_ALGORITHM = {
+    "secp256r1": "ECC-P256", "secp256k1": "ECC-P256", "brainpoolP256r1": "ECC-P256",
+    "secp384r1": "ECC-P384", "brainpoolP384r1": "ECC-P384",
+    "secp521r1": "ECC-P384", "brainpoolP512r1": "ECC-P384",
+}
+
+@dataclass
+class InventoryItem:
+    path: str
+    index: int = 0                      # position within a bundle
+    kind: str = ""                      # certificate | private_key | public_key
+    key_type: str = ""                  # e.g. RSA, EC:secp384r1, Ed25519
+    key_size: Optional[int] = None
+    algorithm: Optional[str] = None     # `Algorithm` literal, None if not modeled
+    subject: Optional[str] = None
+    not_after: Optional[datetime] = None
+    sans: list[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        d = asdict(self)
+        d["not_after"] = self.not_after.isoformat() if self.not_after else None
+        return d
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "InventoryItem":
+        d = dict(d)
+        if d.get("not_after"):
+            d["not_after"] = datetime.fromisoformat(d["not_after"])
+        return cls(**d)
+
+def _finite_field_algorithm(n: int) -> str:
+    # RSA, DSA and DH all fall to Shor; anything under 2048 bits is rated no better than RSA-2048.
+    return "RSA-4096" if n >= 4096 else "RSA-3072" if n >= 3072 else "RSA-2048"
+
+def algorithm_for_key(key) -> tuple[str, Optional[int], Optional[str]]:
+    """Return (key_type, key_size, Algorithm literal or None) for a public or private key.
+
+    Keys the policy has no exact profile for (RSA under 2048 bits, DSA, DH, other curves)
+    map to the nearest weaker-or-equal profile rather than dropping out of the assessment;
+    `key_size` keeps the real size.
+    """
+    if isinstance(key, (rsa.RSAPublicKey, rsa.RSAPrivateKey)):
+        return "RSA", key.key_size, _finite_field_algorithm(key.key_size)
+    if isinstance(key, (ec.EllipticCurvePublicKey, ec.EllipticCurvePrivateKey)):
+        name, n = key.curve.name, key.curve.key_size
+        return f"EC:{name}", n, _CURVE_ALGORITHM.get(name, "ECC-P384" if n > 256 else "ECC-P256")
+    if isinstance(key, (ed25519.Ed25519PublicKey, ed25519.Ed25519PrivateKey)):
+        return "Ed25519", 256, "ECC-P256"
+    if isinstance(key, (x25519.X25519PublicKey, x25519.X25519PrivateKey)):
+        return "X25519", 256, "ECC-P256"
+    if isinstance(key, (ed448.Ed448PublicKey, ed448.Ed448PrivateKey)):
+        return "Ed448", 456, "ECC-P384"
+    if isinstance(key, (x448.X448PublicKey, x448.X448PrivateKey)):
+        return "X448", 448, "ECC-P384"
+    if isinstance(key, (dsa.DSAPublicKey, dsa.DSAPrivateKey)):
+        return "DSA", key.key_size, _finite_field_algorithm(key.key_size)
+    if isinstance(key, (dh.DHPublicKey, dh.DHPrivateKey)):
+        return "DH", key.key_size, _finite_field_algorithm(key.key_size)
+    return type(key).__name__, None, None
+
+def certificate_item(path: str, index: int, cert: x509.Certificate) -> InventoryItem:
+    key_type, size, alg = algorithm_for_key(cert.public_key())
+    try:
+        san = cert.extensions.get_extension_for_class(x509.SubjectAlternativeName).value
+        sans = [str(v) for v in san.get_values_for_type(x509.DNSName)] + \
+               [str(v) for v in san.get_values_for_type(x509.IPAddress)]
+    except x509.ExtensionNotFound:
+        sans = []
+    return InventoryItem(path, index, "certificate", key_type, size, alg,
+                         cert.subject.rfc4514_string(), cert.not_valid_after_utc, sans)
+
+def _key_item(path: str, index: int, kind: str, key) -> InventoryItem:
+    key_type, size, alg = algorithm_for_key(key)
+    return InventoryItem(path, index, kind, key_type, size, alg)
+
+def _parse_pem_block(path: str, index: int, label: bytes, block: bytes) -> Optional[InventoryItem]:
+    if label in (b"CERTIFICATE", b"X509 CERTIFICATE", b"TRUSTED CERTIFICATE"):
+        return certificate_item(path, index, x509.load_pem_x509_certificate(block))
+    if label.endswith(b"PRIVATE KEY"):
+        return _key_item(path, index, "private_key", serialization.load_pem_private_key(block, password=None))
+    if label.endswith(b"PUBLIC KEY"):
+        return _key_item(path, index, "public_key", serialization.load_pem_public_key(block))
+    return None
+
+def _parse_der(path: str, data: bytes) -> InventoryItem:
+    for kind, load in (("certificate", x509.load_der_x509_certificate),
+                       ("private_key", lambda b: serialization.load_der_private_key(b, password=None)),
+                       ("public_key", serialization.load_der_public_key)):
+        try:
+            obj = load(data)
+        except (ValueError, TypeError, UnsupportedAlgorithm):
+            continue
+        try:
+            return certificate_item(path, 0, obj) if kind == "certificate" else _key_item(path, 0, kind, obj)
+        except (ValueError, TypeError, UnsupportedAlgorithm) as e:
+            return InventoryItem(path, error=f"{kind}: {e}")
+    return InventoryItem(path, error="unrecognized DER object")
+
+def _scan_buffer(path: str, buf) -> list[InventoryItem]:
+    items = []
+    found = False
+    for i, m in enumerate(_PEM_BLOCK.finditer(buf)):
+        found = True
+        try:
+            item = _parse_pem_block(path, i, m.group(1), m.group(0))
+        except (ValueError, TypeError, UnsupportedAlgorithm) as e:
+            item = InventoryItem(path, i, error=f"{m.group(1).decode()}: {e}")
+        if item is not None:
+            items.append(item)
+    if not found:
+        items.append(_parse_der(path, bytes(buf)))
+    return items
+
+def scan_file(path: str | os.PathLike) -> list[InventoryItem]:
+    """Parse every certificate/key in one PEM bundle or DER file."""
+    path = os.fspath(path)
+    try:
+        size = os.path.getsize(path)
+        if size == 0:
+            return []
+        with open(path, "rb") as f:
+            if size < MMAP_THRESHOLD:
+                return _scan_buffer(path, f.read())
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return _scan_buffer(path, mm)
+    except OSError as e:
+        return [InventoryItem(path, error=str(e))]
+
+def iter_files(roots: Iterable[str | os.PathLike], extensions=EXTENSIONS) -> Iterator[str]:
+    for root in roots:
+        root = os.fspath(root)
+        if os.path.isfile(root):
+            yield root
+            continue
+        for dirpath, _, filenames in os.walk(root):
+            for name in filenames:
+                if extensions is None or os.path.splitext(name)[1].lower() in extensions:
+                    yield os.path.join(dirpath, name)
+
+def parallel_parse(jobs: Iterable, workers: Optional[int] = None, processes: bool = False,
+                   ) -> Iterator[tuple[object, list[InventoryItem]]]:
+    """Parse `(tag, path)` jobs in a pool, yielding `(tag, items)` in completion order.
+
+    At most `4 * workers` files are in flight, so memory stays bounded for huge stores.
+    """
+    workers = workers or min(32, (os.cpu_count() or 1) + 4)
+    pool_cls = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    window = 4 * workers
+    with pool_cls(max_workers=workers) as pool:
+        pending = {}
+        for tag, path in jobs:
+            pending[pool.submit(scan_file, path)] = tag
+            if len(pending) >= window:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    yield pending.pop(fut), fut.result()
+        for fut, tag in pending.items():
+            yield tag, fut.result()
+
+def scan(roots: Iterable[str | os.PathLike], workers: Optional[int] = None,
+         processes: bool = False, extensions=EXTENSIONS, cache=None) -> Iterator[InventoryItem]:
+    """Yield inventory items from every file under `roots`, parsing files in parallel.
+
+    With a `ParseCache`, unchanged files are served from the cache and only misses
+    reach the pool. Results are yielded in completion order.
+    """
+    if cache is not None:
+        yield from cache.scan(roots, workers, processes, extensions)
+        return
+    jobs = ((path, path) for path in iter_files(roots, extensions))
+    for _, items in parallel_parse(jobs, workers, processes):
+        yield from items
+
+def evaluate_inventory(items: Iterable[InventoryItem], data_lifetime_years: int,
+                       data_classification: str = "medium", scenario: str = "moderate",
+                       ctx: Optional[EvaluationContext] = None,
+                       ) -> Iterator[tuple[InventoryItem, Optional[RiskResponse]]]:
+    """Stream (item, RiskResponse) pairs; items without a modeled algorithm get None.
+
+    The whole stream is evaluated against one context (the current year unless given).
+    """
+    ctx = ctx or EvaluationContext.create()
+    for item in items:
+        if item.algorithm is None:
+            yield item, None
+            continue
+        req = RiskRequest(algorithm=item.algorithm, data_lifetime_years=data_lifetime_years,
+                          data_classification=data_classification, scenario=scenario)
+        yield item, evaluate_risk(req, ctx)
+
+def main():
+    ap = argparse.ArgumentParser(description="QASCS crypto inventory scanner")
+    ap.add_argument("paths", nargs="+", help="Files or directories to scan")
+    ap.add_argument("--data-lifetime-years", type=int, required=True)
+    ap.add_argument("--data-classification", default="medium", choices=["low","medium","high","critical"])
+    ap.add_argument("--scenario", default="moderate", choices=["conservative","moderate","aggressive"])
+    ap.add_argument("--as-of-year", type=int, default=None, help="Evaluate as of this year instead of the current one.")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--processes", action="store_true", help="Parse in a process pool instead of threads.")
+    ap.add_argument("--all-files", action="store_true", help="Scan every file, not just known extensions.")
+    ap.add_argument("--cache", default=None, help="Persistent parse cache (SQLite file) for repeated scans.")
+    ap.add_argument("--cache-max-entries", type=int, default=None)
+    ap.add_argument("--cache-max-bytes", type=int, default=None)
+    args = ap.parse_args()
+
+    cache = None
+    if args.cache:
+        from .cache import ParseCache
+        cache = ParseCache(args.cache, max_entries=args.cache_max_entries, max_bytes=args.cache_max_bytes)
+    try:
+        items = scan(args.paths, args.workers, args.processes,
+                     None if args.all_files else EXTENSIONS, cache=cache)
+        ctx = EvaluationContext.create(reference_year=args.as_of_year)
+        for item, resp in evaluate_inventory(items, args.data_lifetime_years,
+                                             args.data_classification, args.scenario, ctx):
+            row = item.to_dict()
+            row["assessment"] = resp.model_dump() if resp is not None else None
+            sys.stdout.write(json.dumps(row) + "\n")
+    finally:
+        if cache is not None:
+            cache.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Background key-material factory.
+
+Key generation (RSA for certificates, ephemeral X25519/KEM keys for the hybrid layer)
+is slow and bursty, so it is kept off request paths. A `KeyFactory` holds one bounded
+pool per registered algorithm and a few worker threads that refill them:
+
+  - a pool that drains to its low watermark is refilled up to its high watermark
+    (hysteresis, so workers generate in bursts rather than one key at a time);
+  - `get(name)` pops a ready key in O(1); on an empty pool it generates inline and
+    counts a starvation event;
+  - depth, keys generated, generation time and starvation are exported as metrics.
+
+Items are handed out once and never reused.
+"""
+from __future__ import annotations
+import argparse, json, logging, threading, time
+from collections import deque
+from typing import Any, Callable, Optional
+
+from qasccs import metrics
+
+log = logging.getLogger("qasccs.keyfactory")
+
+DEPTH = metrics.gauge("qasccs_keypool_depth", "Ready keys per pool")
+GENERATED = metrics.counter("qasccs_keypool_generated_total", "Keys generated by background workers, per pool")
+STARVED = metrics.counter("qasccs_keypool_starved_total", "get() on an empty pool (inline generation), per pool")
+GENERATE_TIME = metrics.histogram("qasccs_keypool_generate_seconds", "Background key generation time, per pool")
+
+class _Pool:
+    def __init__(self, name: str, generate: Callable[[], Any], low: int, high: int):
+        self.name = name
+        self.generate = generate
+        self.low = low
+        self.high = high
+        self.ready: deque = deque()
+        self.in_flight = 0
+        self.refilling = True
+        self.generated = 0
+        self.starved = 0
+        self.served = 0
+
+class KeyFactory:
+    def __init__(self, workers: int = 1):
+        self.workers = workers
+        self._pools: dict[str, _Pool] = {}
+        self._cond = threading.Condition()
+        self._threads: list[threading.Thread] = []
+        self._stop = False
+        self._started = 0.0
+
+    def register(self, name: str, generate: Callable[[], Any], low: int = 8, high: int = 32) -> "KeyFactory":
+        """Add a pool; registering an existing name keeps the first registration."""
+        if not 0 <= low < high:
+            raise ValueError("watermarks must satisfy 0 <= low < high")
+        with self._cond:
+            if name not in self._pools:
+                self._pools[name] = _Pool(name, generate, low, high)
+                self._cond.notify()
+        return self
+
+    def start(self) -> "KeyFactory":
+        self._started = time.monotonic()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._work, name=f"qasccs-keyfactory-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def close(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join()
+        self._threads.clear()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _next_job(self) -> Optional[_Pool]:
+        # Emptiest pool (relative to its high watermark) first, so one slow algorithm
+        # (e.g. RSA) cannot starve the others.
+        best, best_fill = None, 1.0
+        for p in self._pools.values():
+            have = len(p.ready) + p.in_flight
+            if not p.refilling:
+                continue
+            if have >= p.high:
+                p.refilling = False
+                continue
+            fill = have / p.high
+            if fill < best_fill:
+                best, best_fill = p, fill
+        return best
+
+    def _work(self):
+        while True:
+            with self._cond:
+                pool = None
+                while not self._stop and (pool := self._next_job()) is None:
+                    self._cond.wait()
+                if self._stop:
+                    return
+                pool.in_flight += 1
+            t0 = time.perf_counter()
+            try:
+                item = pool.generate()
+            except Exception:
+                # Stop refilling this pool until the next get(); other pools keep going.
+                log.exception("Key generation failed for pool %s", pool.name)
+                with self._cond:
+                    pool.in_flight -= 1
+                    pool.refilling = False
+                continue
+            GENERATE_TIME.observe(time.perf_counter() - t0, pool=pool.name)
+            with self._cond:
+                pool.in_flight -= 1
+                pool.ready.append(item)
+                pool.generated += 1
+                if len(pool.ready) + pool.in_flight >= pool.high:
+                    pool.refilling = False
+            GENERATED.inc(pool=pool.name)
+            DEPTH.set(len(pool.ready), pool=pool.name)
+
+    def get(self, name: str):
+        pool = self._pools[name]
+        try:
+            item = pool.ready.popleft()
+        except IndexError:
+            pool.starved += 1
+            STARVED.inc(pool=name)
+            item = pool.generate()
+        pool.served += 1
+        depth = len(pool.ready)
+        DEPTH.set(depth, pool=name)
+        if depth <= pool.low and not pool.refilling:
+            with self._cond:
+                pool.refilling = True
+                self._cond.notify()
+        return item
+
+    def depth(self, name: str) -> int:
+        return len(self._pools[name].ready)
+
+    def wait_ready(self, name: str, n: Optional[int] = None, timeout: float = 30.0) -> bool:
+        """Block until pool `name` holds `n` keys (default: its high watermark)."""
+        pool = self._pools[name]
+        n = pool.high if n is None else n
+        deadline = time.monotonic() + timeout
+        while len(pool.ready) < n:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def stats(self) -> dict:
+        elapsed = time.monotonic() - self._started if self._started else 0.0
+        return {
+            p.name: {
+                "depth": len(p.ready), "low": p.low, "high": p.high, "generated": p.generated,
+                "served": p.served, "starved": p.starved,
+                "refill_per_s": round(p.generated / elapsed, 2) if elapsed else 0.0,
+            }
+            for p in self._pools.values()
+        }
+
+def standard_generators() -> dict[str, Callable[[], Any]]:
+    """Generators for the key types QASCS uses, by pool name."""
+    from cryptography.hazmat.primitives.asymmetric import ec, rsa, x448, x25519
+    return {
+        "rsa-2048": lambda: rsa.generate_private_key(65537, 2048),
+        "rsa-3072": lambda: rsa.generate_private_key(65537, 3072),
+        "ec-p256": lambda: ec.generate_private_key(ec.SECP256R1()),
+        "ec-p384": lambda: ec.generate_private_key(ec.SECP384R1()),
+        "x25519": x25519.X25519PrivateKey.generate,
+        "x448": x448.X448PrivateKey.generate,
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description="Exercise the QASCS key factory and report pool statistics")
+    ap.add_argument("--pool", nargs="+", default=["x25519", "ec-p256"], choices=sorted(standard_generators()))
+    ap.add_argument("--low", type=int, default=8)
+    ap.add_argument("--high", type=int, default=32)
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--gets", type=int, default=1000, help="Keys to take from each pool.")
+    ap.add_argument("--rate", type=float, default=0.0, help="Takes per second per pool (0 = as fast as possible).")
+    args = ap.parse_args()
+
+    gens = standard_generators()
+    with KeyFactory(args.workers) as kf:
+        for name in args.pool:
+            kf.register(name, gens[name], args.low, args.high)
+        for name in args.pool:
+            kf.wait_ready(name)
+        latencies = {name: [] for name in args.pool}
+        for _ in range(args.gets):
+            for name in args.pool:
+                t0 = time.perf_counter()
+                kf.get(name)
+                latencies[name].append(time.perf_counter() - t0)
+            if args.rate:
+                time.sleep(1.0 / args.rate)
+        stats = kf.stats()
+    for name, xs in latencies.items():
+        xs.sort()
+        stats[name]["get_p50_us"] = round(xs[len(xs) // 2] * 1e6, 1)
+        stats[name]["get_p99_us"] = round(xs[int(0.99 * (len(xs) - 1))] * 1e6, 1)
+    print(json.dumps(stats, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Lightweight, optional metrics + logging for QASCS.
+
+Counters, gauges and histograms live in a process-wide registry and are exposed
+as Prometheus text (`serve_prometheus`) or a periodic JSON dump (`JsonDumper`).
+Collection is off until `enable()` is called; a disabled instrument returns after
+a single global check, so instrumented hot paths cost essentially nothing.
+
+`setup_logging()` routes the `qasccs` loggers through a QueueHandler so formatting
+and stream I/O happen on a background listener thread, not on the request path.
+"""
+from __future__ import annotations
+import atexit, bisect, json, logging, logging.handlers, queue, socket, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+_ENABLED = False
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+def enable(on: bool = True):
+    global _ENABLED
+    _ENABLED = on
+
+def enabled() -> bool:
+    return _ENABLED
+
+def _key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items())) if labels else ()
+
+def _fmt_labels(key: tuple, extra: tuple = ()) -> str:
+    items = key + extra
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str = ""):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str = ""):
+        super().__init__(name, help)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, n: float = 1, **labels):
+        if not _ENABLED:
+            return
+        k = _key(labels)
+        with self._lock:
+            self._values[k] = self._values.get(k, 0) + n
+
+    def value(self, **labels) -> float:
+        return self._values.get(_key(labels), 0)
+
+    def samples(self):
+        for k, v in list(self._values.items()):
+            yield self.name, k, v
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, n: float = 1, **labels):
+        self.inc(-n, **labels)
+
+    def set(self, v: float, **labels):
+        if not _ENABLED:
+            return
+        with self._lock:
+            self._values[_key(labels)] = v
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str = "", buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [bucket counts..., +Inf count, sum]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, v: float, **labels):
+        if not _ENABLED:
+            return
+        k = _key(labels)
+        i = bisect.bisect_left(self.buckets, v)
+        with self._lock:
+            row = self._values.get(k)
+            if row is None:
+                row = self._values[k] = [0] * (len(self.buckets) + 2)
+            row[i] += 1
+            row[-1] += v
+
+    def count(self, **labels) -> int:
+        row = self._values.get(_key(labels))
+        return sum(row[:-1]) if row else 0
+
+    def samples(self):
+        for k, row in list(self._values.items()):
+            cum = 0
+            for b, c in zip(self.buckets + (float("inf"),), row[:-1]):
+                cum += c
+                yield f"{self.name}_bucket", k + (("le", "+Inf" if b == float("inf") else repr(b)),), cum
+            yield f"{self.name}_count", k, cum
+            yield f"{self.name}_sum", k, row[-1]
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, **kw):
+        with self._lock:
+            m = self._metrics.get(name)
+            if m is None:
+                m = self._metrics[name] = cls(name, help, **kw)
+            elif type(m) is not cls:
+                raise ValueError(f"metric {name!r} already registered as {m.kind}")
+            return m
+
+    def counter(self, name: str, help: str = "") -> Counter:
+        return self._get(Counter, name, help)
+
+    def gauge(self, name: str, help: str = "") -> Gauge:
+        return self._get(Gauge, name, help)
+
+    def histogram(self, name: str, help: str = "", buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, buckets=buckets)
+
+    def reset(self):
+        for m in self._metrics.values():
+            m.reset()
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for m in sorted(self._metrics.values(), key=lambda m: m.name):
+            if m.help:
+                lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            for name, key, v in m.samples():
+                lines.append(f"{name}{_fmt_labels(key)} {v:g}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        out = {}
+        for m in self._metrics.values():
+            out[m.name] = [
+                {"name": name, "labels": dict(key), "value": v} for name, key, v in m.samples()
+            ]
+        return out
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+class _ReusePortHTTPServer(ThreadingHTTPServer):
+    def server_bind(self):
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+def serve_prometheus(host: str = "127.0.0.1", port: int = 9464, registry: Registry = REGISTRY,
+                     reuse_port: bool = False) -> ThreadingHTTPServer:
+    """Serve `/metrics` in Prometheus text format from a daemon thread.
+
+    `reuse_port` lets a replacement process bind the same port while this one drains.
+    """
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") not in ("", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = (_ReusePortHTTPServer if reuse_port else ThreadingHTTPServer)((host, port), _Handler)
+    threading.Thread(target=httpd.serve_forever, name="qasccs-metrics", daemon=True).start()
+    return httpd
+
+class JsonDumper:
+    """Write `registry.snapshot()` to `path` every `interval` seconds (and once on stop)."""
+
+    def __init__(self, path: str, interval: float = 10.0, registry: Registry = REGISTRY):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="qasccs-metrics-json", daemon=True)
+
+    def start(self) -> "JsonDumper":
+        self._thread.start()
+        return self
+
+    def dump(self):
+        data = {"timestamp": time.time(), "metrics": self.registry.snapshot()}
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.dump()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.dump()
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def setup_logging(level: int = logging.INFO, fmt: str = "[%(module)s] %(message)s") -> logging.handlers.QueueListener:
+    """Route `qasccs.*` loggers through a non-blocking queue drained by a listener thread."""
+    global _listener
+    if _listener is not None:
+        return _listener
+    q: queue.SimpleQueue = queue.SimpleQueue()
+    sink = logging.StreamHandler()
+    sink.setFormatter(logging.Formatter(fmt))
+    root = logging.getLogger("qasccs")
+    root.handlers[:] = [logging.handlers.QueueHandler(q)]
+    root.setLevel(level)
+    root.propagate = False
+    _listener = logging.handlers.QueueListener(q, sink)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
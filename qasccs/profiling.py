@@ -0,0 +1,152 @@
+"""
+Built-in profiling hooks (`--profile cpu|alloc`) for long-running QASCS commands.
+
+cpu   -- cProfile; writes a pstats file plus a text report sorted by cumulative time.
+alloc -- tracemalloc; writes the top allocation sites by retained size.
+
+With `every=1` the whole run is profiled. With `every=N` only every Nth unit of work
+(connection, record) wrapped in `sample()` is profiled, which keeps overhead low enough
+for production. Reports are written on `stop()` and, if installed, on a signal (SIGUSR1).
+"""
+from __future__ import annotations
+import argparse, cProfile, contextlib, io, pstats, signal, threading, tracemalloc
+from collections import Counter
+from typing import Optional
+
+MODES = ("cpu", "alloc")
+
+class Profiler:
+    def __init__(self, mode: str, out: Optional[str] = None, every: int = 1, top: int = 25):
+        if mode not in MODES:
+            raise ValueError(f"unknown profile mode {mode!r}; expected one of {MODES}")
+        if every < 1:
+            raise ValueError("every must be >= 1")
+        self.mode = mode
+        self.out = out or ("qasccs-cpu.prof" if mode == "cpu" else "qasccs-alloc.txt")
+        self.every = every
+        self.top = top
+        self.samples = 0
+        self._calls = 0
+        self._lock = threading.RLock()
+        self._prof: Optional[cProfile.Profile] = None
+        self._alloc: Counter = Counter()
+        self._active = 0                  # sampled blocks in progress (they may overlap)
+        self._running = False
+
+    @property
+    def continuous(self) -> bool:
+        return self.every == 1
+
+    def start(self) -> "Profiler":
+        if self.mode == "cpu":
+            self._prof = cProfile.Profile()
+            if self.continuous:
+                self._prof.enable()
+        elif self.continuous:
+            tracemalloc.start(10)
+        self._running = True
+        return self
+
+    @contextlib.contextmanager
+    def sample(self):
+        """Profile the wrapped block if it is the Nth call (no-op in continuous mode)."""
+        if self.continuous or not self._running:
+            yield
+            return
+        with self._lock:
+            self._calls += 1
+            hit = self._calls % self.every == 0
+        if not hit:
+            yield
+            return
+        # Profiling is process-wide: the first overlapping sample turns it on and the
+        # last one turns it off, so one block finishing cannot stop it under another.
+        with self._lock:
+            self.samples += 1
+            self._active += 1
+            if self._active == 1:
+                if self.mode == "cpu":
+                    self._prof.enable()
+                else:
+                    tracemalloc.start(10)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active -= 1
+                if self._active == 0:
+                    if self.mode == "cpu":
+                        self._prof.disable()
+                    else:
+                        snap = tracemalloc.take_snapshot()
+                        tracemalloc.stop()
+                        self._accumulate(snap)
+
+    def _accumulate(self, snap: tracemalloc.Snapshot):
+        for stat in snap.statistics("lineno"):
+            frame = stat.traceback[0]
+            self._alloc[(frame.filename, frame.lineno)] += stat.size
+
+    @property
+    def _empty(self) -> bool:
+        # cProfile has nothing to report (pstats raises) until a sampled block has run.
+        return self.mode == "cpu" and not self.continuous and self.samples == 0
+
+    def report(self) -> str:
+        if self._empty:
+            return f"No samples taken (every={self.every}, calls={self._calls})\n"
+        if self.mode == "cpu":
+            buf = io.StringIO()
+            pstats.Stats(self._prof, stream=buf).sort_stats("cumulative").print_stats(self.top)
+            return buf.getvalue()
+        alloc = Counter(self._alloc)
+        if tracemalloc.is_tracing():
+            for stat in tracemalloc.take_snapshot().statistics("lineno"):
+                frame = stat.traceback[0]
+                alloc[(frame.filename, frame.lineno)] += stat.size
+        lines = [f"Top {self.top} allocation sites (samples={self.samples or 'all'})"]
+        for (filename, lineno), size in alloc.most_common(self.top):
+            lines.append(f"{size / 1024:10.1f} KiB  {filename}:{lineno}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self):
+        """Write reports now; profiling continues afterwards."""
+        with self._lock:
+            if self.mode == "cpu" and not self._empty:
+                self._prof.dump_stats(self.out)
+            text_out = self.out + ".txt" if self.mode == "cpu" else self.out
+            with open(text_out, "w", encoding="utf-8") as f:
+                f.write(self.report())
+            # dump_stats() and pstats both disable the profiler as a side effect; turn it
+            # back on for a continuous run or for sampled blocks still in progress.
+            if self.mode == "cpu" and self._running and (self.continuous or self._active):
+                self._prof.enable()
+
+    def stop(self):
+        if not self._running:
+            return
+        self._running = False
+        if self.mode == "cpu":
+            self._prof.disable()
+        self.dump()
+        if self.mode == "alloc" and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def install_signal(self, signum: int = getattr(signal, "SIGUSR1", signal.SIGINT)):
+        signal.signal(signum, lambda *_: self.dump())
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def add_arguments(ap: argparse.ArgumentParser, unit: str = "record"):
+    ap.add_argument("--profile", choices=MODES, default=None, help="Profile the run with cProfile (cpu) or tracemalloc (alloc).")
+    ap.add_argument("--profile-out", default=None, help="Report path (default qasccs-cpu.prof / qasccs-alloc.txt).")
+    ap.add_argument("--profile-every", type=int, default=1, help=f"Only profile every Nth {unit} (1 = whole run).")
+
+def from_args(args: argparse.Namespace) -> Optional[Profiler]:
+    if not args.profile:
+        return None
+    return Profiler(args.profile, args.profile_out, args.profile_every)
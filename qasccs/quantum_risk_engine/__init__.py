@@ -1,4 +1,4 @@
 from .models import RiskRequest, RiskResponse
-from .policy import evaluate_risk
+from .policy import EvaluationContext, evaluate_risk
 
-__all__ = ["RiskRequest", "RiskResponse", "evaluate_risk"]
+__all__ = ["RiskRequest", "RiskResponse", "evaluate_risk", "EvaluationContext"]
@@ -1,16 +1,32 @@
-import argparse, json, sys
+import argparse, contextlib, json, sys
 from pydantic import ValidationError
+from qasccs import metrics, profiling
 from .models import RiskRequest
-from .policy import evaluate_risk
+from .policy import EvaluationContext, evaluate_risk
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] in ("import", "query"):
+        from .store import main as store_main
+        return store_main(sys.argv[1:])
     ap = argparse.ArgumentParser(description="Quantum Risk Engine (QASCS)")
     ap.add_argument("--algorithm", required=True)
     ap.add_argument("--data-lifetime-years", type=int, required=True)
     ap.add_argument("--data-classification", default="medium", choices=["low","medium","high","critical"])
     ap.add_argument("--scenario", default="moderate", choices=["conservative","moderate","aggressive"])
+    ap.add_argument("--as-of-year", type=int, default=None, help="Evaluate as of this year instead of the current one.")
+    ap.add_argument("--db", default=None, help="Also record the assessment in this SQLite store.")
+    ap.add_argument("--metrics-json", default=None, help="Write collected metrics as JSON to this path on exit.")
+    profiling.add_arguments(ap)
     args = ap.parse_args()
 
+    if args.metrics_json:
+        metrics.enable()
+    profiler = profiling.from_args(args)
+    sample = contextlib.nullcontext
+    if profiler is not None:
+        profiler.start().install_signal()
+        sample = profiler.sample
+
     try:
         req = RiskRequest(
             algorithm=args.algorithm,
@@ -18,11 +34,22 @@ def main():
             data_classification=args.data_classification,
             scenario=args.scenario,
         )
-        resp = evaluate_risk(req)
+        ctx = EvaluationContext.create(reference_year=args.as_of_year)
+        with sample():
+            resp = evaluate_risk(req, ctx)
         print(json.dumps(resp.model_dump(), indent=2))
+        if args.db:
+            from .store import ResultStore
+            with ResultStore(args.db) as store:
+                store.add(resp, req)
     except ValidationError as e:
         print(f"Validation error: {e}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+        if args.metrics_json:
+            metrics.JsonDumper(args.metrics_json).dump()
 
 if __name__ == "__main__":
     main()
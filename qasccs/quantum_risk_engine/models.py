@@ -1,5 +1,5 @@
 from __future__ import annotations
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Literal, Optional
 
 Algorithm = Literal[
@@ -21,6 +21,9 @@ class RiskRequest(BaseModel):
     scenario: Scenario = "moderate"
 
 class RiskResponse(BaseModel):
+    # Immutable so `evaluate_risk` can hand out shared instances.
+    model_config = ConfigDict(frozen=True)
+
     risk: Risk
     recommended_mode: Mode
     quantum_safe_until_year: int
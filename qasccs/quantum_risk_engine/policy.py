@@ -1,5 +1,10 @@
 from __future__ import annotations
+import sys
+from dataclasses import dataclass, field
 from datetime import datetime, UTC
+from functools import lru_cache
+from typing import Callable, Mapping, Optional
+from qasccs import metrics
 from .models import RiskRequest, RiskResponse
 
 # Tunable scenario model (for experiments; replace with rigorous estimates if needed).
@@ -9,6 +14,51 @@ SCENARIO_SHOR_YEAR = {
     "aggressive":   2032,
 }
 
+CLASSIFICATION_BUMP = {"low": 0, "medium": 0, "high": 1, "critical": 2}
+
+NOTES = "Scenario years are tunable for experimentation; not a real-world forecast."
+
+EVALUATIONS = metrics.counter("qasccs_risk_evaluations_total", "Risk evaluations by outcome")
+
+def utc_year() -> int:
+    return datetime.now(UTC).year
+
+@dataclass(frozen=True)
+class EvaluationContext:
+    """Everything `evaluate_risk` depends on besides the request.
+
+    Build one per batch (or per historic re-run, e.g. `create(reference_year=2030)`)
+    and pass it to every call: the clock is read once, a batch cannot straddle New
+    Year, and the context is hashable so it can key caches.
+    """
+    reference_year: int
+    scenario_shor_year: tuple[tuple[str, int], ...]
+    classification_bump: tuple[tuple[str, int], ...]
+    _shor: dict = field(init=False, repr=False, compare=False)
+    _bump: dict = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "_shor", dict(self.scenario_shor_year))
+        object.__setattr__(self, "_bump", dict(self.classification_bump))
+
+    @classmethod
+    def create(cls, reference_year: Optional[int] = None,
+               scenario_shor_year: Optional[Mapping[str, int]] = None,
+               classification_bump: Optional[Mapping[str, int]] = None,
+               clock: Callable[[], int] = utc_year) -> "EvaluationContext":
+        """Snapshot the module tables (or the given overrides) and the clock's year."""
+        return cls(
+            reference_year if reference_year is not None else clock(),
+            tuple(sorted((scenario_shor_year or SCENARIO_SHOR_YEAR).items())),
+            tuple(sorted((classification_bump or CLASSIFICATION_BUMP).items())),
+        )
+
+    def shor_year(self, scenario: str) -> int:
+        return self._shor[scenario]
+
+    def bump(self, classification: str) -> int:
+        return self._bump[classification]
+
 def _is_shor_vulnerable(alg: str) -> bool:
     return alg.startswith("RSA") or alg.startswith("ECC")
 
@@ -18,23 +68,35 @@ def _is_grover_relevant(alg: str) -> bool:
 def _is_pqc_or_hybrid(alg: str) -> bool:
     return alg.startswith("KYBER") or alg.startswith("DILITHIUM") or alg.startswith("HYBRID")
 
-def evaluate_risk(req: RiskRequest) -> RiskResponse:
-    now_year = datetime.now(UTC).year
-    shor_year = SCENARIO_SHOR_YEAR[req.scenario]
-    horizon_year = now_year + req.data_lifetime_years
+# There are only a few dozen distinct outcomes, so responses are frozen and shared:
+# identical decisions return the same instance (and the same interned rationale string).
+_RESPONSES: dict[tuple, RiskResponse] = {}
 
-    bump = {"low": 0, "medium": 0, "high": 1, "critical": 2}[req.data_classification]
+def _shared(risk: str, mode: str, safe_until: int, rationale: str) -> RiskResponse:
+    key = (risk, mode, safe_until, rationale)
+    resp = _RESPONSES.get(key)
+    if resp is None:
+        resp = _RESPONSES[key] = RiskResponse(
+            risk=risk,
+            recommended_mode=mode,
+            quantum_safe_until_year=safe_until,
+            rationale=sys.intern(rationale),
+            notes=NOTES,
+        )
+    return resp
 
+@lru_cache(maxsize=4096)
+def _decide(algorithm: str, horizon_year: int, shor_year: int, bump: int) -> RiskResponse:
     risk = "LOW"
     mode = "classical"
     rationale = []
 
-    if _is_pqc_or_hybrid(req.algorithm):
+    if _is_pqc_or_hybrid(algorithm):
         risk = "LOW" if bump < 2 else "MEDIUM"
-        mode = "hybrid" if req.algorithm == "HYBRID-ECDHE+KYBER" else "pqc"
+        mode = "hybrid" if algorithm == "HYBRID-ECDHE+KYBER" else "pqc"
         safe_until = horizon_year
         rationale.append("PQC/hybrid selected; modeled as quantum-resistant for the target lifetime.")
-    elif _is_shor_vulnerable(req.algorithm):
+    elif _is_shor_vulnerable(algorithm):
         if shor_year <= horizon_year:
             risk = "HIGH"
             mode = "hybrid"
@@ -45,9 +107,9 @@ def evaluate_risk(req: RiskRequest) -> RiskResponse:
             mode = "hybrid" if risk == "MEDIUM" else "classical"
             safe_until = horizon_year
             rationale.append(f"Shor year ({shor_year}) is after data lifetime; migration may still be needed for high/critical data.")
-    elif _is_grover_relevant(req.algorithm):
+    elif _is_grover_relevant(algorithm):
         safe_until = horizon_year
-        if req.algorithm == "AES-128":
+        if algorithm == "AES-128":
             risk = "MEDIUM" if bump >= 1 else "LOW"
             mode = "hybrid" if bump >= 1 else "classical"
             rationale.append("AES-128 modeled as ~64-bit vs Grover; avoid for high/critical long-term confidentiality.")
@@ -66,10 +128,15 @@ def evaluate_risk(req: RiskRequest) -> RiskResponse:
         mode = "hybrid"
         rationale.append("Critical classification elevates posture to hybrid.")
 
-    return RiskResponse(
-        risk=risk,
-        recommended_mode=mode,
-        quantum_safe_until_year=safe_until,
-        rationale=" ".join(rationale),
-        notes="Scenario years are tunable for experimentation; not a real-world forecast."
-    )
+    return _shared(risk, mode, safe_until, " ".join(rationale))
+
+def evaluate_risk(req: RiskRequest, ctx: Optional[EvaluationContext] = None) -> RiskResponse:
+    # Without a context the clock and the (tunable) module tables are read per call.
+    if ctx is None:
+        ctx = EvaluationContext.create()
+    # The decision cache is keyed on the context-derived inputs, so contexts that agree
+    # on them (e.g. different scenario tables, same Shor year) share entries.
+    resp = _decide(req.algorithm, ctx.reference_year + req.data_lifetime_years,
+                   ctx.shor_year(req.scenario), ctx.bump(req.data_classification))
+    EVALUATIONS.inc(risk=resp.risk)
+    return resp
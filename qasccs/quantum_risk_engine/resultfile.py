@@ -0,0 +1,341 @@
+"""
+Compact columnar binary format for stored `RiskResponse`s (".qrsk").
+
+Layout (little-endian):
+
+  header   magic "QRSK", u16 version, u16 flags, u64 rows,
+           u64 offsets of: risk, mode, year, rationale, notes, asset, asset data, strings
+  risk     u8  per row (index into RISKS)
+  mode     u8  per row (index into MODES)
+  year     i16 per row (quantum_safe_until_year)
+  rationale u32 per row (string table index)
+  notes    u32 per row (string table index, NONE for None)
+  asset    u32 per row: end of the row's asset id in asset data (optional; offset 0
+           when absent). Ids are UTF-8, back to back; an empty id means None.
+  strings  u32 count, then (u32 length, UTF-8 bytes) per string
+
+Rationale/notes strings repeat across rows, so they are interned once in the string
+table; a row costs 12 bytes (16 plus the id with asset ids). Asset ids are unique per
+row, so they are kept out of the string table and decoded only when a row asks for
+one. `ResultReader` memory-maps the file and filters on individual columns without
+materializing rows.
+"""
+from __future__ import annotations
+import argparse, json, mmap, struct, sys
+from array import array
+from typing import Iterable, Iterator, Optional
+
+from .models import RiskResponse
+
+MAGIC = b"QRSK"
+VERSION = 2
+RISKS = ("LOW", "MEDIUM", "HIGH")
+MODES = ("classical", "pqc", "hybrid")
+NONE = 0xFFFFFFFF
+
+_HEADER = struct.Struct("<4sHHQ8Q")
+_RISK_CODE = {r: i for i, r in enumerate(RISKS)}
+_MODE_CODE = {m: i for i, m in enumerate(MODES)}
+_LITTLE = sys.byteorder == "little"
+
+class ResultWriter:
+    """Buffer rows as typed columns (12-16 bytes/row) and write the file on close."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._risk = array("B")
+        self._mode = array("B")
+        self._year = array("h")
+        self._rationale = array("I")
+        self._notes = array("I")
+        self._asset = array("I")
+        self._asset_data = bytearray()
+        self._strings: list[str] = []
+        self._index: dict[str, int] = {}
+
+    def _intern(self, s: Optional[str]) -> int:
+        if s is None:
+            return NONE
+        i = self._index.get(s)
+        if i is None:
+            i = self._index[s] = len(self._strings)
+            self._strings.append(s)
+        return i
+
+    def append(self, resp: RiskResponse, asset: Optional[str] = None):
+        self._risk.append(_RISK_CODE[resp.risk])
+        self._mode.append(_MODE_CODE[resp.recommended_mode])
+        self._year.append(resp.quantum_safe_until_year)
+        self._rationale.append(self._intern(resp.rationale))
+        self._notes.append(self._intern(resp.notes))
+        if asset is not None or self._asset:
+            # Rows written before the first asset id get an empty one (read back as None).
+            self._asset.extend([len(self._asset_data)] * (len(self._risk) - 1 - len(self._asset)))
+            if asset:
+                self._asset_data += asset.encode("utf-8")
+                if len(self._asset_data) > NONE:
+                    raise ValueError("asset ids exceed 4 GiB")
+            self._asset.append(len(self._asset_data))
+
+    def extend(self, responses: Iterable[RiskResponse]):
+        for r in responses:
+            self.append(r)
+
+    def close(self):
+        cols = [self._risk, self._mode, self._year, self._rationale, self._notes]
+        if not _LITTLE:
+            for c in cols + [self._asset]:
+                c.byteswap()
+        with open(self.path, "wb") as f:
+            f.write(b"\0" * _HEADER.size)
+            offsets = []
+            for c in cols:
+                offsets.append(f.tell())
+                c.tofile(f)
+            if self._asset:
+                offsets.append(f.tell())
+                self._asset.tofile(f)
+                offsets.append(f.tell())
+                f.write(self._asset_data)
+            else:
+                offsets += [0, 0]
+            offsets.append(f.tell())
+            f.write(struct.pack("<I", len(self._strings)))
+            for s in self._strings:
+                b = s.encode("utf-8")
+                f.write(struct.pack("<I", len(b)))
+                f.write(b)
+            f.seek(0)
+            f.write(_HEADER.pack(MAGIC, VERSION, 0, len(self._risk), *offsets))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+
+class ResultReader:
+    """Memory-mapped reader; columns are zero-copy views into the file."""
+
+    def __init__(self, path: str):
+        self._f = open(path, "rb")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, rows, *offsets = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a QRSK result file")
+        if version != VERSION:
+            raise ValueError(f"{path}: unsupported QRSK version {version}")
+        self.rows = rows
+        o_risk, o_mode, o_year, o_rat, o_notes, o_asset, o_asset_data, o_str = offsets
+        self._code_offset = {"risk": o_risk, "mode": o_mode}
+        mv = memoryview(self._mm)
+        self.risk = mv[o_risk:o_risk + rows]
+        self.mode = mv[o_mode:o_mode + rows]
+        self.year = self._typed(mv[o_year:o_year + 2 * rows], "h")
+        self.rationale = self._typed(mv[o_rat:o_rat + 4 * rows], "I")
+        self.notes = self._typed(mv[o_notes:o_notes + 4 * rows], "I")
+        self.asset = self._typed(mv[o_asset:o_asset + 4 * rows], "I") if o_asset else None
+        self._asset_data = o_asset_data
+        self.strings = self._read_strings(o_str)
+
+    @staticmethod
+    def _typed(view: memoryview, code: str):
+        if _LITTLE:
+            return view.cast(code)
+        a = array(code, view.tobytes())
+        a.byteswap()
+        return a
+
+    def _read_strings(self, off: int) -> list[str]:
+        (n,) = struct.unpack_from("<I", self._mm, off)
+        off += 4
+        out = []
+        for _ in range(n):
+            (ln,) = struct.unpack_from("<I", self._mm, off)
+            off += 4
+            out.append(self._mm[off:off + ln].decode("utf-8"))
+            off += ln
+        return out
+
+    def close(self):
+        for attr in ("risk", "mode", "year", "rationale", "notes", "asset"):
+            v = getattr(self, attr, None)
+            if isinstance(v, memoryview):
+                v.release()
+        self._mm.close()
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __getitem__(self, i: int) -> RiskResponse:
+        if not 0 <= i < self.rows:
+            raise IndexError(i)
+        notes = self.notes[i]
+        return RiskResponse(
+            risk=RISKS[self.risk[i]],
+            recommended_mode=MODES[self.mode[i]],
+            quantum_safe_until_year=self.year[i],
+            rationale=self.strings[self.rationale[i]],
+            notes=None if notes == NONE else self.strings[notes],
+        )
+
+    def __iter__(self) -> Iterator[RiskResponse]:
+        for i in range(self.rows):
+            yield self[i]
+
+    def asset_id(self, i: int) -> Optional[str]:
+        if self.asset is None:
+            return None
+        if not 0 <= i < self.rows:
+            raise IndexError(i)
+        start = self.asset[i - 1] if i else 0
+        end = self.asset[i]
+        return self._mm[self._asset_data + start:self._asset_data + end].decode("utf-8") or None
+
+    def _code_positions(self, column: str, code: int) -> Iterator[int]:
+        # mmap.find runs in C, so rows that don't match cost nothing in Python.
+        needle = bytes((code,))
+        base = self._code_offset[column]
+        end = base + self.rows
+        i = self._mm.find(needle, base, end)
+        while i != -1:
+            yield i - base
+            i = self._mm.find(needle, i + 1, end)
+
+    def filter(self, risk: Optional[str] = None, mode: Optional[str] = None,
+               year_before: Optional[int] = None, year_from: Optional[int] = None) -> Iterator[int]:
+        """Yield row indices matching every given condition (year range is [from, before))."""
+        if risk is not None:
+            rows: Iterable[int] = self._code_positions("risk", _RISK_CODE[risk])
+        elif mode is not None:
+            rows = self._code_positions("mode", _MODE_CODE[mode])
+        else:
+            rows = range(self.rows)
+        mode_code = _MODE_CODE[mode] if mode is not None and risk is not None else None
+        year = self.year
+        for i in rows:
+            if mode_code is not None and self.mode[i] != mode_code:
+                continue
+            if year_before is not None and year[i] >= year_before:
+                continue
+            if year_from is not None and year[i] < year_from:
+                continue
+            yield i
+
+    def count(self, **filters) -> int:
+        return sum(1 for _ in self.filter(**filters))
+
+def write_results(path: str, responses: Iterable[RiskResponse]) -> int:
+    with ResultWriter(path) as w:
+        w.extend(responses)
+        return len(w._risk)
+
+def _iter_json(path: str, chunk: int = 1 << 16) -> Iterator[dict]:
+    """Accept a JSON object, a JSON array, or JSON lines; decoded one value at a time."""
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buf, pos, in_array = "", 0, None
+        while True:
+            # Skip whitespace, and the separators between array elements.
+            while pos < len(buf) and (buf[pos].isspace() or (in_array and buf[pos] in ",]")):
+                pos += 1
+            if pos == len(buf):
+                data = f.read(chunk)
+                if not data:
+                    return
+                buf, pos = data, 0
+                continue
+            if in_array is None:
+                in_array = buf[pos] == "["
+                pos += in_array
+                continue
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                data = f.read(chunk)
+                if not data:
+                    raise
+                buf, pos = buf[pos:] + data, 0
+                continue
+            yield value
+            pos = end
+
+def json_to_bin(src: str, dst: str) -> int:
+    """Convert RiskResponse JSON (object, array or lines; scanner and prober rows with an
+    "assessment" key are accepted too) to a .qrsk file. Returns rows written."""
+    with ResultWriter(dst) as w:
+        for d in _iter_json(src):
+            if "assessment" in d:
+                a = d["assessment"]
+                if a is None:
+                    continue
+                asset = d.get("path") or d.get("target")
+                if "risk" in a:
+                    w.append(RiskResponse(**a), asset=asset)
+                else:
+                    # Prober rows assess each component (certificate, key_exchange, cipher).
+                    for component, resp in a.items():
+                        w.append(RiskResponse(**resp), asset=f"{asset}#{component}")
+            else:
+                w.append(RiskResponse(**d), asset=d.get("asset"))
+        return len(w._risk)
+
+def bin_to_json(src: str, dst, lines: bool = True):
+    out = open(dst, "w", encoding="utf-8") if isinstance(dst, str) else dst
+    try:
+        with ResultReader(src) as r:
+            rows = (dict(r[i].model_dump(), **({"asset": r.asset_id(i)} if r.asset is not None else {}))
+                    for i in range(len(r)))
+            if lines:
+                for row in rows:
+                    out.write(json.dumps(row) + "\n")
+            else:
+                json.dump(list(rows), out, indent=2)
+    finally:
+        if out is not dst:
+            out.close()
+
+def main():
+    ap = argparse.ArgumentParser(description="QASCS compact result files (.qrsk)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("to-bin", help="Convert JSON / JSON lines to .qrsk")
+    p.add_argument("src")
+    p.add_argument("dst")
+    p = sub.add_parser("to-json", help="Convert .qrsk to JSON lines")
+    p.add_argument("src")
+    p.add_argument("dst", nargs="?", default=None)
+    p = sub.add_parser("filter", help="Print matching rows as JSON lines")
+    p.add_argument("src")
+    p.add_argument("--risk", choices=RISKS, default=None)
+    p.add_argument("--mode", choices=MODES, default=None)
+    p.add_argument("--year-before", type=int, default=None)
+    p.add_argument("--year-from", type=int, default=None)
+    p.add_argument("--count", action="store_true", help="Only print the number of matches.")
+    args = ap.parse_args()
+
+    if args.cmd == "to-bin":
+        print(json_to_bin(args.src, args.dst))
+    elif args.cmd == "to-json":
+        bin_to_json(args.src, args.dst or sys.stdout)
+    else:
+        with ResultReader(args.src) as r:
+            matches = r.filter(args.risk, args.mode, args.year_before, args.year_from)
+            if args.count:
+                print(sum(1 for _ in matches))
+                return
+            for i in matches:
+                row = r[i].model_dump()
+                if r.asset is not None:
+                    row["asset"] = r.asset_id(i)
+                sys.stdout.write(json.dumps(row) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+SQLite store for risk assessments (stdlib `sqlite3`).
+
+One row per assessed asset: the `RiskRequest` inputs (nullable when the source did
+not record them), the `RiskResponse` and, for certificates, the expiry. Rationale and
+notes strings repeat across rows and are interned in a side table. Inserts are
+buffered and written with `executemany` in large transactions; the database runs in
+WAL mode so queries can proceed while an import is running.
+
+Indexes cover the common fleet questions, e.g. "all HIGH ECC assets expiring before
+2035" is a range scan on (risk, algorithm, not_after).
+"""
+from __future__ import annotations
+import argparse, json, os, sqlite3, sys
+from typing import Iterable, Iterator, Optional
+
+from .models import RiskRequest, RiskResponse
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS texts (
+    id   INTEGER PRIMARY KEY,
+    text TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS assessments (
+    id                      INTEGER PRIMARY KEY,
+    asset                   TEXT,
+    algorithm               TEXT,
+    data_lifetime_years     INTEGER,
+    data_classification     TEXT,
+    scenario                TEXT,
+    risk                    TEXT NOT NULL,
+    recommended_mode        TEXT NOT NULL,
+    quantum_safe_until_year INTEGER NOT NULL,
+    rationale               INTEGER NOT NULL REFERENCES texts(id),
+    notes                   INTEGER REFERENCES texts(id),
+    not_after               TEXT
+);
+CREATE INDEX IF NOT EXISTS assessments_algorithm ON assessments(algorithm);
+CREATE INDEX IF NOT EXISTS assessments_risk ON assessments(risk, algorithm, not_after);
+CREATE INDEX IF NOT EXISTS assessments_safe_until ON assessments(quantum_safe_until_year);
+CREATE INDEX IF NOT EXISTS assessments_not_after ON assessments(not_after);
+CREATE INDEX IF NOT EXISTS assessments_asset ON assessments(asset);
+"""
+
+_INSERT = """INSERT INTO assessments(asset, algorithm, data_lifetime_years, data_classification, scenario,
+    risk, recommended_mode, quantum_safe_until_year, rationale, notes, not_after)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+_COLUMNS = ("asset", "algorithm", "data_lifetime_years", "data_classification", "scenario", "risk",
+            "recommended_mode", "quantum_safe_until_year", "rationale", "notes", "not_after")
+
+class ResultStore:
+    def __init__(self, path: str | os.PathLike, batch_size: int = 50_000):
+        self.path = os.fspath(path)
+        self.batch_size = batch_size
+        self._db = sqlite3.connect(self.path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._texts = dict(self._db.execute("SELECT text, id FROM texts"))
+        self._pending: list[tuple] = []
+
+    def _text_id(self, s: Optional[str]) -> Optional[int]:
+        if s is None:
+            return None
+        i = self._texts.get(s)
+        if i is None:
+            i = self._db.execute("INSERT INTO texts(text) VALUES (?)", (s,)).lastrowid
+            self._texts[s] = i
+        return i
+
+    def add(self, resp: RiskResponse, req: Optional[RiskRequest] = None, asset: Optional[str] = None,
+            algorithm: Optional[str] = None, not_after: Optional[str] = None):
+        """Buffer one assessment; written on the next `flush` (every `batch_size` rows)."""
+        self._pending.append((
+            asset,
+            req.algorithm if req is not None else algorithm,
+            req.data_lifetime_years if req is not None else None,
+            req.data_classification if req is not None else None,
+            req.scenario if req is not None else None,
+            resp.risk, resp.recommended_mode, resp.quantum_safe_until_year,
+            self._text_id(resp.rationale), self._text_id(resp.notes), not_after,
+        ))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        with self._db:
+            self._db.executemany(_INSERT, self._pending)
+        self._pending.clear()
+
+    def close(self):
+        self.flush()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM assessments").fetchone()[0] + len(self._pending)
+
+    def _where(self, risk=None, algorithm=None, mode=None, classification=None,
+               safe_until_before=None, expires_before=None) -> tuple[str, list]:
+        clauses, params = [], []
+        if risk is not None:
+            clauses.append("a.risk = ?")
+            params.append(risk)
+        if algorithm is not None:
+            # Prefix match ("ECC" -> ECC-P256, ECC-P384); GLOB is case-sensitive and indexable.
+            clauses.append("a.algorithm GLOB ?")
+            params.append(algorithm.replace("[", "[[]") + "*")
+        if mode is not None:
+            clauses.append("a.recommended_mode = ?")
+            params.append(mode)
+        if classification is not None:
+            clauses.append("a.data_classification = ?")
+            params.append(classification)
+        if safe_until_before is not None:
+            clauses.append("a.quantum_safe_until_year < ?")
+            params.append(safe_until_before)
+        if expires_before is not None:
+            clauses.append("a.not_after < ?")
+            params.append(f"{expires_before:04d}-01-01")
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, limit: Optional[int] = None, **filters) -> Iterator[dict]:
+        """Yield matching assessments as dicts, earliest safe-until year first."""
+        self.flush()
+        where, params = self._where(**filters)
+        sql = ("SELECT a.asset, a.algorithm, a.data_lifetime_years, a.data_classification, a.scenario, a.risk,"
+               " a.recommended_mode, a.quantum_safe_until_year, r.text, n.text, a.not_after"
+               " FROM assessments a JOIN texts r ON r.id = a.rationale LEFT JOIN texts n ON n.id = a.notes"
+               + where + " ORDER BY a.quantum_safe_until_year, a.id")
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        for row in self._db.execute(sql, params):
+            yield dict(zip(_COLUMNS, row))
+
+    def count(self, **filters) -> int:
+        self.flush()
+        where, params = self._where(**filters)
+        return self._db.execute("SELECT COUNT(*) FROM assessments a" + where, params).fetchone()[0]
+
+    def import_rows(self, rows: Iterable[dict]) -> int:
+        """Store scan/probe JSON rows or bare RiskResponse dicts; returns rows stored."""
+        from qasccs.inventory.report import assessments
+        n = 0
+        for a in assessments(rows):
+            self.add(a.resp, asset=a.asset, algorithm=a.algorithm, not_after=a.not_after)
+            n += 1
+        self.flush()
+        return n
+
+def _add_filters(p: argparse.ArgumentParser):
+    p.add_argument("--risk", choices=["LOW", "MEDIUM", "HIGH"], default=None)
+    p.add_argument("--algorithm", default=None, help="Algorithm or family prefix, e.g. ECC or RSA-2048.")
+    p.add_argument("--mode", choices=["classical", "pqc", "hybrid"], default=None)
+    p.add_argument("--data-classification", choices=["low","medium","high","critical"], default=None)
+    p.add_argument("--safe-until-before", type=int, default=None)
+    p.add_argument("--expires-before", type=int, default=None, help="Certificate expiry year bound.")
+
+def main(argv: Optional[list[str]] = None):
+    ap = argparse.ArgumentParser(prog="qasccs risk", description="Query/import the QASCS assessment store")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("import", help="Import scan/probe JSON lines into the store")
+    p.add_argument("input", nargs="?", default="-", help="JSON lines or array ('-' for stdin)")
+    p.add_argument("--db", required=True)
+    p = sub.add_parser("query", help="Print matching assessments as JSON lines")
+    p.add_argument("--db", required=True)
+    p.add_argument("--limit", type=int, default=None)
+    p.add_argument("--count", action="store_true", help="Only print the number of matches.")
+    _add_filters(p)
+    args = ap.parse_args(argv)
+
+    with ResultStore(args.db) as store:
+        if args.cmd == "import":
+            from qasccs.inventory.report import iter_rows
+            print(store.import_rows(iter_rows(args.input)))
+            return
+        filters = dict(risk=args.risk, algorithm=args.algorithm, mode=args.mode,
+                       classification=args.data_classification,
+                       safe_until_before=args.safe_until_before, expires_before=args.expires_before)
+        if args.count:
+            print(store.count(**filters))
+            return
+        for row in store.query(limit=args.limit, **filters):
+            sys.stdout.write(json.dumps(row) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Encrypted at-rest archive of channel payloads.
+
+Frames are appended to segment files (`<segment:08d>.qarc`) in a directory. Each
+segment starts with a header carrying a random salt; the segment key is derived from
+the archive key with HKDF, so the AEAD nonce can simply be the record counter.
+
+  segment  magic "QARC", u8 version, u8 cipher, 2 pad, 16-byte salt
+  record   u32 ciphertext length, u8 flags, ciphertext (AEAD, tag appended)
+
+A frame larger than `chunk_size` is split into several records (flags FIRST/LAST);
+the first record's plaintext starts with (u64 timestamp_ns, u32 connection id). The
+AAD binds the segment header, the record counter and the flags, so records cannot
+be reordered, moved between segments or have their flags flipped. A rotated
+segment ends with an empty END record; a missing END means the writer stopped
+(the reader then stops at the last complete record, also skipping a torn or
+zero-filled tail record in the newest segment).
+
+Durability uses group commit: appends only write to the page cache, and one
+committer thread fsyncs whatever has accumulated every `commit_interval` seconds.
+`durable(seq)` returns a future that resolves once record `seq` is on disk.
+Replay memory-maps each segment and decrypts records straight out of the mapping.
+"""
+from __future__ import annotations
+import argparse, mmap, os, struct, sys, threading, time
+from concurrent.futures import Future
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+from qasccs import metrics
+
+MAGIC = b"QARC"
+VERSION = 1
+CIPHERS = {"aes-256-gcm": (1, AESGCM), "chacha20-poly1305": (2, ChaCha20Poly1305)}
+_CIPHER_BY_ID = {cid: cls for cid, cls in CIPHERS.values()}
+KEY_SIZE = 32
+FIRST, LAST, END = 1, 2, 4
+SUFFIX = ".qarc"
+
+_SEGMENT = struct.Struct("<4sBB2x16s")
+_RECORD = struct.Struct("<IB")
+_META = struct.Struct("<QI")
+_AAD = struct.Struct("<QB")
+
+ARCHIVED_BYTES = metrics.counter("qasccs_archive_bytes_total", "Plaintext payload bytes archived")
+COMMITS = metrics.counter("qasccs_archive_commits_total", "Archive group commits (fsync calls)")
+COMMIT_TIME = metrics.histogram("qasccs_archive_fsync_seconds", "Archive fsync duration")
+
+@dataclass
+class ArchivedFrame:
+    segment: int
+    timestamp_ns: int
+    conn: int
+    data: bytes
+
+def load_key(path: str | os.PathLike, create: bool = False) -> bytes:
+    """Read a 32-byte archive key (raw or hex); optionally create it (mode 0600)."""
+    p = Path(path)
+    if create and not p.exists():
+        fd = os.open(p, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(os.urandom(KEY_SIZE).hex() + "\n")
+    raw = p.read_bytes()
+    key = raw if len(raw) == KEY_SIZE else bytes.fromhex(raw.decode("ascii").strip())
+    if len(key) != KEY_SIZE:
+        raise ValueError(f"{path}: archive key must be {KEY_SIZE} bytes")
+    return key
+
+def _segment_aead(key: bytes, header: bytes, cipher_id: int):
+    salt = header[-16:]
+    seg_key = HKDF(hashes.SHA256(), KEY_SIZE, salt, b"qasccs-archive-segment").derive(key)
+    return _CIPHER_BY_ID[cipher_id](seg_key)
+
+def _nonce(counter: int) -> bytes:
+    return counter.to_bytes(12, "big")
+
+def _segments(directory: Path) -> list[tuple[int, Path]]:
+    out = []
+    for p in directory.glob("*" + SUFFIX):
+        if p.stem.isdigit():
+            out.append((int(p.stem), p))
+    return sorted(out)
+
+class ArchiveWriter:
+    def __init__(self, directory: str | os.PathLike, key: bytes, cipher: str = "aes-256-gcm",
+                 segment_bytes: int = 64 << 20, chunk_size: int = 64 << 10, commit_interval: float = 0.005):
+        if len(key) != KEY_SIZE:
+            raise ValueError(f"archive key must be {KEY_SIZE} bytes")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.key = key
+        self.cipher_id = CIPHERS[cipher][0]
+        self.segment_bytes = segment_bytes
+        self.chunk_size = chunk_size
+        self.commit_interval = commit_interval
+        self._cond = threading.Condition()
+        self._seq = 0              # frames appended by this writer
+        self._synced = 0           # frames known to be on disk
+        self._waiters: deque[tuple[int, Future]] = deque()
+        self._closed = False
+        existing = _segments(self.directory)
+        self.segment = existing[-1][0] + 1 if existing else 0
+        self._open_segment()
+        self._committer = threading.Thread(target=self._commit_loop, name="qasccs-archive", daemon=True)
+        self._committer.start()
+
+    def _open_segment(self):
+        header = _SEGMENT.pack(MAGIC, VERSION, self.cipher_id, os.urandom(16))
+        while True:
+            try:
+                self._f = open(self.directory / f"{self.segment:08d}{SUFFIX}", "xb", buffering=1 << 20)
+                break
+            except FileExistsError:
+                # Another writer (e.g. the other server process during a handoff) took it.
+                self.segment += 1
+        self._f.write(header)
+        self._header = header
+        self._aead = _segment_aead(self.key, header, self.cipher_id)
+        self._counter = 0
+        self._size = len(header)
+
+    def _record(self, flags: int, plaintext: bytes):
+        aad = self._header + _AAD.pack(self._counter, flags)
+        ct = self._aead.encrypt(_nonce(self._counter), plaintext, aad)
+        self._f.write(_RECORD.pack(len(ct), flags))
+        self._f.write(ct)
+        self._counter += 1
+        self._size += _RECORD.size + len(ct)
+
+    def _rotate(self):
+        self._record(END, b"")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._f.close()
+        self._synced = self._seq
+        self._resolve()
+        self.segment += 1
+        self._open_segment()
+
+    def append(self, data: bytes, conn: int = 0, timestamp_ns: Optional[int] = None) -> int:
+        """Encrypt and buffer one frame; returns its sequence number for `durable`."""
+        meta = _META.pack(time.time_ns() if timestamp_ns is None else timestamp_ns, conn)
+        view = memoryview(data)
+        with self._cond:
+            if self._closed:
+                raise ValueError("archive is closed")
+            if self._size >= self.segment_bytes:
+                self._rotate()
+            n = max(1, -(-len(view) // self.chunk_size))
+            for i in range(n):
+                chunk = view[i * self.chunk_size:(i + 1) * self.chunk_size]
+                flags = (FIRST if i == 0 else 0) | (LAST if i == n - 1 else 0)
+                self._record(flags, meta + chunk if i == 0 else bytes(chunk))
+            self._seq += 1
+            seq = self._seq
+            self._cond.notify()
+        ARCHIVED_BYTES.inc(len(data))
+        return seq
+
+    def durable(self, seq: int) -> Future:
+        """Future resolved once frame `seq` has been fsynced."""
+        fut: Future = Future()
+        with self._cond:
+            if seq <= self._synced:
+                fut.set_result(seq)
+            else:
+                self._waiters.append((seq, fut))
+                self._cond.notify()
+        return fut
+
+    def _resolve(self):
+        while self._waiters and self._waiters[0][0] <= self._synced:
+            _, fut = self._waiters.popleft()
+            fut.set_result(self._synced)
+
+    def _commit_loop(self):
+        while True:
+            with self._cond:
+                while self._seq == self._synced and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+            # Let concurrent appends pile up, then pay for one fsync for all of them.
+            time.sleep(self.commit_interval)
+            with self._cond:
+                if self._closed:
+                    return
+                target = self._seq
+                self._f.flush()
+                fd = os.dup(self._f.fileno())
+            t0 = time.perf_counter()
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            COMMIT_TIME.observe(time.perf_counter() - t0)
+            COMMITS.inc()
+            with self._cond:
+                self._synced = max(self._synced, target)
+                self._resolve()
+
+    def sync(self):
+        with self._cond:
+            self._f.flush()
+            os.fsync(self._f.fileno())
+            self._synced = self._seq
+            self._resolve()
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._committer.join()
+        with self._cond:
+            self._record(END, b"")
+            self._f.flush()
+            os.fsync(self._f.fileno())
+            self._f.close()
+            self._synced = self._seq
+            self._resolve()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def read_segment(path: str | os.PathLike, key: bytes, segment: int = 0,
+                 newest: bool = True) -> Iterator[ArchivedFrame]:
+    """Decrypt one segment through `mmap`; stops quietly at a torn tail record.
+
+    A crash between write and fsync can leave a last record that is cut short, zeroed
+    or zero-padded. In the `newest` segment a record that fails authentication with
+    nothing but zeros after it is treated as such a tail; anywhere else it raises.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < _SEGMENT.size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, version, cipher_id, _ = _SEGMENT.unpack_from(mm, 0)
+            if magic != MAGIC or version != VERSION or cipher_id not in _CIPHER_BY_ID:
+                raise ValueError(f"{path}: not a QARC segment")
+            header = mm[:_SEGMENT.size]
+            aead = _segment_aead(key, header, cipher_id)
+            off, counter, end = _SEGMENT.size, 0, len(mm)
+            meta, parts = None, []
+            while off + _RECORD.size <= end:
+                n, flags = _RECORD.unpack_from(mm, off)
+                start = off + _RECORD.size
+                if start + n > end:
+                    break
+                try:
+                    pt = aead.decrypt(_nonce(counter), mm[start:start + n], header + _AAD.pack(counter, flags))
+                except InvalidTag:
+                    if newest and not mm[start + n:end].strip(b"\0"):
+                        break
+                    raise ValueError(f"{path}: record {counter} failed authentication") from None
+                off, counter = start + n, counter + 1
+                if flags & END:
+                    break
+                if flags & FIRST:
+                    meta, parts = _META.unpack_from(pt, 0), [pt[_META.size:]]
+                else:
+                    parts.append(pt)
+                if flags & LAST and meta is not None:
+                    yield ArchivedFrame(segment, meta[0], meta[1], b"".join(parts))
+                    meta, parts = None, []
+
+def replay(directory: str | os.PathLike, key: bytes) -> Iterator[ArchivedFrame]:
+    """Yield every archived frame in write order."""
+    segments = _segments(Path(directory))
+    for i, (segment, path) in enumerate(segments):
+        yield from read_segment(path, key, segment, newest=i == len(segments) - 1)
+
+def main():
+    ap = argparse.ArgumentParser(description="Replay a QASCS payload archive")
+    ap.add_argument("directory")
+    ap.add_argument("--key-file", required=True)
+    ap.add_argument("--raw", action="store_true", help="Write payload bytes only, without headers.")
+    args = ap.parse_args()
+
+    key = load_key(args.key_file)
+    out = sys.stdout.buffer
+    for fr in replay(args.directory, key):
+        if not args.raw:
+            out.write(f"# segment={fr.segment} conn={fr.conn} ts_ns={fr.timestamp_ns} len={len(fr.data)}\n".encode())
+        out.write(fr.data)
+        if not args.raw:
+            out.write(b"\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Certificate hot reload with pre-validated chains.
+
+`load_context` checks a cert/key pair before any handshake sees it: the key matches
+the leaf, every certificate in the chain is within its validity period, and the chain
+verifies to `ca`. Only then is an `SSLContext` built.
+
+`CertWatcher` polls the files from a background thread and swaps in a new context
+when they change and pass validation. Handshakes go through `front`, a context whose
+`sni_callback` redirects each connection to the current one, so a rotation costs the
+request path nothing and a bad rotation (half-written files, mismatched key, wrong CA)
+leaves the last good certificates in service:
+
+    python -m qasccs.secure_channel.certwatch server.crt server.key --ca ca.crt
+"""
+from __future__ import annotations
+import argparse, datetime, json, logging, ssl, threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+from cryptography import x509
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from qasccs import metrics
+from .common import make_server_context
+
+log = logging.getLogger("qasccs.certwatch")
+
+RELOADS = metrics.counter("qasccs_cert_reloads_total", "Certificate rotations picked up, by outcome")
+NOT_AFTER = metrics.gauge("qasccs_cert_not_after_seconds", "Expiry (Unix time) of the certificate in service")
+
+class CertificateError(ValueError):
+    """A certificate/key pair that must not be put into service."""
+
+@dataclass
+class CertInfo:
+    subject: str
+    issuer: str
+    not_after: datetime.datetime
+    fingerprint: str
+
+def _spki(public_key) -> bytes:
+    return public_key.public_bytes(serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo)
+
+def validate(certfile, keyfile, ca=None, now: Optional[datetime.datetime] = None) -> CertInfo:
+    """Check a cert chain and key; raises `CertificateError` describing the first problem."""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    try:
+        chain = x509.load_pem_x509_certificates(Path(certfile).read_bytes())
+        key = serialization.load_pem_private_key(Path(keyfile).read_bytes(), password=None)
+        roots = x509.load_pem_x509_certificates(Path(ca).read_bytes()) if ca is not None else []
+    except (OSError, ValueError, TypeError) as e:
+        raise CertificateError(f"cannot load: {e}") from None
+    leaf = chain[0]
+    if _spki(key.public_key()) != _spki(leaf.public_key()):
+        raise CertificateError("private key does not match the certificate")
+    for cert in chain:
+        if not cert.not_valid_before_utc <= now <= cert.not_valid_after_utc:
+            raise CertificateError(f"{cert.subject.rfc4514_string()} is not valid now "
+                                   f"({cert.not_valid_before_utc:%Y-%m-%d} .. {cert.not_valid_after_utc:%Y-%m-%d})")
+    if roots:
+        for cert, issuer in zip(chain, chain[1:] + [None]):
+            if not any(_issued_by(cert, c) for c in ([issuer] if issuer is not None else roots)):
+                raise CertificateError(f"{cert.subject.rfc4514_string()} does not chain to the CA")
+    return CertInfo(leaf.subject.rfc4514_string(), leaf.issuer.rfc4514_string(), leaf.not_valid_after_utc,
+                    leaf.fingerprint(hashes.SHA256()).hex())
+
+def _issued_by(cert: x509.Certificate, issuer: x509.Certificate) -> bool:
+    try:
+        cert.verify_directly_issued_by(issuer)
+        return True
+    except (ValueError, TypeError, InvalidSignature):
+        return False
+
+def load_context(certfile, keyfile, ca=None,
+                 factory: Callable[..., ssl.SSLContext] = make_server_context) -> ssl.SSLContext:
+    """`validate`, then build the server context (usable as `SecureServer(context_factory=...)`)."""
+    info = validate(certfile, keyfile, ca)
+    try:
+        ctx = factory(certfile, keyfile)
+    except (OSError, ssl.SSLError) as e:
+        raise CertificateError(f"cannot build context: {e}") from None
+    NOT_AFTER.set(info.not_after.timestamp())
+    return ctx
+
+class CertWatcher:
+    """Serve the newest valid certificates from `certfile`/`keyfile` via `front`."""
+
+    def __init__(self, certfile, keyfile, ca=None, interval: float = 2.0,
+                 factory: Callable[..., ssl.SSLContext] = make_server_context):
+        self.paths = [Path(certfile), Path(keyfile)] + ([Path(ca)] if ca is not None else [])
+        self.certfile, self.keyfile, self.ca = certfile, keyfile, ca
+        self.interval = interval
+        self._factory = factory
+        self._stamp = self._stat()
+        self.ctx = load_context(certfile, keyfile, ca, factory)   # fail fast at startup
+        self.front = factory(certfile, keyfile)
+        self.front.sni_callback = self._select
+        self.swaps = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _select(self, sslobj, server_name, front):
+        sslobj.context = self.ctx
+
+    def _stat(self):
+        stamp = []
+        for p in self.paths:
+            try:
+                st = p.stat()
+                stamp.append((st.st_ino, st.st_size, st.st_mtime_ns))
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def check(self, force: bool = False) -> bool:
+        """Reload if the files changed (or `force`); True when a new context went into service."""
+        with self._lock:
+            stamp = self._stat()
+            if stamp == self._stamp and not force:
+                return False
+            self._stamp = stamp
+            try:
+                ctx = load_context(self.certfile, self.keyfile, self.ca, self._factory)
+            except CertificateError as e:
+                RELOADS.inc(outcome="invalid")
+                log.error("Rejected new certificates, keeping the current ones: %s", e)
+                return False
+            self.ctx = ctx
+            self.swaps += 1
+        RELOADS.inc(outcome="ok")
+        log.info("Certificates reloaded from %s", self.certfile)
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                log.exception("Certificate check failed")
+
+    def start(self) -> "CertWatcher":
+        self._thread = threading.Thread(target=self._run, name="qasccs-certwatch", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main():
+    ap = argparse.ArgumentParser(description="Validate a server certificate/key pair before rotating it in")
+    ap.add_argument("cert")
+    ap.add_argument("key")
+    ap.add_argument("--ca", default=None, help="CA the chain must verify to.")
+    args = ap.parse_args()
+    try:
+        info = validate(args.cert, args.key, args.ca)
+    except CertificateError as e:
+        raise SystemExit(f"[certwatch] INVALID: {e}")
+    print(json.dumps({"subject": info.subject, "issuer": info.issuer, "not_after": info.not_after.isoformat(),
+                      "fingerprint": info.fingerprint}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,29 @@
 from __future__ import annotations
-import argparse, socket
+import argparse, asyncio, socket, ssl, time
+from qasccs import metrics
 from qasccs.quantum_risk_engine.models import RiskRequest
 from qasccs.quantum_risk_engine.policy import evaluate_risk
+from . import compression, hybrid, protocol
 from .common import make_client_context
 
+HANDSHAKE = metrics.histogram("qasccs_tls_handshake_seconds", "TLS handshake duration")
+BYTES_OUT = metrics.counter("qasccs_client_bytes_out_total", "Application bytes sent")
+BYTES_IN = metrics.counter("qasccs_client_bytes_in_total", "Application bytes received")
+TLS_ERRORS = metrics.counter("qasccs_tls_errors_total", "TLS errors")
+
+async def _framed_exchange(args, ctx: ssl.SSLContext, kem) -> str:
+    t0 = time.perf_counter()
+    ch = await protocol.open_channel(args.host, args.port, ctx, kem=kem, compressor=compression.from_args(args))
+    HANDSHAKE.observe(time.perf_counter() - t0, role="client")
+    try:
+        payload = args.message.encode("utf-8")
+        frames, n = await protocol.request(ch, payload)
+        BYTES_OUT.inc(len(payload))
+        mode = f"hybrid, {kem}" if kem else "framed"
+        return f"ACK ({mode}): frame {frames}, {n} bytes"
+    finally:
+        ch.close()
+
 def main():
     ap = argparse.ArgumentParser(description="QASCS Secure Client (quantum-aware policy + TLS demo)")
     ap.add_argument("--host", default="127.0.0.1")
@@ -13,6 +33,11 @@ def main():
     ap.add_argument("--scenario", default="moderate", choices=["conservative","moderate","aggressive"])
     ap.add_argument("--algorithm", default="ECC-P256", help="Crypto used today (default ECC-P256).")
     ap.add_argument("--message", default="hello from QASCS")
+    ap.add_argument("--protocol", default="auto", choices=["auto", "raw", "framed"],
+                    help="auto: framed with the application-layer hybrid exchange when policy says pqc/hybrid, else raw.")
+    ap.add_argument("--kem", default=None, choices=hybrid.available_kems(),
+                    help="KEM for the hybrid exchange (default: ML-KEM-768 if liboqs is installed, else a stand-in).")
+    compression.add_arguments(ap)
     args = ap.parse_args()
 
     req = RiskRequest(
@@ -27,15 +52,42 @@ def main():
     print(f"         risk={resp.risk}, recommended_mode={resp.recommended_mode}, quantum_safe_until={resp.quantum_safe_until_year}")
     print(f"         rationale={resp.rationale}")
 
-    if resp.recommended_mode in ("pqc", "hybrid"):
-        print("[client] NOTE: PQC/hybrid enforcement needs OQS-OpenSSL (see docs/pqc-integration.md). Proceeding with classical TLS demo.")
-
+    wants_hybrid = resp.recommended_mode in ("pqc", "hybrid")
+    use_framed = args.protocol == "framed" or (args.protocol == "auto" and wants_hybrid)
     ctx = make_client_context()
 
+    if use_framed:
+        kem = (args.kem or hybrid.default_kem_name()) if wants_hybrid or args.kem else None
+        if kem is not None:
+            print(f"[client] Enforcing {resp.recommended_mode} with an application-layer X25519+{kem} exchange over TLS.")
+            if kem != "ML-KEM-768":
+                print("[client] NOTE: liboqs not installed; the KEM half is a classical stand-in (see docs/pqc-integration.md).")
+        try:
+            reply = asyncio.run(_framed_exchange(args, ctx, kem))
+        except ssl.SSLError:
+            TLS_ERRORS.inc(role="client")
+            raise
+        print(f"[client] Server replied: {reply}")
+        return
+
+    if wants_hybrid:
+        print("[client] NOTE: PQC/hybrid enforcement needs OQS-OpenSSL (see docs/pqc-integration.md). Proceeding with classical TLS demo.")
+
     with socket.create_connection((args.host, args.port), timeout=5) as sock:
-        with ctx.wrap_socket(sock, server_hostname=args.host) as tls:
-            tls.sendall(args.message.encode("utf-8"))
-            reply = tls.recv(4096).decode("utf-8", errors="replace")
+        t0 = time.perf_counter()
+        try:
+            tls = ctx.wrap_socket(sock, server_hostname=args.host)
+        except ssl.SSLError:
+            TLS_ERRORS.inc(role="client")
+            raise
+        HANDSHAKE.observe(time.perf_counter() - t0, role="client")
+        with tls:
+            payload = args.message.encode("utf-8")
+            tls.sendall(payload)
+            BYTES_OUT.inc(len(payload))
+            data = tls.recv(4096)
+            BYTES_IN.inc(len(data))
+            reply = data.decode("utf-8", errors="replace")
             print(f"[client] Server replied: {reply}")
 
 if __name__ == "__main__":
@@ -7,10 +7,10 @@ SERVER_CERT = CERT_DIR / "server.crt"
 SERVER_KEY = CERT_DIR / "server.key"
 CA_CERT = CERT_DIR / "ca.crt"
 
-def make_server_context() -> ssl.SSLContext:
+def make_server_context(certfile=None, keyfile=None) -> ssl.SSLContext:
     ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
     ctx.minimum_version = ssl.TLSVersion.TLSv1_2
-    ctx.load_cert_chain(certfile=str(SERVER_CERT), keyfile=str(SERVER_KEY))
+    ctx.load_cert_chain(certfile=str(certfile or SERVER_CERT), keyfile=str(keyfile or SERVER_KEY))
     return ctx
 
 def make_client_context() -> ssl.SSLContext:
@@ -0,0 +1,283 @@
+"""
+Application-layer hybrid key exchange inside an established TLS channel.
+
+Python's `ssl` cannot negotiate PQC groups, so a channel whose policy says
+`recommended_mode="hybrid"` runs one extra exchange over TLS:
+
+  client -> server   KEX: X25519 public key || KEM public key
+  server -> client   KEX: X25519 public key || KEM ciphertext
+
+Both sides feed X25519 shared secret || KEM shared secret into HKDF-SHA256 (salted with
+a hash of the transcript) and derive one ChaCha20-Poly1305 key per direction. Frames
+are then sealed with counter nonces, so the session stays confidential as long as
+*either* X25519 or the KEM holds.
+
+KEMs are pluggable (`kem_for`):
+
+  ML-KEM-768     liboqs-python (`oqs`) when installed
+  x448-standin   DHKEM over X448: a classical stand-in with the KEM interface, so the
+                 plumbing runs anywhere (like the classical stand-ins in tools.pqc_tls)
+  stub           no security at all; deterministic and fast, for tests
+
+Ephemeral keypairs are taken from a `KeypairPool` (a `qasccs.keyfactory` pool) so key
+generation stays off the handshake path.
+"""
+from __future__ import annotations
+import argparse, hashlib, json, os, statistics, time
+from dataclasses import dataclass
+from typing import Optional
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import x448, x25519
+from cryptography.hazmat.primitives.ciphers.aead import ChaCha20Poly1305
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+from qasccs.keyfactory import KeyFactory
+
+X25519_LEN = 32
+_RAW = (serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+_LABEL = b"qasccs-hybrid-v1"
+
+def oqs_kem_available(alg: str = "ML-KEM-768") -> bool:
+    try:
+        import oqs
+    except ImportError:
+        return False
+    return alg in oqs.get_enabled_kem_mechanisms()
+
+class StubKEM:
+    """Insecure placeholder KEM (the shared secret is derivable from public data)."""
+    name = "stub"
+
+    def generate_keypair(self) -> tuple[bytes, bytes]:
+        sk = os.urandom(32)
+        return hashlib.sha256(sk).digest(), sk
+
+    def encapsulate(self, pk: bytes) -> tuple[bytes, bytes]:
+        ct = os.urandom(32)
+        return ct, hashlib.sha256(pk + ct).digest()
+
+    def decapsulate(self, sk: bytes, ct: bytes) -> bytes:
+        return hashlib.sha256(hashlib.sha256(sk).digest() + ct).digest()
+
+class X448StandInKEM:
+    """DHKEM(X448): classical, but with the encapsulate/decapsulate shape of ML-KEM."""
+    name = "x448-standin"
+
+    def generate_keypair(self) -> tuple[bytes, bytes]:
+        sk = x448.X448PrivateKey.generate()
+        return sk.public_key().public_bytes(*_RAW), sk.private_bytes_raw()
+
+    def _derive(self, dh: bytes, ct: bytes, pk: bytes) -> bytes:
+        return HKDF(hashes.SHA256(), 32, None, b"x448-standin" + ct + pk).derive(dh)
+
+    def encapsulate(self, pk: bytes) -> tuple[bytes, bytes]:
+        eph = x448.X448PrivateKey.generate()
+        ct = eph.public_key().public_bytes(*_RAW)
+        return ct, self._derive(eph.exchange(x448.X448PublicKey.from_public_bytes(pk)), ct, pk)
+
+    def decapsulate(self, sk: bytes, ct: bytes) -> bytes:
+        priv = x448.X448PrivateKey.from_private_bytes(sk)
+        pk = priv.public_key().public_bytes(*_RAW)
+        return self._derive(priv.exchange(x448.X448PublicKey.from_public_bytes(ct)), ct, pk)
+
+class OQSKEM:
+    def __init__(self, alg: str = "ML-KEM-768"):
+        import oqs
+        self._oqs = oqs
+        self.name = alg
+
+    def generate_keypair(self) -> tuple[bytes, bytes]:
+        with self._oqs.KeyEncapsulation(self.name) as k:
+            pk = k.generate_keypair()
+            return pk, k.export_secret_key()
+
+    def encapsulate(self, pk: bytes) -> tuple[bytes, bytes]:
+        with self._oqs.KeyEncapsulation(self.name) as k:
+            return k.encap_secret(pk)
+
+    def decapsulate(self, sk: bytes, ct: bytes) -> bytes:
+        with self._oqs.KeyEncapsulation(self.name, secret_key=sk) as k:
+            return k.decap_secret(ct)
+
+def default_kem_name() -> str:
+    return "ML-KEM-768" if oqs_kem_available() else X448StandInKEM.name
+
+def kem_for(name: Optional[str] = None):
+    name = name or default_kem_name()
+    if name == StubKEM.name:
+        return StubKEM()
+    if name == X448StandInKEM.name:
+        return X448StandInKEM()
+    if oqs_kem_available(name):
+        return OQSKEM(name)
+    raise ValueError(f"KEM {name!r} is not available")
+
+def available_kems() -> list[str]:
+    names = [X448StandInKEM.name, StubKEM.name]
+    if oqs_kem_available():
+        names.insert(0, "ML-KEM-768")
+    return names
+
+@dataclass
+class Keypair:
+    x25519: x25519.X25519PrivateKey
+    x25519_public: bytes
+    kem_public: Optional[bytes] = None
+    kem_secret: Optional[bytes] = None
+
+def generate_keypair(kem=None) -> Keypair:
+    """One ephemeral X25519 key plus, for the initiator, a KEM keypair."""
+    priv = x25519.X25519PrivateKey.generate()
+    kp = Keypair(priv, priv.public_key().public_bytes(*_RAW))
+    if kem is not None:
+        kp.kem_public, kp.kem_secret = kem.generate_keypair()
+    return kp
+
+class KeypairPool:
+    """Pre-generated ephemeral keypairs, kept in a `KeyFactory` pool.
+
+    `get()` pops a ready keypair (O(1)); when the pool is empty it falls back to
+    generating inline, which the factory counts as starvation. Keypairs are single use.
+    Pass a shared `factory` to refill several pools from the same workers.
+    """
+
+    def __init__(self, kem=None, size: int = 32, factory: Optional[KeyFactory] = None):
+        if size < 1:
+            raise ValueError("KeypairPool size must be at least 1")
+        self.kem = kem
+        self.size = size
+        self.name = f"hybrid-{kem.name}" if kem is not None else "hybrid-x25519"
+        self._own = factory is None
+        self.factory = factory or KeyFactory()
+        self.factory.register(self.name, lambda: generate_keypair(kem), low=min(max(1, size // 4), size - 1), high=size)
+
+    def start(self) -> "KeypairPool":
+        if self._own:
+            self.factory.start()
+        return self
+
+    def get(self) -> Keypair:
+        return self.factory.get(self.name)
+
+    @property
+    def misses(self) -> int:
+        return self.factory.stats()[self.name]["starved"]
+
+    def __len__(self) -> int:
+        return self.factory.depth(self.name)
+
+    def close(self):
+        if self._own:
+            self.factory.close()
+
+class Sealer:
+    """ChaCha20-Poly1305 in one direction with a 96-bit counter nonce."""
+
+    def __init__(self, key: bytes):
+        self._aead = ChaCha20Poly1305(key)
+        self._counter = 0
+
+    def _nonce(self) -> bytes:
+        n = self._counter
+        self._counter += 1
+        return n.to_bytes(12, "big")
+
+    def seal(self, plaintext: bytes, aad: bytes = b"") -> bytes:
+        return self._aead.encrypt(self._nonce(), plaintext, aad)
+
+    def open(self, ciphertext: bytes, aad: bytes = b"") -> bytes:
+        try:
+            return self._aead.decrypt(self._nonce(), ciphertext, aad)
+        except InvalidTag:
+            raise ValueError("sealed frame failed authentication") from None
+
+@dataclass
+class SessionKeys:
+    client_to_server: bytes
+    server_to_client: bytes
+
+    def sealers(self, initiator: bool) -> tuple[Sealer, Sealer]:
+        """(outbound, inbound) sealers for this side."""
+        if initiator:
+            return Sealer(self.client_to_server), Sealer(self.server_to_client)
+        return Sealer(self.server_to_client), Sealer(self.client_to_server)
+
+def _schedule(kem_name: str, client_msg: bytes, server_msg: bytes, dh: bytes, kem_ss: bytes) -> SessionKeys:
+    transcript = hashlib.sha256(_LABEL + kem_name.encode() + b"\0" + client_msg + server_msg).digest()
+    okm = HKDF(hashes.SHA256(), 64, transcript, _LABEL + b" keys").derive(dh + kem_ss)
+    return SessionKeys(okm[:32], okm[32:])
+
+def client_start(kem, kp: Optional[Keypair] = None) -> tuple[Keypair, bytes]:
+    """Return (state, KEX body) for the initiator."""
+    kp = kp or generate_keypair(kem)
+    return kp, kp.x25519_public + kp.kem_public
+
+def client_finish(kem, kp: Keypair, client_msg: bytes, server_msg: bytes) -> SessionKeys:
+    if len(server_msg) <= X25519_LEN:
+        raise ValueError("malformed KEX reply")
+    peer = x25519.X25519PublicKey.from_public_bytes(server_msg[:X25519_LEN])
+    kem_ss = kem.decapsulate(kp.kem_secret, server_msg[X25519_LEN:])
+    return _schedule(kem.name, client_msg, server_msg, kp.x25519.exchange(peer), kem_ss)
+
+def server_respond(kem, client_msg: bytes, kp: Optional[Keypair] = None) -> tuple[bytes, SessionKeys]:
+    """Return (KEX reply body, session keys) for the responder."""
+    if len(client_msg) <= X25519_LEN:
+        raise ValueError("malformed KEX")
+    kp = kp or generate_keypair()
+    peer = x25519.X25519PublicKey.from_public_bytes(client_msg[:X25519_LEN])
+    ct, kem_ss = kem.encapsulate(client_msg[X25519_LEN:])
+    reply = kp.x25519_public + ct
+    return reply, _schedule(kem.name, client_msg, reply, kp.x25519.exchange(peer), kem_ss)
+
+def _timed(fn, n: int) -> list[float]:
+    out = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t0)
+    return out
+
+def benchmark(kem_name: Optional[str] = None, n: int = 200, payload: int = 1024) -> dict:
+    """Per-operation cost of the hybrid layer, in microseconds (median / p99)."""
+    kem = kem_for(kem_name)
+    pool = KeypairPool(kem, size=n).start()
+    server_pool = KeypairPool(None, size=n).start()
+    while len(pool) < n or len(server_pool) < n:
+        time.sleep(0.01)
+
+    def handshake(client_kp=None, server_kp=None):
+        kp, msg = client_start(kem, client_kp)
+        reply, _ = server_respond(kem, msg, server_kp)
+        client_finish(kem, kp, msg, reply)
+
+    sealer = Sealer(os.urandom(32))
+    data = os.urandom(payload)
+    results = {
+        "keygen": _timed(lambda: generate_keypair(kem), n),
+        "handshake_inline_keygen": _timed(handshake, n),
+        "handshake_pooled": _timed(lambda: handshake(pool.get(), server_pool.get()), n),
+        f"seal_{payload}B": _timed(lambda: sealer.seal(data), n),
+    }
+    pool.close()
+    server_pool.close()
+
+    def summary(xs):
+        xs = sorted(xs)
+        return {"median_us": round(statistics.median(xs) * 1e6, 1),
+                "p99_us": round(xs[min(len(xs) - 1, int(0.99 * len(xs)))] * 1e6, 1)}
+    return {"kem": kem.name, "n": n, **{k: summary(v) for k, v in results.items()}}
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the QASCS hybrid key exchange layer")
+    ap.add_argument("--kem", default=None, choices=available_kems())
+    ap.add_argument("-n", type=int, default=200)
+    ap.add_argument("--payload", type=int, default=1024)
+    args = ap.parse_args()
+    if args.n < 1:
+        ap.error("-n must be at least 1")
+    print(json.dumps(benchmark(args.kem, args.n, args.payload), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,438 @@
+"""
+Async load generator for the secure channel (capacity planning).
+
+Arrival models:
+  open   -- requests arrive on a schedule (constant or Poisson rate) regardless of
+            how fast the server answers; latency is measured from the *intended*
+            send time, so queueing delay is not hidden (coordinated omission).
+  closed -- N workers each send the next request as soon as the previous one returns.
+            With --expected-interval-ms, HDR-style correction back-fills the
+            samples a stalled worker failed to issue.
+"""
+from __future__ import annotations
+import argparse, asyncio, csv, json, os, random, re, ssl, time
+from dataclasses import dataclass, field, asdict
+from typing import Optional
+
+from . import compression, hybrid, mux, protocol, tuning
+from .common import make_client_context
+from .tuning import TransportTuning
+
+PERCENTILES = (50.0, 90.0, 99.0, 99.9, 99.99, 100.0)
+_RAW_ACK = re.compile(rb"ACK \(secure\): (\d+) bytes")
+
+class LatencyHistogram:
+    """Log-linear histogram (HDR-style): relative error ~ 2**-precision_bits, values in microseconds."""
+
+    def __init__(self, precision_bits: int = 7):
+        self.precision_bits = precision_bits
+        self.counts: dict[int, int] = {}
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def _index(self, v: int) -> int:
+        shift = max(0, v.bit_length() - self.precision_bits)
+        return (shift << 32) | (v >> shift)
+
+    @staticmethod
+    def _value(idx: int) -> int:
+        shift, sub = idx >> 32, idx & 0xFFFFFFFF
+        # Upper edge of the bucket, so percentiles never under-report.
+        return ((sub + 1) << shift) - 1 if shift else sub
+
+    def record(self, value_us: int, count: int = 1):
+        v = max(0, int(value_us))
+        i = self._index(v)
+        self.counts[i] = self.counts.get(i, 0) + count
+        self.total += count
+        self.min = v if self.min is None else min(self.min, v)
+        self.max = max(self.max, v)
+
+    def record_corrected(self, value_us: int, expected_interval_us: int):
+        """Record `value_us` plus the samples a stalled sender would have issued every interval."""
+        self.record(value_us)
+        if expected_interval_us <= 0:
+            return
+        missing = value_us - expected_interval_us
+        while missing >= expected_interval_us:
+            self.record(missing)
+            missing -= expected_interval_us
+
+    def merge(self, other: "LatencyHistogram"):
+        for i, c in other.counts.items():
+            self.counts[i] = self.counts.get(i, 0) + c
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p: float) -> int:
+        if not self.total:
+            return 0
+        target = max(1, int(round(self.total * p / 100.0)))
+        seen = 0
+        for i in sorted(self.counts):
+            seen += self.counts[i]
+            if seen >= target:
+                return min(self._value(i), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.total,
+            "min_us": self.min or 0,
+            "max_us": self.max,
+            **{f"p{p:g}_us": self.percentile(p) for p in PERCENTILES},
+        }
+
+@dataclass
+class LoadConfig:
+    host: str = "127.0.0.1"
+    port: int = 8443
+    server_hostname: str = "localhost"
+    model: str = "closed"              # open | closed
+    arrival: str = "constant"          # constant | poisson (open model)
+    rate: float = 100.0                # requests/s (open model)
+    concurrency: int = 4               # workers (closed) / connection cap (open + reuse)
+    duration: float = 5.0              # seconds
+    requests: Optional[int] = None     # stop after N requests instead of duration
+    message_sizes: list[int] = field(default_factory=lambda: [64])
+    reuse: bool = True                 # keep connections open vs. new connection per request
+    timeout: float = 5.0
+    expected_interval_ms: Optional[float] = None
+    max_in_flight: int = 10000         # open model: arrivals beyond this are dropped
+    seed: Optional[int] = None
+    protocol: str = "raw"              # raw | framed | hybrid (framed + application-layer key exchange)
+    kem: Optional[str] = None          # hybrid: KEM name (default: best available)
+    mux_connections: int = 0           # framed/hybrid: run sessions as streams over this many connections
+    pipeline: int = 1                  # framed/hybrid: frames in flight per connection (shared by sessions)
+    compression: bool = False          # framed/hybrid: offer per-frame compression (built-in dictionary)
+    payload_file: Optional[str] = None # send lines of this file instead of random bytes
+    transport: TransportTuning = field(default_factory=TransportTuning)
+    server_metrics: Optional[str] = None  # server /metrics URL; its transport settings go in the result
+
+@dataclass
+class LoadResult:
+    config: LoadConfig
+    elapsed: float = 0.0
+    completed: int = 0
+    errors: int = 0
+    dropped: int = 0
+    connections: int = 0
+    bytes_sent: int = 0
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    service: LatencyHistogram = field(default_factory=LatencyHistogram)
+    server_transport: Optional[dict] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "config": asdict(self.config),
+            "elapsed_s": self.elapsed,
+            "completed": self.completed,
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "connections": self.connections,
+            "bytes_sent": self.bytes_sent,
+            "throughput_rps": self.completed / self.elapsed if self.elapsed else 0.0,
+            "latency": self.latency.summary(),
+            "service_time": self.service.summary(),
+            "transport": {"client": self.config.transport.describe(), "server": self.server_transport},
+        }
+
+    def write_json(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def write_csv(self, path: str):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["percentile", "latency_us", "service_time_us"])
+            for p in PERCENTILES:
+                w.writerow([p, self.latency.percentile(p), self.service.percentile(p)])
+
+class _Conn:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader, self.writer = reader, writer
+
+    async def request(self, payload: bytes) -> bytes:
+        """Send `payload` and wait until the ACKs cover all of it.
+
+        The raw server ACKs each read (up to 4096 bytes), so a large payload gets
+        several ACKs, which may arrive split or coalesced.
+        """
+        self.writer.write(payload)
+        await self.writer.drain()
+        reply, acked, pos = b"", 0, 0
+        while acked < len(payload):
+            data = await self.reader.read(4096)
+            if not data:
+                raise ConnectionError("server closed connection")
+            reply += data
+            for m in _RAW_ACK.finditer(reply, pos):
+                acked += int(m.group(1))
+                pos = m.end()
+        return reply
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except (OSError, ssl.SSLError):
+            pass
+
+class _FramedConn:
+    def __init__(self, ch: protocol.Channel):
+        self.ch = ch
+
+    async def request(self, payload: bytes) -> bytes:
+        return protocol.ACK_BODY.pack(*await protocol.request(self.ch, payload))
+
+    async def close(self):
+        self.ch.close()
+        try:
+            await self.ch.writer.wait_closed()
+        except (OSError, ssl.SSLError):
+            pass
+
+class _PipelinedConn:
+    def __init__(self, ch: protocol.Channel, depth: int):
+        self.pipe = protocol.Pipeline(ch, depth)
+
+    async def request(self, payload: bytes) -> bytes:
+        return protocol.ACK_BODY.pack(*await (await self.pipe.send(payload)))
+
+    async def close(self):
+        try:
+            await self.pipe.close()
+        except (OSError, ssl.SSLError, ConnectionError, protocol.ProtocolError):
+            pass
+
+class _StreamConn:
+    def __init__(self, stream: mux.Stream):
+        self.stream = stream
+
+    async def request(self, payload: bytes) -> bytes:
+        return protocol.ACK_BODY.pack(*await self.stream.request(payload))
+
+    async def close(self):
+        try:
+            await self.stream.close()
+        except ConnectionError:
+            pass
+
+class LoadGenerator:
+    def __init__(self, cfg: LoadConfig, ctx: Optional[ssl.SSLContext] = None):
+        self.cfg = cfg
+        self.ctx = ctx or make_client_context()
+        self.result = LoadResult(cfg)
+        self._rng = random.Random(cfg.seed)
+        by_size = {n: os.urandom(n) for n in cfg.message_sizes}
+        self._payloads = [by_size[n] for n in cfg.message_sizes]
+        if cfg.payload_file:
+            with open(cfg.payload_file, "rb") as f:
+                self._payloads = [line.rstrip(b"\n") for line in f if line.strip()]
+        self._compressor = compression.Compressor() if cfg.compression else None
+        self._idle: list[_Conn] = []
+        self._conn_slots = asyncio.Semaphore(cfg.concurrency)
+        self._in_flight = 0
+        self._kem = (cfg.kem or hybrid.default_kem_name()) if cfg.protocol == "hybrid" else None
+        self._keypool = None
+        self._mux: Optional[mux.MuxPool] = None
+        self._pipelined = cfg.pipeline > 1 and cfg.protocol != "raw" and not cfg.mux_connections
+        self._pipes: list[_PipelinedConn] = []
+        self._pipes_lock = asyncio.Lock()
+        self._next_pipe = 0
+
+    async def _connect(self):
+        if self._mux is not None:
+            return _StreamConn(await self._mux.open_stream())
+        if self.cfg.protocol == "raw":
+            r, w = await asyncio.open_connection(self.cfg.host, self.cfg.port, ssl=self.ctx,
+                                                 server_hostname=self.cfg.server_hostname)
+            self.cfg.transport.apply(w.transport)
+            conn = _Conn(r, w)
+        else:
+            ch = await protocol.open_channel(self.cfg.host, self.cfg.port, self.ctx, self.cfg.server_hostname,
+                                             self._kem, self._keypool, compressor=self._compressor,
+                                             tuning=self.cfg.transport)
+            conn = _PipelinedConn(ch, self.cfg.pipeline) if self._pipelined else _FramedConn(ch)
+        self.result.connections += 1
+        return conn
+
+    async def _checkout(self):
+        if self._pipelined:
+            # Sessions share ceil(concurrency / pipeline) connections, round robin.
+            async with self._pipes_lock:
+                if len(self._pipes) < -(-self.cfg.concurrency // self.cfg.pipeline):
+                    self._pipes.append(await asyncio.wait_for(self._connect(), self.cfg.timeout))
+                self._next_pipe = (self._next_pipe + 1) % len(self._pipes)
+                return self._pipes[self._next_pipe]
+        if self.cfg.reuse and self._idle:
+            return self._idle.pop()
+        return await asyncio.wait_for(self._connect(), self.cfg.timeout)
+
+    async def _checkin(self, conn):
+        if self._pipelined:
+            return
+        if self.cfg.reuse:
+            self._idle.append(conn)
+        else:
+            await conn.close()
+
+    async def _discard(self, conn):
+        if conn in self._pipes:
+            self._pipes.remove(conn)
+        await conn.close()
+
+    async def _one(self, intended: float):
+        """Issue one request; latency counts from `intended`, service time from actual send."""
+        payload = self._rng.choice(self._payloads)
+        conn = None
+        async with self._conn_slots:
+            try:
+                conn = await self._checkout()
+                start = time.perf_counter()
+                await asyncio.wait_for(conn.request(payload), self.cfg.timeout)
+                done = time.perf_counter()
+            except (OSError, ssl.SSLError, asyncio.TimeoutError, ConnectionError, protocol.ProtocolError):
+                self.result.errors += 1
+                if conn is not None:
+                    await self._discard(conn)
+                return
+            await self._checkin(conn)
+        res = self.result
+        res.completed += 1
+        res.bytes_sent += len(payload)
+        res.service.record(int((done - start) * 1e6))
+        lat = int((done - intended) * 1e6)
+        if self.cfg.expected_interval_ms and self.cfg.model == "closed":
+            res.latency.record_corrected(lat, int(self.cfg.expected_interval_ms * 1e3))
+        else:
+            res.latency.record(lat)
+
+    def _budget(self):
+        deadline = time.perf_counter() + self.cfg.duration
+        issued = 0
+        while time.perf_counter() < deadline and (self.cfg.requests is None or issued < self.cfg.requests):
+            yield issued
+            issued += 1
+
+    async def _closed_worker(self, counter):
+        for _ in counter:
+            await self._one(time.perf_counter())
+
+    async def _run_closed(self):
+        counter = self._budget()
+        await asyncio.gather(*(self._closed_worker(counter) for _ in range(self.cfg.concurrency)))
+
+    async def _run_open(self):
+        tasks = set()
+        next_at = time.perf_counter()
+        for _ in self._budget():
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self._in_flight >= self.cfg.max_in_flight:
+                self.result.dropped += 1
+            else:
+                t = asyncio.create_task(self._tracked(next_at))
+                tasks.add(t)
+                t.add_done_callback(tasks.discard)
+            gap = 1.0 / self.cfg.rate
+            next_at += self._rng.expovariate(self.cfg.rate) if self.cfg.arrival == "poisson" else gap
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def _tracked(self, intended: float):
+        self._in_flight += 1
+        try:
+            await self._one(intended)
+        finally:
+            self._in_flight -= 1
+
+    async def run(self) -> LoadResult:
+        if self._kem is not None:
+            self._keypool = hybrid.KeypairPool(hybrid.kem_for(self._kem), size=max(8, self.cfg.concurrency)).start()
+        if self.cfg.mux_connections and self.cfg.protocol != "raw":
+            self._mux = mux.MuxPool(self.cfg.host, self.cfg.port, self.ctx, self.cfg.mux_connections,
+                                    self.cfg.server_hostname, self._kem, self._keypool, self._compressor,
+                                    self.cfg.transport)
+        t0 = time.perf_counter()
+        try:
+            if self.cfg.model == "open":
+                await self._run_open()
+            else:
+                await self._run_closed()
+        finally:
+            while self._idle:
+                await self._idle.pop().close()
+            while self._pipes:
+                await self._pipes.pop().close()
+            if self._mux is not None:
+                await self._mux.close()
+                self.result.connections = self._mux.opened
+            if self._keypool is not None:
+                self._keypool.close()
+        self.result.elapsed = time.perf_counter() - t0
+        return self.result
+
+def run_load(cfg: LoadConfig, ctx: Optional[ssl.SSLContext] = None) -> LoadResult:
+    result = cfg.transport.run(LoadGenerator(cfg, ctx).run())
+    if cfg.server_metrics:
+        try:
+            result.server_transport = tuning.fetch_server_tuning(cfg.server_metrics)
+        except OSError as e:
+            result.server_transport = {"error": str(e)}
+    return result
+
+def main():
+    ap = argparse.ArgumentParser(description="QASCS secure channel load generator")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8443)
+    ap.add_argument("--server-hostname", default="localhost")
+    ap.add_argument("--model", default="closed", choices=["open", "closed"])
+    ap.add_argument("--arrival", default="constant", choices=["constant", "poisson"])
+    ap.add_argument("--rate", type=float, default=100.0, help="Open model: requests per second.")
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--duration", type=float, default=5.0)
+    ap.add_argument("--requests", type=int, default=None)
+    ap.add_argument("--message-size", type=int, nargs="+", default=[64])
+    ap.add_argument("--new-connection-per-request", action="store_true")
+    ap.add_argument("--timeout", type=float, default=5.0)
+    ap.add_argument("--expected-interval-ms", type=float, default=None)
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--protocol", default="raw", choices=["raw", "framed", "hybrid"])
+    ap.add_argument("--kem", default=None, choices=hybrid.available_kems())
+    ap.add_argument("--mux-connections", type=int, default=0,
+                    help="framed/hybrid: multiplex the sessions as streams over this many connections.")
+    ap.add_argument("--pipeline", type=int, default=1,
+                    help="framed/hybrid: frames in flight per connection; sessions share the connections.")
+    ap.add_argument("--compression", action="store_true", help="framed/hybrid: offer per-frame compression.")
+    ap.add_argument("--payload-file", default=None, help="Send the lines of this file as payloads (e.g. JSON lines).")
+    tuning.add_arguments(ap, server=False)
+    ap.add_argument("--server-metrics", default=None,
+                    help="Server metrics URL (e.g. http://127.0.0.1:9464/metrics) to record its transport settings.")
+    ap.add_argument("--json", dest="json_out", default=None)
+    ap.add_argument("--csv", dest="csv_out", default=None)
+    args = ap.parse_args()
+
+    cfg = LoadConfig(
+        host=args.host, port=args.port, server_hostname=args.server_hostname,
+        model=args.model, arrival=args.arrival, rate=args.rate, concurrency=args.concurrency,
+        duration=args.duration, requests=args.requests, message_sizes=args.message_size,
+        reuse=not args.new_connection_per_request, timeout=args.timeout,
+        expected_interval_ms=args.expected_interval_ms, seed=args.seed,
+        protocol=args.protocol, kem=args.kem, mux_connections=args.mux_connections,
+        pipeline=args.pipeline, compression=args.compression, payload_file=args.payload_file,
+        transport=tuning.from_args(args), server_metrics=args.server_metrics,
+    )
+    result = run_load(cfg)
+    if args.json_out:
+        result.write_json(args.json_out)
+    if args.csv_out:
+        result.write_csv(args.csv_out)
+    print(json.dumps(result.to_dict(), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+"""
+Many logical streams over one framed connection.
+
+After a HELLO with `"mux": true`, every DATA frame carries a non-zero stream id. Streams
+are opened by the client implicitly (first DATA on a new id) and closed with a CLOSE
+frame on that id; the server answers with its own CLOSE once the stream's queued frames
+are processed, after which the id may be reused. CLOSE on stream 0 ends the connection.
+
+Flow control is per stream and counted in DATA payload bytes. Each stream starts with
+the `window` the server announced; the sender spends credit on every DATA frame and may
+not exceed it, and the server returns credit with a WINDOW frame once it has processed
+a frame. A stalled stream therefore only blocks itself; the others keep their credit.
+
+The client writer schedules streams with deficit round robin (`quantum` bytes per turn),
+so a stream sending large frames cannot starve streams sending small ones.
+"""
+from __future__ import annotations
+import asyncio, contextlib, itertools
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+from qasccs import metrics
+from . import hybrid, protocol
+from .compression import Compressor
+from .tuning import TransportTuning
+
+DEFAULT_WINDOW = 256 << 10
+DEFAULT_MAX_STREAMS = 1024
+MAX_STREAM_ID = 0xFFFF
+
+STREAMS = metrics.gauge("qasccs_mux_streams", "Open multiplexed streams, by role")
+WINDOW_STALLS = metrics.counter("qasccs_mux_window_stalls_total", "Sends that waited for flow-control credit")
+
+class Stream:
+    """One logical session: ordered DATA frames, each acknowledged on the same stream."""
+
+    def __init__(self, conn: "MuxConnection", sid: int, window: int):
+        self.id = sid
+        self.credit = window
+        self._conn = conn
+        self._pending: deque[tuple[int, bytes]] = deque()
+        self._acks: deque[tuple[int, asyncio.Future]] = deque()
+        self.sent = 0
+        self._credit_changed = asyncio.Event()
+        self._closed = asyncio.get_running_loop().create_future()
+        self._closing = False
+        self.deficit = 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._pending)
+
+    async def send(self, payload: bytes) -> asyncio.Future:
+        """Queue one DATA frame once credit allows; returns a future for its ACK body."""
+        if self._closing:
+            raise ConnectionError(f"stream {self.id} is closed")
+        if len(payload) > self._conn.window:
+            raise ValueError(f"{len(payload)}-byte frame exceeds the {self._conn.window}-byte stream window")
+        if self.credit < len(payload):
+            WINDOW_STALLS.inc()
+            while self.credit < len(payload):
+                self._conn._check()
+                self._credit_changed.clear()
+                await self._credit_changed.wait()
+        self._conn._check()
+        self.credit -= len(payload)
+        self.sent += 1
+        ack = asyncio.get_running_loop().create_future()
+        self._acks.append((self.sent, ack))
+        self._conn._enqueue(self, protocol.DATA, payload)
+        return ack
+
+    async def request(self, payload: bytes) -> tuple[int, int]:
+        """Send one frame and wait for its ACK; returns (frames acknowledged, bytes)."""
+        return await (await self.send(payload))
+
+    async def close(self):
+        """Close the stream after its queued frames; waits for the server's CLOSE."""
+        if not self._closing:
+            self._closing = True
+            self._conn._enqueue(self, protocol.CLOSE, b"")
+        await asyncio.shield(self._closed)
+
+    def _on_credit(self, n: int):
+        self.credit += n
+        self._credit_changed.set()
+
+    def _fail(self, exc: BaseException):
+        while self._acks:
+            _, fut = self._acks.popleft()
+            if not fut.done():
+                fut.set_exception(exc)
+                fut.exception()
+        if not self._closed.done():
+            self._closed.set_exception(exc)
+            self._closed.exception()          # mark retrieved; awaiting callers still see it
+        self._credit_changed.set()
+
+class MuxConnection:
+    """Client side of a multiplexed channel (see `open_mux`)."""
+
+    def __init__(self, ch: protocol.Channel, quantum: int = 16 << 10):
+        if ch.mux is None:
+            raise protocol.ProtocolError("channel was not opened with multiplexing")
+        self.ch = ch
+        self.window = int(ch.mux["window"])
+        self.max_streams = int(ch.mux["max_streams"])
+        self.quantum = quantum
+        self._streams: dict[int, Stream] = {}
+        self._ids = itertools.cycle(range(1, MAX_STREAM_ID + 1))
+        self._active: deque[Stream] = deque()
+        self._wake = asyncio.Event()
+        self._error: Optional[BaseException] = None
+        self._tasks = [asyncio.create_task(self._read_loop()), asyncio.create_task(self._write_loop())]
+
+    def __len__(self) -> int:
+        return len(self._streams)
+
+    def _check(self):
+        if self._error is not None:
+            raise ConnectionError("multiplexed connection failed") from self._error
+
+    def open_stream(self) -> Stream:
+        self._check()
+        if len(self._streams) >= min(self.max_streams, MAX_STREAM_ID):
+            raise protocol.ProtocolError(f"stream limit ({self.max_streams}) reached")
+        sid = next(self._ids)
+        while sid in self._streams:
+            sid = next(self._ids)
+        s = self._streams[sid] = Stream(self, sid, self.window)
+        STREAMS.inc(role="client")
+        return s
+
+    def _enqueue(self, stream: Stream, ftype: int, payload: bytes):
+        if not stream._pending:
+            self._active.append(stream)
+        stream._pending.append((ftype, payload))
+        self._wake.set()
+
+    async def _write_loop(self):
+        try:
+            while True:
+                if not self._active:
+                    self._wake.clear()
+                    await self._wake.wait()
+                    continue
+                # Deficit round robin: each turn adds `quantum` bytes of allowance; a stream
+                # loses what it has left once its queue is empty.
+                stream = self._active.popleft()
+                stream.deficit += self.quantum
+                while stream._pending:
+                    ftype, payload = stream._pending[0]
+                    if len(payload) > stream.deficit:
+                        break
+                    stream._pending.popleft()
+                    stream.deficit -= len(payload)
+                    self.ch.send(ftype, payload, stream=stream.id)
+                if stream._pending:
+                    self._active.append(stream)
+                else:
+                    stream.deficit = 0
+                await self.ch.drain()
+        except Exception as e:
+            self._fail(e)
+
+    async def _read_loop(self):
+        try:
+            while True:
+                fr = await self.ch.recv()
+                if fr is None or (fr.type == protocol.CLOSE and fr.stream == 0):
+                    raise ConnectionError("server closed the connection")
+                stream = self._streams.get(fr.stream)
+                if stream is None:
+                    continue
+                if fr.type == protocol.ACK:
+                    ack = protocol.ACK_BODY.unpack(fr.payload)
+                    if not stream._acks or ack[0] < stream._acks[0][0]:
+                        raise protocol.ProtocolError(f"unexpected ACK on stream {fr.stream}")
+                    while stream._acks and stream._acks[0][0] <= ack[0]:
+                        _, fut = stream._acks.popleft()
+                        if not fut.done():
+                            fut.set_result(ack)
+                elif fr.type == protocol.WINDOW:
+                    stream._on_credit(protocol.WINDOW_BODY.unpack(fr.payload)[0])
+                elif fr.type == protocol.CLOSE:
+                    del self._streams[fr.stream]
+                    STREAMS.dec(role="client")
+                    if not stream._closed.done():
+                        stream._closed.set_result(None)
+                    stream._fail(ConnectionError(f"stream {fr.stream} closed"))
+                else:
+                    raise protocol.ProtocolError(f"unexpected frame type {fr.type}")
+        except Exception as e:
+            self._fail(e)
+
+    def _fail(self, exc: BaseException):
+        if self._error is None:
+            self._error = exc
+        for s in list(self._streams.values()):
+            s._fail(exc)
+        STREAMS.dec(len(self._streams), role="client")
+        self._streams.clear()
+
+    async def close(self):
+        """Close every stream, then the connection."""
+        if self._error is None:
+            with contextlib.suppress(ConnectionError):
+                await asyncio.gather(*(s.close() for s in list(self._streams.values())))
+            if self._error is None:
+                self.ch.send(protocol.CLOSE)
+                with contextlib.suppress(ConnectionError):
+                    await self.ch.drain()
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._fail(ConnectionError("connection closed"))
+        self.ch.close()
+
+async def open_mux(host: str, port: int, ctx, server_hostname: Optional[str] = None,
+                   kem: Optional[str] = None, pool: Optional[hybrid.KeypairPool] = None,
+                   quantum: int = 16 << 10, compressor: Optional[Compressor] = None,
+                   tuning: Optional[TransportTuning] = None) -> MuxConnection:
+    ch = await protocol.open_channel(host, port, ctx, server_hostname, kem, pool, mux=True,
+                                     compressor=compressor, tuning=tuning)
+    return MuxConnection(ch, quantum)
+
+class MuxPool:
+    """A handful of multiplexed connections; `open_stream` uses the least loaded one."""
+
+    def __init__(self, host: str, port: int, ctx, connections: int = 4, server_hostname: Optional[str] = None,
+                 kem: Optional[str] = None, pool: Optional[hybrid.KeypairPool] = None,
+                 compressor: Optional[Compressor] = None, tuning: Optional[TransportTuning] = None):
+        self.host, self.port, self.ctx = host, port, ctx
+        self.server_hostname = server_hostname
+        self.size = connections
+        self.kem = kem
+        self.keypool = pool
+        self.compressor = compressor
+        self.tuning = tuning
+        self.connections: list[MuxConnection] = []
+        self.opened = 0
+        self._lock = asyncio.Lock()
+
+    async def _connect(self) -> MuxConnection:
+        self.opened += 1
+        return await open_mux(self.host, self.port, self.ctx, self.server_hostname, self.kem, self.keypool,
+                              compressor=self.compressor, tuning=self.tuning)
+
+    async def open_stream(self) -> Stream:
+        async with self._lock:
+            self.connections = [c for c in self.connections if c._error is None]
+            if len(self.connections) < self.size:
+                self.connections.append(await self._connect())
+            conn = min(self.connections, key=len)
+        return conn.open_stream()
+
+    async def close(self):
+        await asyncio.gather(*(c.close() for c in self.connections), return_exceptions=True)
+        self.connections.clear()
+
+async def serve(ch: protocol.Channel, handle: Callable[[int, list[bytes]], Awaitable[None]],
+                recv: Optional[Callable[[], Awaitable[Optional[protocol.Frame]]]] = None):
+    """Server side: run `handle(stream, payloads)` on each stream's DATA until the client leaves.
+
+    Frames of one stream are handled in order by that stream's own task, so a slow
+    stream holds back only itself. Each task takes every frame queued for its stream
+    as one batch, then sends one cumulative ACK and returns the batch's credit.
+    `recv` defaults to `ch.recv` (pass a wrapper to apply timeouts).
+    """
+    window, max_streams = ch.mux["window"], ch.mux["max_streams"]
+    recv = recv or ch.recv
+    queues: dict[int, asyncio.Queue] = {}
+    buffered: dict[int, int] = {}
+    tasks: dict[int, asyncio.Task] = {}
+    errors: list[BaseException] = []
+
+    async def worker(sid: int, q: asyncio.Queue):
+        received, closing = 0, False
+        while not closing:
+            batch, item = [], await q.get()
+            while item is not None:
+                batch.append(item)
+                if q.empty():
+                    break
+                item = q.get_nowait()
+            closing = item is None
+            if not batch:
+                continue
+            await handle(sid, batch)
+            received += len(batch)
+            nbytes = sum(map(len, batch))
+            buffered[sid] -= nbytes
+            ch.send(protocol.ACK, protocol.ACK_BODY.pack(received, nbytes), stream=sid)
+            ch.send(protocol.WINDOW, protocol.WINDOW_BODY.pack(nbytes), stream=sid)
+            await ch.drain()
+        del queues[sid], buffered[sid], tasks[sid]
+        STREAMS.dec(role="server")
+        ch.send(protocol.CLOSE, stream=sid)
+        await ch.drain()
+
+    def failed(t: asyncio.Task):
+        if not t.cancelled() and t.exception() is not None:
+            errors.append(t.exception())
+            ch.close()
+
+    clean = False
+    try:
+        while True:
+            fr = await recv()
+            if fr is None:
+                return
+            if fr.type == protocol.CLOSE and fr.stream == 0:
+                clean = True
+                return
+            if fr.stream == 0:
+                raise protocol.ProtocolError("multiplexed sessions carry data on non-zero streams")
+            if fr.type == protocol.CLOSE:
+                if fr.stream in queues:
+                    queues[fr.stream].put_nowait(None)
+                else:
+                    # Nothing was ever sent (or it is already done): confirm right away.
+                    ch.send(protocol.CLOSE, stream=fr.stream)
+                continue
+            if fr.type != protocol.DATA:
+                raise protocol.ProtocolError(f"unexpected frame type {fr.type}")
+            q = queues.get(fr.stream)
+            if q is None:
+                if len(queues) >= max_streams:
+                    raise protocol.ProtocolError(f"more than {max_streams} concurrent streams")
+                q = queues[fr.stream] = asyncio.Queue()
+                buffered[fr.stream] = 0
+                STREAMS.inc(role="server")
+                t = tasks[fr.stream] = asyncio.create_task(worker(fr.stream, q))
+                t.add_done_callback(failed)
+            if buffered[fr.stream] + len(fr.payload) > window:
+                raise protocol.ProtocolError(f"stream {fr.stream} exceeded its flow-control window")
+            buffered[fr.stream] += len(fr.payload)
+            q.put_nowait(fr.payload)
+    finally:
+        pending = list(tasks.values())
+        if clean:
+            for q in queues.values():
+                q.put_nowait(None)
+            await asyncio.gather(*pending, return_exceptions=True)
+        else:
+            for t in pending:
+                t.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            STREAMS.dec(len(pending), role="server")
+        if errors:
+            raise errors[0]
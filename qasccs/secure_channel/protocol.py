@@ -0,0 +1,349 @@
+"""
+Framed secure_channel protocol.
+
+The legacy protocol is raw: every read is a payload, answered with
+`ACK (secure): N bytes`. A client opts into framing by sending `MAGIC` as its first
+bytes, followed by a HELLO frame; anything else is served the legacy way, so old
+clients keep working unchanged.
+
+  frame  u8 type, u8 flags, u16 stream, u32 length, payload
+
+HELLO bodies are JSON. The client lists what it wants (`{"version": 1, "kem": "x448-standin"}`)
+and the server answers with what it accepted (`"kem": null` when hybrid is off). When a
+KEM was agreed, one KEX round trip follows (see `hybrid`) and every later frame
+payload is sealed with the per-direction key; the AAD is the frame's type, flags and
+stream, so headers cannot be altered either.
+
+ACKs are cumulative: `(frames received so far, payload bytes covered by this ACK)`. The
+server processes every frame already buffered before acknowledging, so a client that
+pipelines (`Pipeline`) gets one ACK per batch, and a request/response client sees
+exactly one ACK per frame as before. Frames sent in one event-loop turn are written to
+the transport together.
+
+A client that asks for `"mux": true` gets many logical streams over the connection
+(see `mux`); the server answers with the per-stream flow-control window and the
+stream limit, `"mux": {"window": 262144, "max_streams": 1024}`. Per-frame compression
+is negotiated the same way (see `compression`).
+"""
+from __future__ import annotations
+import asyncio, json, struct
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+from . import hybrid
+from .compression import COMPRESSED, Compressor
+from .tuning import TransportTuning
+
+MAGIC = b"QASCS\x00\x01\n"
+VERSION = 1
+HEADER = struct.Struct("<BBHI")
+_AAD = struct.Struct("<BBH")
+MAX_FRAME = 1 << 20
+FLUSH_BYTES = 1 << 16                   # write buffered frames out once this much is pending
+
+HELLO, DATA, ACK, KEX, CLOSE, WINDOW = 1, 2, 3, 4, 5, 6
+ACK_BODY = struct.Struct("<QI")         # frames received so far, payload bytes covered by this ACK
+WINDOW_BODY = struct.Struct("<I")       # flow-control credit returned to the sender, in bytes
+
+class ProtocolError(Exception):
+    pass
+
+@dataclass
+class Frame:
+    type: int
+    flags: int
+    stream: int
+    payload: bytes
+
+def encode_frame(ftype: int, payload: bytes = b"", flags: int = 0, stream: int = 0) -> bytes:
+    return HEADER.pack(ftype, flags, stream, len(payload)) + payload
+
+def is_magic_prefix(data: bytes) -> bool:
+    """True when `data` starts with MAGIC, or could still become it (short first read)."""
+    n = min(len(data), len(MAGIC))
+    return n > 0 and data[:n] == MAGIC[:n]
+
+class FrameReader:
+    """Buffers a StreamReader in large chunks and cuts frames out of the buffer."""
+
+    def __init__(self, reader: asyncio.StreamReader, initial: bytes = b"", chunk: int = 1 << 16):
+        self._reader = reader
+        self._buf = bytearray(initial)
+        self._chunk = chunk
+
+    async def _fill(self, n: int) -> bool:
+        while len(self._buf) < n:
+            data = await self._reader.read(self._chunk)
+            if not data:
+                return False
+            self._buf += data
+        return True
+
+    async def readexactly(self, n: int) -> bytes:
+        if not await self._fill(n):
+            raise asyncio.IncompleteReadError(bytes(self._buf), n)
+        out = bytes(self._buf[:n])
+        del self._buf[:n]
+        return out
+
+    def has_frame(self) -> bool:
+        """Whether a complete frame is already buffered (no I/O needed to read it)."""
+        if len(self._buf) < HEADER.size:
+            return False
+        return len(self._buf) >= HEADER.size + HEADER.unpack_from(self._buf)[3]
+
+    async def read_frame(self) -> Optional[Frame]:
+        """Next frame, or None on a clean EOF between frames."""
+        if not await self._fill(HEADER.size):
+            if self._buf:
+                raise asyncio.IncompleteReadError(bytes(self._buf), HEADER.size)
+            return None
+        ftype, flags, stream, length = HEADER.unpack_from(self._buf)
+        if length > MAX_FRAME:
+            raise ProtocolError(f"frame of {length} bytes exceeds {MAX_FRAME}")
+        if not await self._fill(HEADER.size + length):
+            raise asyncio.IncompleteReadError(bytes(self._buf), HEADER.size + length)
+        payload = bytes(self._buf[HEADER.size:HEADER.size + length])
+        del self._buf[:HEADER.size + length]
+        return Frame(ftype, flags, stream, payload)
+
+class Channel:
+    """A framed connection, sealed once a hybrid key exchange has completed.
+
+    `send` only buffers; the buffer is written to the transport at the end of the
+    current event-loop turn, by `drain`, or once `FLUSH_BYTES` are pending.
+    """
+
+    def __init__(self, reader: FrameReader, writer: asyncio.StreamWriter, kem: Optional[str] = None):
+        self.reader = reader
+        self.writer = writer
+        self.kem = kem
+        self.mux: Optional[dict] = None
+        self.compressor: Optional[Compressor] = None
+        self._out: Optional[hybrid.Sealer] = None
+        self._in: Optional[hybrid.Sealer] = None
+        self._wbuf: list[bytes] = []
+        self._wbytes = 0
+
+    @property
+    def sealed(self) -> bool:
+        return self._out is not None
+
+    def _seal(self, keys: hybrid.SessionKeys, initiator: bool):
+        self._out, self._in = keys.sealers(initiator)
+
+    def send(self, ftype: int, payload: bytes = b"", flags: int = 0, stream: int = 0):
+        """Queue one frame (call `drain` to flush and apply backpressure)."""
+        if self.compressor is not None and ftype == DATA:
+            payload, compressed = self.compressor.compress(payload)
+            if compressed:
+                flags |= COMPRESSED
+        if self._out is not None:
+            payload = self._out.seal(payload, _AAD.pack(ftype, flags, stream))
+        if len(payload) > MAX_FRAME:
+            raise ProtocolError(f"frame of {len(payload)} bytes exceeds {MAX_FRAME}")
+        frame = encode_frame(ftype, payload, flags, stream)
+        if not self._wbuf:
+            asyncio.get_running_loop().call_soon(self.flush)
+        self._wbuf.append(frame)
+        self._wbytes += len(frame)
+        if self._wbytes >= FLUSH_BYTES:
+            self.flush()
+
+    def flush(self):
+        if self._wbuf:
+            self.writer.write(b"".join(self._wbuf))
+            self._wbuf.clear()
+            self._wbytes = 0
+
+    async def drain(self):
+        self.flush()
+        await self.writer.drain()
+
+    async def backpressure(self):
+        """Wait while the transport is over its high-water mark, without flushing."""
+        await self.writer.drain()
+
+    async def recv(self) -> Optional[Frame]:
+        fr = await self.reader.read_frame()
+        if fr is not None and self._in is not None:
+            fr.payload = self._in.open(fr.payload, _AAD.pack(fr.type, fr.flags, fr.stream))
+        if fr is not None and fr.flags & COMPRESSED:
+            if self.compressor is None:
+                raise ProtocolError("compressed frame on a channel without compression")
+            fr.payload = self.compressor.decompress(fr.payload)
+        return fr
+
+    async def expect(self, ftype: int) -> Frame:
+        fr = await self.recv()
+        if fr is None:
+            raise ConnectionError("peer closed during handshake")
+        if fr.type != ftype:
+            raise ProtocolError(f"expected frame type {ftype}, got {fr.type}")
+        return fr
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+async def client_handshake(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                           kem: Optional[str] = None, pool: Optional[hybrid.KeypairPool] = None,
+                           mux: bool = False, compressor: Optional[Compressor] = None) -> Channel:
+    """Open the framed protocol; with `kem`, also run the hybrid key exchange.
+
+    With a `compressor`, compression is offered; it is used only if the server agrees.
+    """
+    impl = hybrid.kem_for(kem) if kem is not None else None
+    offer = {"version": VERSION, "kem": kem, **({"mux": True} if mux else {}),
+             **({"compression": compressor.offer()} if compressor is not None else {})}
+    writer.write(MAGIC + encode_frame(HELLO, json.dumps(offer).encode()))
+    await writer.drain()
+    ch = Channel(FrameReader(reader), writer)
+    hello = json.loads((await ch.expect(HELLO)).payload)
+    if hello.get("error"):
+        raise ProtocolError(hello["error"])
+    if kem is not None and hello.get("kem") != kem:
+        raise ProtocolError(f"server did not accept KEM {kem!r}")
+    if mux and not hello.get("mux"):
+        raise ProtocolError("server does not support multiplexing")
+    ch.mux = hello.get("mux") if mux else None
+    if compressor is not None and compressor.accepts(hello.get("compression")):
+        ch.compressor = compressor
+    if impl is not None:
+        kp, msg = hybrid.client_start(impl, pool.get() if pool is not None else None)
+        ch.send(KEX, msg)
+        await ch.drain()
+        reply = (await ch.expect(KEX)).payload
+        ch._seal(hybrid.client_finish(impl, kp, msg, reply), initiator=True)
+        ch.kem = kem
+    return ch
+
+async def server_handshake(reader: FrameReader, writer: asyncio.StreamWriter, kems: dict,
+                           require_hybrid: bool = False, pool: Optional[hybrid.KeypairPool] = None,
+                           mux: Optional[dict] = None, compressor: Optional[Compressor] = None) -> Channel:
+    """Answer a client's HELLO (the MAGIC has already been consumed from `reader`).
+
+    `kems` maps accepted KEM names to implementations; `mux` is the multiplexing offer
+    (window, max_streams) made to clients that ask for it, or None to refuse. Compression
+    is accepted when the client offers `compressor`'s algorithm and dictionary.
+    """
+    ch = Channel(reader, writer)
+    hello = json.loads((await ch.expect(HELLO)).payload)
+    kem = hello.get("kem")
+    error = None
+    if kem is not None and kem not in kems:
+        error = f"KEM {kem!r} not accepted (server accepts {sorted(kems)})"
+    elif kem is None and require_hybrid:
+        error = "server requires an application-layer hybrid key exchange"
+    ch.mux = mux if hello.get("mux") and not error else None
+    compress = not error and compressor is not None and compressor.accepts(hello.get("compression"))
+    ch.send(HELLO, json.dumps({"version": VERSION, "kem": None if error else kem,
+                               **({"mux": ch.mux} if hello.get("mux") else {}),
+                               "compression": compressor.offer() if compress else None,
+                               **({"error": error} if error else {})}).encode())
+    if compress:
+        ch.compressor = compressor
+    await ch.drain()
+    if error:
+        raise ProtocolError(error)
+    if kem is not None:
+        msg = (await ch.expect(KEX)).payload
+        reply, keys = hybrid.server_respond(kems[kem], msg, pool.get() if pool is not None else None)
+        ch.send(KEX, reply)
+        await ch.drain()
+        ch._seal(keys, initiator=False)
+        ch.kem = kem
+    return ch
+
+async def open_channel(host: str, port: int, ctx, server_hostname: Optional[str] = None,
+                       kem: Optional[str] = None, pool: Optional[hybrid.KeypairPool] = None,
+                       mux: bool = False, compressor: Optional[Compressor] = None,
+                       tuning: Optional[TransportTuning] = None) -> Channel:
+    reader, writer = await asyncio.open_connection(host, port, ssl=ctx, server_hostname=server_hostname or host)
+    if tuning is not None:
+        tuning.apply(writer.transport)
+    try:
+        return await client_handshake(reader, writer, kem, pool, mux, compressor)
+    except BaseException:
+        writer.close()
+        raise
+
+async def request(ch: Channel, payload: bytes) -> tuple[int, int]:
+    """Send one DATA frame and wait for its ACK; returns (frames acknowledged, bytes)."""
+    ch.send(DATA, payload)
+    await ch.drain()
+    return ACK_BODY.unpack((await ch.expect(ACK)).payload)
+
+class Pipeline:
+    """Send DATA frames without waiting for each ACK.
+
+    `send` returns a future resolved by the cumulative ACK that covers the frame; at most
+    `max_in_flight` frames are unacknowledged at any time.
+    """
+
+    def __init__(self, ch: Channel, max_in_flight: int = 1024):
+        self.ch = ch
+        self.max_in_flight = max_in_flight
+        self.sent = 0
+        self.acked = 0
+        self._waiters: deque[tuple[int, asyncio.Future]] = deque()
+        self._room = asyncio.Event()
+        self._error: Optional[BaseException] = None
+        self._task = asyncio.create_task(self._read_loop())
+
+    async def send(self, payload: bytes) -> asyncio.Future:
+        while self.sent - self.acked >= self.max_in_flight:
+            self._check()
+            self._room.clear()
+            await self._room.wait()
+        self._check()
+        self.sent += 1
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append((self.sent, fut))
+        self.ch.send(DATA, payload)
+        await self.ch.backpressure()
+        return fut
+
+    async def wait(self):
+        """Flush and wait until every frame sent so far is acknowledged."""
+        await self.ch.drain()
+        if self._waiters:
+            await self._waiters[-1][1]
+
+    def _check(self):
+        if self._error is not None:
+            raise ConnectionError("pipelined channel failed") from self._error
+
+    async def _read_loop(self):
+        try:
+            while True:
+                fr = await self.ch.recv()
+                if fr is None:
+                    raise ConnectionError("server closed the connection")
+                if fr.type != ACK:
+                    raise ProtocolError(f"unexpected frame type {fr.type}")
+                ack = ACK_BODY.unpack(fr.payload)
+                if not self.acked < ack[0] <= self.sent:
+                    raise ProtocolError(f"ACK for frame {ack[0]} out of range ({self.acked}, {self.sent}]")
+                self.acked = ack[0]
+                while self._waiters and self._waiters[0][0] <= self.acked:
+                    _, fut = self._waiters.popleft()
+                    if not fut.done():
+                        fut.set_result(ack)
+                self._room.set()
+        except Exception as e:
+            self._error = e
+            while self._waiters:
+                _, fut = self._waiters.popleft()
+                if not fut.done():
+                    fut.set_exception(e)
+                    fut.exception()           # fire-and-forget senders rely on wait()/close()
+            self._room.set()
+
+    async def close(self):
+        if self._error is None:
+            await self.wait()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self.ch.close()
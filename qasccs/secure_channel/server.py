@@ -1,31 +1,583 @@
 from __future__ import annotations
-import argparse, socket, ssl
-from .common import make_server_context
+import argparse, asyncio, contextlib, functools, itertools, logging, os, signal, socket, ssl, subprocess, sys, threading, time
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence
+from qasccs import metrics, profiling
+from . import certwatch, compression, hybrid, mux, protocol, tuning, vhost
+from .archive import ArchiveWriter
+from .common import SERVER_CERT, SERVER_KEY
+from .tuning import TransportTuning
+
+log = logging.getLogger("qasccs.server")
+
+ACCEPTS = metrics.counter("qasccs_server_accepts_total", "Accepted TCP connections")
+ACTIVE = metrics.gauge("qasccs_server_active_connections", "Connections being served")
+HANDSHAKING = metrics.gauge("qasccs_server_handshakes_in_flight", "TLS handshakes in progress")
+HANDSHAKE = metrics.histogram("qasccs_tls_handshake_seconds", "TLS handshake duration")
+BYTES_IN = metrics.counter("qasccs_server_bytes_in_total", "Application bytes received")
+BYTES_OUT = metrics.counter("qasccs_server_bytes_out_total", "Application bytes sent")
+TLS_ERRORS = metrics.counter("qasccs_tls_errors_total", "TLS errors")
+REJECTED = metrics.counter("qasccs_server_rejected_total", "Connections shed by admission control, by limit")
+TIMEOUTS = metrics.counter("qasccs_server_timeouts_total", "Connections closed by a timeout, by kind")
+SESSIONS = metrics.counter("qasccs_server_sessions_total", "Served sessions, by protocol and KEM")
+PROTOCOL_ERRORS = metrics.counter("qasccs_server_protocol_errors_total", "Framed protocol violations")
+TRANSPORT_INFO = metrics.gauge("qasccs_server_transport_info", "Event loop and socket settings in effect (always 1)")
+RELOADS = metrics.counter("qasccs_server_reloads_total", "TLS context reloads, by outcome")
+ACK_BATCH = metrics.histogram("qasccs_server_ack_batch_frames", "Frames covered by one cumulative ACK",
+                              buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512))
+
+@dataclass
+class ServerLimits:
+    max_connections: int = 1024        # concurrently served connections
+    max_handshakes: int = 64           # TLS handshakes in flight
+    rate_per_ip: float = 0.0           # new connections/s per client IP (0 = unlimited)
+    burst_per_ip: float = 20.0         # token bucket depth per client IP
+    backlog: int = 128                 # listen(2) backlog
+    handshake_timeout: float = 10.0
+    read_timeout: float = 30.0         # first payload after the handshake
+    idle_timeout: float = 60.0         # between payloads on a kept-alive connection
+    max_tracked_ips: int = 65536
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "stamp")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = now
+
+    def take(self, now: float) -> bool:
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+class SecureServer:
+    """asyncio TLS server with admission control; ACKs each payload until the peer closes.
+
+    Connections are accepted on a plain socket and admitted *before* any TLS work, so
+    shed connections cost one accept + close. Admitted sockets are wrapped with
+    `loop.connect_accepted_socket(ssl=...)`.
+
+    With an `archive`, every payload is appended to the encrypted archive; when
+    `durable_ack` is set the ACK is only sent once the group commit has fsynced it.
+
+    Clients that open with `protocol.MAGIC` get the framed protocol, optionally with
+    an application-layer hybrid key exchange over one of `kems` and up to `max_streams`
+    multiplexed streams (0 disables multiplexing); everything else is served the
+    legacy raw way. Framed ACKs are cumulative: frames a client pipelines are persisted
+    and acknowledged in batches of up to `max_batch`. With a `compressor`, clients that
+    offer the same dictionary may send compressed DATA frames. Socket options come
+    from `tuning`; the event loop is whatever runs `start()` (see `TransportTuning.run`).
+
+    `reload()` swaps in a fresh context from `context_factory` for new handshakes while
+    established connections keep theirs. A `sock` is an already-listening socket (e.g.
+    inherited from the process being replaced); `stop_accepting()` + `drain()` retire a
+    server without dropping accepted connections.
+    """
+
+    def __init__(self, ctx: ssl.SSLContext, host: str = "127.0.0.1", port: int = 8443,
+                 limits: Optional[ServerLimits] = None, profiler: Optional[profiling.Profiler] = None,
+                 archive: Optional[ArchiveWriter] = None, durable_ack: bool = True,
+                 kems: Optional[Sequence[str]] = None, require_hybrid: bool = False,
+                 stream_window: int = mux.DEFAULT_WINDOW, max_streams: int = mux.DEFAULT_MAX_STREAMS,
+                 max_batch: int = 256, compressor: Optional[compression.Compressor] = None,
+                 tuning: Optional[TransportTuning] = None,
+                 context_factory: Optional[Callable[[], ssl.SSLContext]] = None,
+                 sock: Optional[socket.socket] = None):
+        self.ctx = ctx
+        self.context_factory = context_factory
+        self.host = host
+        self.port = port
+        self.limits = limits or ServerLimits()
+        self.archive = archive
+        self.durable_ack = durable_ack
+        self._conn_ids = itertools.count(1)
+        if kems is None:
+            kems = [k for k in hybrid.available_kems() if k != hybrid.StubKEM.name]
+        self.kems = {name: hybrid.kem_for(name) for name in kems}
+        self.require_hybrid = require_hybrid
+        self.max_batch = max_batch
+        self.compressor = compressor
+        self.tuning = tuning or TransportTuning()
+        self.mux = {"window": stream_window, "max_streams": max_streams} if max_streams > 0 else None
+        self._keypool: Optional[hybrid.KeypairPool] = None
+        self.active = 0
+        self.handshaking = 0
+        self._buckets: dict[str, TokenBucket] = {}
+        self._sample = profiler.sample if profiler is not None else contextlib.nullcontext
+        self._sock = sock
+        self._accept_task: Optional[asyncio.Task] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def start(self) -> "SecureServer":
+        if self._sock is None:
+            self._sock = self.tuning.listen(self.host, self.port, self.limits.backlog)
+        self._sock.setblocking(False)
+        self.port = self._sock.getsockname()[1]
+        info = {**self.tuning.describe(self._sock), "backlog": self.limits.backlog,
+                "loop": type(asyncio.get_running_loop()).__module__.split(".")[0]}
+        TRANSPORT_INFO.set(1, **{k: str(v) for k, v in info.items()})
+        log.info("Transport: %s", info)
+        if self.kems:
+            self._keypool = hybrid.KeypairPool(size=64).start()
+        self._accept_task = asyncio.create_task(self._accept_loop())
+        log.info("Listening on %s:%d (TLS)", self.host, self.port)
+        return self
+
+    async def serve_forever(self):
+        if self._accept_task is not None:
+            await self._accept_task
+
+    @property
+    def listen_fd(self) -> int:
+        return self._sock.fileno()
+
+    def reload(self) -> bool:
+        """Load a new TLS context for subsequent handshakes; keeps the current one on failure.
+
+        Blocks on file I/O; `main` calls it from a worker thread on SIGHUP.
+        """
+        if self.context_factory is None:
+            return False
+        try:
+            ctx = self.context_factory()
+        except (OSError, ssl.SSLError, ValueError) as e:
+            RELOADS.inc(outcome="error")
+            log.error("Reload failed, keeping the current certificates: %s", e)
+            return False
+        self.ctx = ctx
+        RELOADS.inc(outcome="ok")
+        log.info("Reloaded TLS context")
+        return True
+
+    async def stop_accepting(self):
+        """Close the listening socket; accepted connections keep being served.
+
+        Connections still queued on a shared (inherited) socket stay with the other process.
+        """
+        if self._accept_task is not None:
+            self._accept_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._accept_task
+            self._accept_task = None
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    async def drain(self, timeout: float) -> int:
+        """Wait up to `timeout` seconds for connections to finish; returns how many are left."""
+        if self._tasks:
+            await asyncio.wait(list(self._tasks), timeout=timeout)
+        return len(self._tasks)
+
+    async def close(self):
+        await self.stop_accepting()
+        for t in list(self._tasks):
+            t.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._keypool is not None:
+            self._keypool.close()
+
+    async def _accept_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                conn, addr = await loop.sock_accept(self._sock)
+            except OSError as e:
+                log.error("Accept error: %s", e)
+                await asyncio.sleep(0.05)
+                continue
+            ACCEPTS.inc()
+            reason = self._admit(addr[0])
+            if reason is not None:
+                # Fast reject: no TLS work for shed connections.
+                REJECTED.inc(limit=reason)
+                conn.close()
+                continue
+            self.active += 1
+            ACTIVE.inc()
+            # Reserve the handshake slot now: with a full backlog, sock_accept returns
+            # without yielding, so no handshake task runs before the next _admit.
+            self.handshaking += 1
+            HANDSHAKING.inc()
+            t = asyncio.create_task(self._on_connect(conn, addr))
+            self._tasks.add(t)
+            t.add_done_callback(self._tasks.discard)
+
+    def _admit(self, ip: str) -> Optional[str]:
+        """Return the name of the limit that rejects this connection, or None."""
+        lim = self.limits
+        if self.active >= lim.max_connections:
+            return "max_connections"
+        if self.handshaking >= lim.max_handshakes:
+            return "max_handshakes"
+        if lim.rate_per_ip > 0:
+            now = time.monotonic()
+            bucket = self._buckets.get(ip)
+            if bucket is None:
+                if len(self._buckets) >= lim.max_tracked_ips:
+                    self._buckets.clear()
+                bucket = self._buckets[ip] = TokenBucket(lim.rate_per_ip, lim.burst_per_ip, now)
+            if not bucket.take(now):
+                return "rate_per_ip"
+        return None
+
+    async def _on_connect(self, conn: socket.socket, addr):
+        log.info("Connection from %s", addr)
+        writer = None
+        try:
+            with self._sample():
+                opened = await self._handshake(conn)
+                if opened is None:
+                    return
+                reader, writer = opened
+                await self._serve(reader, writer, next(self._conn_ids))
+        except ssl.SSLError as e:
+            TLS_ERRORS.inc(role="server")
+            log.warning("TLS error: %s", e)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except (protocol.ProtocolError, ValueError) as e:
+            PROTOCOL_ERRORS.inc()
+            log.warning("Protocol error: %s", e)
+        except Exception as e:
+            log.error("Error: %s", e)
+        finally:
+            self.active -= 1
+            ACTIVE.dec()
+            if writer is not None:
+                writer.close()
+            else:
+                conn.close()
+
+    async def _handshake(self, conn: socket.socket):
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(loop=loop)
+        protocol = asyncio.StreamReaderProtocol(reader, loop=loop)
+        t0 = time.perf_counter()
+        try:
+            transport, _ = await asyncio.wait_for(
+                loop.connect_accepted_socket(lambda: protocol, conn, ssl=self.ctx,
+                                             ssl_handshake_timeout=self.limits.handshake_timeout),
+                self.limits.handshake_timeout)
+        except asyncio.TimeoutError:
+            TIMEOUTS.inc(kind="handshake")
+            return None
+        finally:
+            self.handshaking -= 1
+            HANDSHAKING.dec()
+        HANDSHAKE.observe(time.perf_counter() - t0, role="server")
+        self.tuning.apply(transport)
+        return reader, asyncio.StreamWriter(transport, protocol, reader, loop)
+
+    async def _read(self, aw, timeout: float, kind: str):
+        try:
+            return await asyncio.wait_for(aw, timeout)
+        except asyncio.TimeoutError:
+            TIMEOUTS.inc(kind=kind)
+            return None
+
+    def _archive(self, data: bytes, conn: int) -> Optional[int]:
+        BYTES_IN.inc(len(data))
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Received: %r", data.decode("utf-8", errors="replace"))
+        return self.archive.append(data, conn) if self.archive is not None else None
+
+    async def _persist(self, batch: Sequence[bytes], conn: int):
+        """Archive a batch of payloads; with `durable_ack`, wait for one fsync covering all of them."""
+        seq = None
+        for data in batch:
+            seq = self._archive(data, conn)
+        if seq is not None and self.durable_ack:
+            await asyncio.wrap_future(self.archive.durable(seq))
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, conn: int = 0):
+        data = await self._read(reader.read(4096), self.limits.read_timeout, "read")
+        # A framed client opens with MAGIC; keep reading while the prefix is still ambiguous.
+        while data and len(data) < len(protocol.MAGIC) and protocol.is_magic_prefix(data):
+            more = await self._read(reader.read(4096), self.limits.read_timeout, "read")
+            if not more:
+                return
+            data += more
+        if not data:
+            return
+        if data.startswith(protocol.MAGIC):
+            await self._serve_framed(protocol.FrameReader(reader, data[len(protocol.MAGIC):]), writer, conn)
+            return
+        SESSIONS.inc(protocol="raw", kem="none")
+        while data:
+            await self._persist((data,), conn)
+            reply = f"ACK (secure): {len(data)} bytes".encode("utf-8")
+            writer.write(reply)
+            await writer.drain()
+            BYTES_OUT.inc(len(reply))
+            data = await self._read(reader.read(4096), self.limits.idle_timeout, "idle")
+
+    async def _serve_framed(self, fr: protocol.FrameReader, writer: asyncio.StreamWriter, conn: int):
+        try:
+            ch = await asyncio.wait_for(
+                protocol.server_handshake(fr, writer, self.kems, self.require_hybrid, self._keypool, self.mux,
+                                          self.compressor),
+                self.limits.handshake_timeout)
+        except asyncio.TimeoutError:
+            TIMEOUTS.inc(kind="handshake")
+            return
+        if ch.mux is not None:
+            SESSIONS.inc(protocol="mux", kem=ch.kem or "none")
+            await mux.serve(ch, lambda stream, batch: self._persist(batch, conn),
+                            lambda: self._read(ch.recv(), self.limits.idle_timeout, "idle"))
+            return
+        SESSIONS.inc(protocol="framed", kem=ch.kem or "none")
+        received = 0
+        timeout, kind = self.limits.read_timeout, "read"
+        while True:
+            frame = await self._read(ch.recv(), timeout, kind)
+            if frame is None:
+                return
+            # Take every frame that is already buffered, then persist and ACK them together.
+            batch, closing = [], False
+            while True:
+                if frame.type == protocol.CLOSE:
+                    closing = True
+                    break
+                if frame.type != protocol.DATA:
+                    raise protocol.ProtocolError(f"unexpected frame type {frame.type}")
+                batch.append(frame.payload)
+                if len(batch) >= self.max_batch or not ch.reader.has_frame():
+                    break
+                frame = await ch.recv()
+            if batch:
+                received += len(batch)
+                await self._persist(batch, conn)
+                ch.send(protocol.ACK, protocol.ACK_BODY.pack(received, sum(map(len, batch))))
+                await ch.drain()
+                BYTES_OUT.inc(protocol.HEADER.size + protocol.ACK_BODY.size)
+                ACK_BATCH.observe(len(batch))
+            if closing:
+                return
+            timeout, kind = self.limits.idle_timeout, "idle"
+
+class BackgroundServer:
+    """Run a `SecureServer` on its own event loop thread (tests, soak runs, embedding)."""
+
+    def __init__(self, ctx: ssl.SSLContext, host: str = "127.0.0.1", port: int = 0,
+                 limits: Optional[ServerLimits] = None, archive: Optional[ArchiveWriter] = None, **options):
+        self.server = SecureServer(ctx, host, port, limits, archive=archive, **options)
+        self.loop = self.server.tuning.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="qasccs-server", daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self.server.port
+
+    def start(self) -> "BackgroundServer":
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.server.start(), self.loop).result()
+        return self
+
+    def drain(self, timeout: float = 10.0) -> int:
+        """Stop accepting and wait for in-flight connections (see `SecureServer.drain`)."""
+        async def retire():
+            await self.server.stop_accepting()
+            return await self.server.drain(timeout)
+        return asyncio.run_coroutine_threadsafe(retire(), self.loop).result()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.server.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def add_limit_arguments(ap: argparse.ArgumentParser):
+    d = ServerLimits()
+    ap.add_argument("--max-connections", type=int, default=d.max_connections)
+    ap.add_argument("--max-handshakes", type=int, default=d.max_handshakes)
+    ap.add_argument("--rate-per-ip", type=float, default=d.rate_per_ip, help="New connections/s per client IP (0 = unlimited).")
+    ap.add_argument("--burst-per-ip", type=float, default=d.burst_per_ip)
+    ap.add_argument("--backlog", type=int, default=d.backlog)
+    ap.add_argument("--handshake-timeout", type=float, default=d.handshake_timeout)
+    ap.add_argument("--read-timeout", type=float, default=d.read_timeout)
+    ap.add_argument("--idle-timeout", type=float, default=d.idle_timeout)
+
+def limits_from_args(args: argparse.Namespace) -> ServerLimits:
+    return ServerLimits(
+        max_connections=args.max_connections, max_handshakes=args.max_handshakes,
+        rate_per_ip=args.rate_per_ip, burst_per_ip=args.burst_per_ip, backlog=args.backlog,
+        handshake_timeout=args.handshake_timeout, read_timeout=args.read_timeout,
+        idle_timeout=args.idle_timeout,
+    )
+
+def add_archive_arguments(ap: argparse.ArgumentParser):
+    ap.add_argument("--archive-dir", default=None, help="Append received payloads to an encrypted archive here.")
+    ap.add_argument("--archive-key-file", default=None, help="32-byte archive key (hex); created if missing.")
+    ap.add_argument("--archive-cipher", default="aes-256-gcm", choices=["aes-256-gcm", "chacha20-poly1305"])
+    ap.add_argument("--archive-segment-mb", type=int, default=64)
+    ap.add_argument("--archive-commit-ms", type=float, default=5.0, help="Group-commit (fsync) interval.")
+    ap.add_argument("--archive-async-ack", action="store_true", help="ACK before the payload is fsynced.")
+
+def archive_from_args(ap: argparse.ArgumentParser, args: argparse.Namespace) -> Optional[ArchiveWriter]:
+    if not args.archive_dir:
+        return None
+    if not args.archive_key_file:
+        ap.error("--archive-dir requires --archive-key-file")
+    from .archive import load_key
+    return ArchiveWriter(args.archive_dir, load_key(args.archive_key_file, create=True), args.archive_cipher,
+                         segment_bytes=args.archive_segment_mb << 20, commit_interval=args.archive_commit_ms / 1000)
+
+def _handoff_argv(argv: Sequence[str], listen_fd: int, ready_fd: int) -> list[str]:
+    """Command line for a replacement server: ours, serving the inherited socket."""
+    out, skip = [], False
+    for a in argv:
+        if skip:
+            skip = False
+        elif a in ("--listen-fd", "--ready-fd"):
+            skip = True
+        elif not a.startswith(("--listen-fd=", "--ready-fd=")):
+            out.append(a)
+    return [sys.executable, "-m", "qasccs.secure_channel.server", *out,
+            "--listen-fd", str(listen_fd), "--ready-fd", str(ready_fd)]
+
+async def _handoff(server: SecureServer, stop: asyncio.Event):
+    """Start a replacement process on our listening socket; retire once it is accepting."""
+    r, w = os.pipe()
+    try:
+        child = subprocess.Popen(_handoff_argv(sys.argv[1:], server.listen_fd, w), pass_fds=(server.listen_fd, w))
+    finally:
+        os.close(w)
+    try:
+        ready = await asyncio.get_running_loop().run_in_executor(None, os.read, r, 16)
+    finally:
+        os.close(r)
+    if not ready:
+        log.error("Replacement server (pid %d) exited before accepting; still serving", child.pid)
+        return
+    log.info("Handed the listening socket to pid %d; draining", child.pid)
+    stop.set()
+
+async def _serve(args: argparse.Namespace, profiler: Optional[profiling.Profiler],
+                 archive: Optional[ArchiveWriter] = None):
+    watcher, vhosts = None, vhost.from_args(args)
+    if args.watch_certs > 0:
+        watcher = certwatch.CertWatcher(args.cert, args.key, args.ca, args.watch_certs).start()
+        ctx, context_factory = watcher.front, None
+        if vhosts is not None:
+            vhosts.install(ctx)
+    else:
+        def context_factory():
+            ctx = certwatch.load_context(args.cert, args.key, args.ca)
+            return vhosts.install(ctx) if vhosts is not None else ctx
+        ctx = context_factory()
+    sock = socket.socket(fileno=args.listen_fd) if args.listen_fd is not None else None
+    server = SecureServer(ctx, args.host, args.port, limits_from_args(args), profiler,
+                          archive, durable_ack=not args.archive_async_ack,
+                          kems=args.kem, require_hybrid=args.require_hybrid,
+                          stream_window=args.stream_window, max_streams=args.max_streams,
+                          max_batch=args.max_batch, compressor=compression.from_args(args),
+                          tuning=tuning.from_args(args), context_factory=context_factory, sock=sock)
+    await server.start()
+    if args.ready_fd is not None:
+        os.write(args.ready_fd, b"ready")
+        os.close(args.ready_fd)
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    handoffs: set[asyncio.Task] = set()
+
+    def handoff():
+        if not stop.is_set() and not handoffs:
+            t = asyncio.create_task(_handoff(server, stop))
+            handoffs.add(t)
+            t.add_done_callback(handoffs.discard)
+
+    def reload():
+        if vhosts is not None:
+            vhosts.invalidate()
+        # Reading, validating and loading the chain blocks for milliseconds; keep it off the loop.
+        if watcher is not None:
+            loop.run_in_executor(None, functools.partial(watcher.check, force=True))
+        else:
+            loop.run_in_executor(None, server.reload)
+
+    for name, handler in (("SIGHUP", reload), ("SIGTERM", stop.set), ("SIGUSR2", handoff)):
+        if hasattr(signal, name):
+            loop.add_signal_handler(getattr(signal, name), handler)
+    try:
+        await stop.wait()
+        await server.stop_accepting()
+        left = await server.drain(args.drain_timeout)
+        if left:
+            log.warning("Drain timed out; closing %d connections", left)
+    finally:
+        await server.close()
+        if watcher is not None:
+            watcher.stop()
 
 def main():
     ap = argparse.ArgumentParser(description="QASCS Secure Server (Classical TLS demo)")
     ap.add_argument("--host", default="127.0.0.1")
     ap.add_argument("--port", type=int, default=8443)
+    ap.add_argument("--cert", default=str(SERVER_CERT), help="Server certificate chain (PEM); re-read on SIGHUP.")
+    ap.add_argument("--key", default=str(SERVER_KEY), help="Server private key (PEM); re-read on SIGHUP.")
+    ap.add_argument("--ca", default=None, help="CA that new certificates must chain to before they are served.")
+    ap.add_argument("--watch-certs", type=float, default=0.0, metavar="SECONDS",
+                    help="Poll --cert/--key this often and serve valid replacements (0 = only on SIGHUP).")
+    ap.add_argument("--listen-fd", type=int, default=None, help="Serve an inherited listening socket (set by SIGUSR2 handoff).")
+    ap.add_argument("--ready-fd", type=int, default=None, help="Write to this fd once accepting (set by SIGUSR2 handoff).")
+    ap.add_argument("--drain-timeout", type=float, default=30.0,
+                    help="On SIGTERM or after a handoff, wait this long for open connections.")
+    ap.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    ap.add_argument("--metrics-port", type=int, default=None, help="Serve Prometheus text on this port.")
+    ap.add_argument("--metrics-json", default=None, help="Periodically dump metrics as JSON to this path.")
+    ap.add_argument("--metrics-interval", type=float, default=10.0)
+    add_limit_arguments(ap)
+    add_archive_arguments(ap)
+    ap.add_argument("--kem", action="append", default=None, choices=hybrid.available_kems(),
+                    help="KEM accepted for the application-layer hybrid exchange (repeatable).")
+    ap.add_argument("--require-hybrid", action="store_true", help="Refuse sessions without the hybrid exchange.")
+    ap.add_argument("--max-streams", type=int, default=mux.DEFAULT_MAX_STREAMS,
+                    help="Multiplexed streams per framed connection (0 disables multiplexing).")
+    ap.add_argument("--stream-window", type=int, default=mux.DEFAULT_WINDOW, help="Per-stream flow-control window, bytes.")
+    ap.add_argument("--max-batch", type=int, default=256, help="Most pipelined frames covered by one ACK.")
+    compression.add_arguments(ap, default=compression.ALGORITHM)
+    vhost.add_arguments(ap)
+    tuning.add_arguments(ap)
+    profiling.add_arguments(ap, unit="connection")
     args = ap.parse_args()
+    archive = archive_from_args(ap, args)
 
-    ctx = make_server_context()
-    with socket.create_server((args.host, args.port)) as sock:
-        print(f"[server] Listening on {args.host}:{args.port} (TLS)")
-        while True:
-            conn, addr = sock.accept()
-            print(f"[server] Connection from {addr}")
-            try:
-                with ctx.wrap_socket(conn, server_side=True) as tls:
-                    data = tls.recv(4096)
-                    if not data:
-                        continue
-                    msg = data.decode("utf-8", errors="replace")
-                    print(f"[server] Received: {msg!r}")
-                    tls.sendall(f"ACK (secure): {len(data)} bytes".encode("utf-8"))
-            except ssl.SSLError as e:
-                print(f"[server] TLS error: {e}")
-            except Exception as e:
-                print(f"[server] Error: {e}")
+    metrics.setup_logging(getattr(logging, args.log_level))
+    dumper = None
+    if args.metrics_port is not None or args.metrics_json:
+        metrics.enable()
+    if args.metrics_port is not None:
+        metrics.serve_prometheus(args.host, args.metrics_port, reuse_port=True)
+    if args.metrics_json:
+        dumper = metrics.JsonDumper(args.metrics_json, args.metrics_interval).start()
+    profiler = profiling.from_args(args)
+    if profiler is not None:
+        profiler.start().install_signal()
+
+    try:
+        tuning.from_args(args).run(_serve(args, profiler, archive))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if archive is not None:
+            archive.close()
+        if profiler is not None:
+            profiler.stop()
+        if dumper is not None:
+            dumper.stop()
 
 if __name__ == "__main__":
     main()
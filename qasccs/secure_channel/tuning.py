@@ -0,0 +1,104 @@
+"""
+Event loop and socket tuning for the secure channel.
+
+Every knob is off (the OS / asyncio default) unless set, so a benchmark can change
+one at a time:
+
+  loop          asyncio | uvloop | auto (uvloop when installed)
+  nodelay       TCP_NODELAY on connections (asyncio's default is on)
+  sndbuf/rcvbuf SO_SNDBUF / SO_RCVBUF; set on the listening socket so accepted
+                sockets inherit them before the handshake (window scaling is fixed
+                at connect time)
+  reuseport     SO_REUSEPORT on the listening socket (several server processes)
+  write_buffer  high-water mark of the TLS transport's write buffer; `drain()`
+                blocks above it
+
+`describe()` reports what is actually in effect (the kernel may round buffer sizes),
+so benchmark output records the real configuration.
+"""
+from __future__ import annotations
+import argparse, asyncio, importlib.util, logging, re, socket, urllib.request
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+log = logging.getLogger("qasccs.tuning")
+
+def uvloop_available() -> bool:
+    return importlib.util.find_spec("uvloop") is not None
+
+@dataclass
+class TransportTuning:
+    loop: str = "asyncio"
+    nodelay: bool = True
+    sndbuf: Optional[int] = None
+    rcvbuf: Optional[int] = None
+    reuseport: bool = False
+    write_buffer: Optional[int] = None
+
+    @property
+    def loop_name(self) -> str:
+        """The loop `new_event_loop` creates (asyncio when uvloop is wanted but missing)."""
+        return "uvloop" if self.loop in ("uvloop", "auto") and uvloop_available() else "asyncio"
+
+    def new_event_loop(self) -> asyncio.AbstractEventLoop:
+        if self.loop_name == "uvloop":
+            import uvloop
+            return uvloop.new_event_loop()
+        if self.loop == "uvloop":
+            log.warning("uvloop is not installed; using the asyncio event loop")
+        return asyncio.new_event_loop()
+
+    def run(self, coro):
+        """`asyncio.run` on the selected event loop."""
+        with asyncio.Runner(loop_factory=self.new_event_loop) as runner:
+            return runner.run(coro)
+
+    def _buffers(self, sock):
+        if self.sndbuf:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.sndbuf)
+        if self.rcvbuf:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.rcvbuf)
+
+    def listen(self, host: str, port: int, backlog: int) -> socket.socket:
+        sock = socket.create_server((host, port), backlog=backlog, reuse_port=self.reuseport)
+        self._buffers(sock)
+        return sock
+
+    def apply(self, transport: asyncio.BaseTransport):
+        """Tune an established (TLS) transport and its socket."""
+        sock = transport.get_extra_info("socket")
+        if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+            self._buffers(sock)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, int(self.nodelay))
+        if self.write_buffer is not None and hasattr(transport, "set_write_buffer_limits"):
+            transport.set_write_buffer_limits(high=self.write_buffer)
+
+    def describe(self, sock: Optional[socket.socket] = None) -> dict:
+        d = {**asdict(self), "loop": self.loop_name}
+        if sock is not None:
+            d["effective_sndbuf"] = sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF)
+            d["effective_rcvbuf"] = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+        return d
+
+def add_arguments(ap: argparse.ArgumentParser, server: bool = True):
+    ap.add_argument("--loop", default="asyncio", choices=["asyncio", "uvloop", "auto"],
+                    help="Event loop implementation (auto: uvloop when installed).")
+    ap.add_argument("--no-nodelay", dest="nodelay", action="store_false", help="Leave Nagle's algorithm on.")
+    ap.add_argument("--sndbuf", type=int, default=None, help="SO_SNDBUF in bytes (default: OS).")
+    ap.add_argument("--rcvbuf", type=int, default=None, help="SO_RCVBUF in bytes (default: OS).")
+    if server:
+        ap.add_argument("--reuseport", action="store_true", help="Set SO_REUSEPORT on the listening socket.")
+    ap.add_argument("--write-buffer", type=int, default=None, help="TLS transport write-buffer high-water mark, bytes.")
+
+def from_args(args: argparse.Namespace) -> TransportTuning:
+    return TransportTuning(loop=args.loop, nodelay=args.nodelay, sndbuf=args.sndbuf, rcvbuf=args.rcvbuf,
+                           reuseport=getattr(args, "reuseport", False), write_buffer=args.write_buffer)
+
+_INFO = re.compile(r'^qasccs_server_transport_info\{(.*)\}', re.MULTILINE)
+_LABEL = re.compile(r'(\w+)="([^"]*)"')
+
+def fetch_server_tuning(metrics_url: str, timeout: float = 5.0) -> Optional[dict]:
+    """Read a server's transport settings from its Prometheus endpoint (`--metrics-port`)."""
+    with urllib.request.urlopen(metrics_url, timeout=timeout) as r:
+        m = _INFO.search(r.read().decode("utf-8"))
+    return dict(_LABEL.findall(m.group(1))) if m else None
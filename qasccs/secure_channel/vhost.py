@@ -0,0 +1,202 @@
+"""
+SNI-based virtual hosting: one listener, many tenant certificates.
+
+Tenants live in a directory, one subdirectory per hostname holding `server.crt` and
+`server.key` (the `gen_certs` layout). `VirtualHosts` is an `sni_callback` that hands
+each handshake the tenant's `SSLContext` from a bounded LRU cache, loading it on first
+use, so tens of thousands of tenants cost memory only for the ones recently seen.
+Names without a tenant are remembered for `negative_ttl` seconds in a separate bounded
+map, so SNI floods of random names neither touch the disk nor push tenants out of the
+cache. They fall through to the listening context's own certificate, or are refused
+with `strict`.
+
+A cache miss loads the chain on the event loop thread (about a millisecond for EC keys);
+size `max_size` to the working set so that misses stay rare.
+
+    python -m qasccs.secure_channel.vhost --ca certs/ --out tenants/ a.example b.example
+"""
+from __future__ import annotations
+import argparse, datetime, re, ssl, threading, time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+from qasccs import metrics
+from .common import make_server_context
+
+LOOKUPS = metrics.counter("qasccs_vhost_lookups_total", "SNI lookups, by outcome (hit/miss/unknown/error)")
+EVICTIONS = metrics.counter("qasccs_vhost_evictions_total", "Tenant contexts evicted from the cache")
+CACHED = metrics.gauge("qasccs_vhost_cached_contexts", "Tenant contexts held in the cache")
+
+_HOSTNAME = re.compile(r"^(?=.{1,253}$)[a-z0-9_](?:[a-z0-9_-]{0,61}[a-z0-9])?(?:\.[a-z0-9_](?:[a-z0-9_-]{0,61}[a-z0-9])?)*$")
+
+def valid_hostname(name: str) -> bool:
+    return bool(_HOSTNAME.match(name))
+
+class DirectoryTenants:
+    """Tenant certificates under `root/<hostname>/server.{crt,key}`."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def paths(self, hostname: str) -> Optional[tuple[Path, Path]]:
+        if not valid_hostname(hostname):
+            return None
+        d = self.root / hostname
+        cert, key = d / "server.crt", d / "server.key"
+        return (cert, key) if cert.is_file() else None
+
+    def add(self, hostname: str, cert_pem: bytes, key_pem: bytes) -> Path:
+        if not valid_hostname(hostname):
+            raise ValueError(f"invalid hostname {hostname!r}")
+        d = self.root / hostname
+        d.mkdir(parents=True, exist_ok=True)
+        (d / "server.key").write_bytes(key_pem)
+        (d / "server.crt").write_bytes(cert_pem)
+        return d
+
+class VirtualHosts:
+    """`sni_callback` selecting per-tenant contexts from a bounded LRU cache."""
+
+    def __init__(self, tenants: DirectoryTenants, max_size: int = 1024, strict: bool = False,
+                 negative_ttl: float = 30.0, factory: Callable[..., ssl.SSLContext] = make_server_context,
+                 negative_size: int = 4096):
+        if max_size < 1 or negative_size < 1:
+            raise ValueError("max_size and negative_size must be at least 1")
+        self.tenants = tenants
+        self.max_size = max_size
+        self.strict = strict
+        self.negative_ttl = negative_ttl
+        self.negative_size = negative_size
+        self._factory = factory
+        self._cache: OrderedDict[str, ssl.SSLContext] = OrderedDict()
+        self._unknown: OrderedDict[str, float] = OrderedDict()     # name -> when it was looked up
+        self._lock = threading.Lock()
+        self._next = None
+
+    def __len__(self) -> int:
+        """Tenant contexts currently cached (unknown names are not counted)."""
+        return len(self._cache)
+
+    def install(self, front: ssl.SSLContext) -> ssl.SSLContext:
+        """Route `front`'s handshakes through the cache; its previous callback handles unknown names."""
+        self._next = front.sni_callback
+        front.sni_callback = self
+        return front
+
+    def get(self, hostname: str) -> Optional[ssl.SSLContext]:
+        hostname = hostname.lower().rstrip(".")
+        now = time.monotonic()
+        with self._lock:
+            ctx = self._cache.get(hostname)
+            if ctx is not None:
+                self._cache.move_to_end(hostname)
+                LOOKUPS.inc(outcome="hit")
+                return ctx
+            seen = self._unknown.get(hostname)
+            if seen is not None and now - seen < self.negative_ttl:
+                LOOKUPS.inc(outcome="unknown")
+                return None
+        paths = self.tenants.paths(hostname)
+        ctx = None
+        if paths is not None:
+            try:
+                ctx = self._factory(*paths)
+                LOOKUPS.inc(outcome="miss")
+            except (OSError, ssl.SSLError):
+                LOOKUPS.inc(outcome="error")
+        else:
+            LOOKUPS.inc(outcome="unknown")
+        if valid_hostname(hostname):
+            self._put(hostname, ctx, now)
+        return ctx
+
+    def _put(self, hostname: str, ctx: Optional[ssl.SSLContext], now: float):
+        with self._lock:
+            if ctx is None:
+                self._unknown[hostname] = now
+                self._unknown.move_to_end(hostname)
+                while len(self._unknown) > self.negative_size:
+                    self._unknown.popitem(last=False)
+                return
+            self._unknown.pop(hostname, None)
+            self._cache[hostname] = ctx
+            self._cache.move_to_end(hostname)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+                EVICTIONS.inc()
+            CACHED.set(len(self._cache))
+
+    def invalidate(self, hostname: Optional[str] = None):
+        """Forget one tenant (or all), e.g. after its certificate was replaced."""
+        with self._lock:
+            if hostname is None:
+                self._cache.clear()
+                self._unknown.clear()
+            else:
+                hostname = hostname.lower().rstrip(".")
+                self._cache.pop(hostname, None)
+                self._unknown.pop(hostname, None)
+            CACHED.set(len(self._cache))
+
+    def __call__(self, sslobj, server_name, front):
+        ctx = self.get(server_name) if server_name else None
+        if ctx is not None:
+            sslobj.context = ctx
+            return None
+        if self.strict:
+            # Checked before `_next`: a certwatch front would otherwise accept every name.
+            return ssl.ALERT_DESCRIPTION_UNRECOGNIZED_NAME
+        return self._next(sslobj, server_name, front) if self._next is not None else None
+
+def issue(ca_dir, hostname: str, days: int = 825) -> tuple[bytes, bytes]:
+    """(cert PEM, key PEM) for `hostname`, signed by the `gen_certs` CA in `ca_dir`."""
+    ca_dir = Path(ca_dir)
+    ca_cert = x509.load_pem_x509_certificate((ca_dir / "ca.crt").read_bytes())
+    ca_key = serialization.load_pem_private_key((ca_dir / "ca.key").read_bytes(), password=None)
+    key = ec.generate_private_key(ec.SECP256R1())
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(x509.Name([x509.NameAttribute(NameOID.ORGANIZATION_NAME, "QASCS-Dev"),
+                                 x509.NameAttribute(NameOID.COMMON_NAME, hostname)]))
+        .issuer_name(ca_cert.subject)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=days))
+        .add_extension(x509.SubjectAlternativeName([x509.DNSName(hostname)]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=False, path_length=None), critical=True)
+        .sign(ca_key, hashes.SHA256())
+    )
+    key_pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                serialization.NoEncryption())
+    return cert.public_bytes(serialization.Encoding.PEM), key_pem
+
+def add_arguments(ap: argparse.ArgumentParser):
+    ap.add_argument("--vhost-dir", default=None, help="Serve tenant certificates from DIR/<hostname>/server.{crt,key} by SNI.")
+    ap.add_argument("--vhost-cache", type=int, default=1024, help="Tenant contexts kept in memory (LRU).")
+    ap.add_argument("--vhost-strict", action="store_true", help="Refuse handshakes for names without a tenant.")
+
+def from_args(args: argparse.Namespace) -> Optional[VirtualHosts]:
+    if not args.vhost_dir:
+        return None
+    return VirtualHosts(DirectoryTenants(args.vhost_dir), args.vhost_cache, args.vhost_strict)
+
+def main():
+    ap = argparse.ArgumentParser(description="Issue dev-only tenant certificates for SNI virtual hosting")
+    ap.add_argument("hostnames", nargs="+")
+    ap.add_argument("--ca", required=True, help="Directory with the gen_certs CA (ca.crt, ca.key).")
+    ap.add_argument("--out", required=True, help="Tenant directory (server --vhost-dir).")
+    ap.add_argument("--days", type=int, default=825)
+    args = ap.parse_args()
+    tenants = DirectoryTenants(args.out)
+    for host in args.hostnames:
+        print(f"[vhost] {tenants.add(host.lower(), *issue(args.ca, host.lower(), args.days))}")
+
+if __name__ == "__main__":
+    main()
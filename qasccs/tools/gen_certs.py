@@ -14,12 +14,9 @@ def _write(p: Path, data: bytes):
     p.parent.mkdir(parents=True, exist_ok=True)
     p.write_bytes(data)
 
-def main():
-    ap = argparse.ArgumentParser(description="Generate dev-only CA + server certs for QASCS")
-    ap.add_argument("--out", required=True, help="Output directory")
-    args = ap.parse_args()
-    out = Path(args.out)
-
+def generate(out: Path) -> Path:
+    """Write a dev CA (ca.crt/ca.key) and a localhost server cert (server.crt/server.key) to `out`."""
+    out = Path(out)
     ca_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
     ca_name = x509.Name([
         x509.NameAttribute(NameOID.COUNTRY_NAME, "AL"),
@@ -69,6 +66,13 @@ def main():
     _write(out / "ca.key", ca_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.TraditionalOpenSSL, serialization.NoEncryption()))
     _write(out / "server.crt", server_cert.public_bytes(serialization.Encoding.PEM))
     _write(out / "server.key", server_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.TraditionalOpenSSL, serialization.NoEncryption()))
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate dev-only CA + server certs for QASCS")
+    ap.add_argument("--out", required=True, help="Output directory")
+    args = ap.parse_args()
+    out = generate(Path(args.out))
 
     print(f"[gen_certs] Wrote dev certs to: {out.resolve()}")
     print("[gen_certs] WARNING: dev-only self-signed CA. Do not use in production.")
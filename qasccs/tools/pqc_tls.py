@@ -1,14 +1,267 @@
 """
 PQC TLS helper (optional).
 
-This file is intentionally a placeholder.
-
-In real PQC/hybrid TLS experiments you typically use OQS-OpenSSL (OpenSSL 3 + oqsprovider)
-and run TLS endpoints like:
+Python's `ssl` cannot negotiate PQC/hybrid groups, so experiments run against
+OQS-OpenSSL (OpenSSL 3 + oqsprovider) endpoints such as:
 
   openssl s_server -cert server.crt -key server.key -accept 8443 -tls1_3 -groups <HYBRID_GROUP>
-  openssl s_client -connect 127.0.0.1:8443 -tls1_3 -groups <HYBRID_GROUP>
 
-You can implement wrappers that start/stop those processes here, and wire them to the
-Quantum Risk Engine's `recommended_mode`.
+Spawning one of those per experiment costs far more than the handshake being
+measured. `EndpointPool` instead keeps long-lived `s_server` processes per group,
+health-checks and restarts them, and hands out pre-warmed endpoints round-robin.
+Handshake timings are captured per group.
+
+When oqsprovider is not available, each hybrid group is served by a plain
+`openssl` endpoint restricted to its classical stand-in (e.g. x25519_kyber768 -> X25519),
+so the pool and timing plumbing can be exercised on any machine.
 """
+from __future__ import annotations
+import argparse, json, shutil, socket, ssl, statistics, subprocess, threading, time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from qasccs.secure_channel import common
+
+DEFAULT_HYBRID_GROUPS = ("x25519_kyber768", "p384_kyber768")
+
+# Groups per Quantum Risk Engine `recommended_mode`.
+MODE_GROUPS = {
+    "classical": ("X25519",),
+    "hybrid":    DEFAULT_HYBRID_GROUPS,
+    "pqc":       ("kyber768",),
+}
+
+def classical_stand_in(group: str) -> str:
+    g = group.lower()
+    if g.startswith("p256") or g in ("p-256", "prime256v1", "secp256r1"):
+        return "P-256"
+    if g.startswith("p384") or g in ("p-384", "secp384r1"):
+        return "P-384"
+    if g.startswith("p521") or g in ("p-521", "secp521r1"):
+        return "P-521"
+    if g.startswith("x448"):
+        return "X448"
+    return "X25519"
+
+def oqs_available(openssl: str = "openssl") -> bool:
+    try:
+        r = subprocess.run([openssl, "list", "-providers", "-provider", "oqsprovider"],
+                           capture_output=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+    return r.returncode == 0
+
+def _free_port(host: str) -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind((host, 0))
+        return s.getsockname()[1]
+
+@dataclass
+class Endpoint:
+    group: str
+    served_group: str
+    host: str
+    port: int
+    argv: list[str]
+    proc: Optional[subprocess.Popen] = None
+    restarts: int = 0
+
+    def start(self, ready_timeout: float = 5.0):
+        self.proc = subprocess.Popen(self.argv, stdin=subprocess.DEVNULL,
+                                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + ready_timeout
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"openssl s_server for {self.group} exited with {self.proc.returncode}")
+            if self._port_open():
+                return
+            time.sleep(0.02)
+        self.stop()
+        raise TimeoutError(f"openssl s_server for {self.group} not ready on port {self.port}")
+
+    def stop(self):
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+
+    def _port_open(self) -> bool:
+        try:
+            socket.create_connection((self.host, self.port), timeout=0.5).close()
+            return True
+        except OSError:
+            return False
+
+    def healthy(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None and self._port_open()
+
+@dataclass
+class HandshakeStats:
+    samples: list[float] = field(default_factory=list)
+    failures: int = 0
+
+    def summary(self) -> dict:
+        s = sorted(self.samples)
+        if not s:
+            return {"count": 0, "failures": self.failures}
+        return {
+            "count": len(s),
+            "failures": self.failures,
+            "min_ms": s[0] * 1e3,
+            "p50_ms": s[len(s) // 2] * 1e3,
+            "p99_ms": s[min(len(s) - 1, int(len(s) * 0.99))] * 1e3,
+            "max_ms": s[-1] * 1e3,
+            "mean_ms": statistics.fmean(s) * 1e3,
+        }
+
+class EndpointPool:
+    """Long-lived `openssl s_server` endpoints, `per_group` per TLS group."""
+
+    def __init__(self, groups=DEFAULT_HYBRID_GROUPS, per_group: int = 1, *,
+                 cert: Optional[Path] = None, key: Optional[Path] = None,
+                 host: str = "127.0.0.1", openssl: str = "openssl",
+                 use_oqs: Optional[bool] = None):
+        if shutil.which(openssl) is None:
+            raise FileNotFoundError(f"{openssl!r} not found on PATH")
+        self.groups = tuple(groups)
+        self.per_group = per_group
+        self.cert = Path(cert or common.SERVER_CERT)
+        self.key = Path(key or common.SERVER_KEY)
+        self.host = host
+        self.openssl = openssl
+        self.use_oqs = oqs_available(openssl) if use_oqs is None else use_oqs
+        self.endpoints: dict[str, list[Endpoint]] = {}
+        self.timings: dict[str, HandshakeStats] = {g: HandshakeStats() for g in self.groups}
+        self._next: dict[str, int] = {g: 0 for g in self.groups}
+        self._lock = threading.Lock()
+
+    def _argv(self, served_group: str, port: int) -> list[str]:
+        argv = [self.openssl, "s_server", "-cert", str(self.cert), "-key", str(self.key),
+                "-accept", f"{self.host}:{port}", "-tls1_3", "-groups", served_group, "-www", "-quiet"]
+        if self.use_oqs:
+            argv += ["-provider", "oqsprovider", "-provider", "default"]
+        return argv
+
+    def _new_endpoint(self, group: str) -> Endpoint:
+        served = group if self.use_oqs else classical_stand_in(group)
+        port = _free_port(self.host)
+        return Endpoint(group, served, self.host, port, self._argv(served, port))
+
+    def start(self) -> "EndpointPool":
+        try:
+            for g in self.groups:
+                eps = [self._new_endpoint(g) for _ in range(self.per_group)]
+                self.endpoints[g] = eps
+                for ep in eps:
+                    ep.start()
+        except BaseException:
+            # __exit__ never runs when __enter__ raises: don't leak the servers already up.
+            self.close()
+            raise
+        return self
+
+    def close(self):
+        for eps in self.endpoints.values():
+            for ep in eps:
+                ep.stop()
+        self.endpoints.clear()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def health_check(self) -> dict[str, int]:
+        """Restart dead endpoints (on a fresh port); return healthy count per group."""
+        healthy = {}
+        for g, eps in self.endpoints.items():
+            for i, ep in enumerate(eps):
+                if not ep.healthy():
+                    ep.stop()
+                    fresh = self._new_endpoint(g)
+                    fresh.restarts = ep.restarts + 1
+                    fresh.start()
+                    eps[i] = fresh
+            healthy[g] = len(eps)
+        return healthy
+
+    def acquire(self, group: str) -> Endpoint:
+        """Next pre-warmed endpoint for `group` (round-robin), restarting it if dead."""
+        with self._lock:
+            eps = self.endpoints[group]
+            i = self._next[group] % len(eps)
+            self._next[group] = i + 1
+            ep = eps[i]
+            if ep.proc is None or ep.proc.poll() is not None:
+                fresh = self._new_endpoint(group)
+                fresh.restarts = ep.restarts + 1
+                fresh.start()
+                eps[i] = ep = fresh
+        return ep
+
+    def acquire_for_mode(self, mode: str) -> Endpoint:
+        for g in MODE_GROUPS.get(mode, ()):
+            if g in self.endpoints:
+                return self.acquire(g)
+        return self.acquire(self.groups[0])
+
+    def connect(self, group: str, ctx: Optional[ssl.SSLContext] = None,
+                server_hostname: str = "localhost", timeout: float = 5.0) -> ssl.SSLSocket:
+        """TLS connection to a pre-warmed endpoint; the handshake is timed into `timings`."""
+        ep = self.acquire(group)
+        ctx = ctx or common.make_client_context()
+        sock = socket.create_connection((ep.host, ep.port), timeout=timeout)
+        t0 = time.perf_counter()
+        try:
+            tls = ctx.wrap_socket(sock, server_hostname=server_hostname)
+        except (ssl.SSLError, OSError):
+            sock.close()
+            self.timings[group].failures += 1
+            raise
+        self.timings[group].samples.append(time.perf_counter() - t0)
+        return tls
+
+    def measure(self, group: str, n: int = 10, ctx: Optional[ssl.SSLContext] = None,
+                server_hostname: str = "localhost") -> HandshakeStats:
+        ctx = ctx or common.make_client_context()
+        for _ in range(n):
+            try:
+                self.connect(group, ctx, server_hostname).close()
+            except (ssl.SSLError, OSError):
+                pass
+        return self.timings[group]
+
+    def report(self) -> dict:
+        return {
+            "oqsprovider": self.use_oqs,
+            "groups": {
+                g: {"served_group": self.endpoints[g][0].served_group if self.endpoints.get(g) else None,
+                    **self.timings[g].summary()}
+                for g in self.groups
+            },
+        }
+
+def main():
+    ap = argparse.ArgumentParser(description="QASCS PQC TLS endpoint pool + handshake timing")
+    ap.add_argument("--groups", nargs="+", default=list(DEFAULT_HYBRID_GROUPS))
+    ap.add_argument("--per-group", type=int, default=1)
+    ap.add_argument("--handshakes", type=int, default=20)
+    ap.add_argument("--cert", default=None)
+    ap.add_argument("--key", default=None)
+    ap.add_argument("--openssl", default="openssl")
+    ap.add_argument("--no-oqs", action="store_true", help="Force the plain openssl stand-in.")
+    args = ap.parse_args()
+
+    with EndpointPool(args.groups, args.per_group, cert=args.cert, key=args.key,
+                      openssl=args.openssl, use_oqs=False if args.no_oqs else None) as pool:
+        for g in pool.groups:
+            pool.measure(g, args.handshakes)
+        print(json.dumps(pool.report(), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,432 @@
+"""
+Soak harness: run the TLS server for hours under mixed traffic and check that its
+memory and latency stay flat.
+
+The server runs as a child process serving a loopback socket created here (passed with
+`--listen-fd`), with dev certificates from `gen_certs` and tracemalloc on (`--profile
+alloc`). Traffic, all concurrent:
+
+  steady     kept-alive raw and framed clients at a fixed request rate; latency is
+             measured from the scheduled send time
+  storm      bursts of new connections (full handshake, one request, close)
+  large      framed DATA frames of `large_size` bytes
+  aborted    a ClientHello cut off part way, then close
+  malformed  mutated ClientHellos, random bytes, or garbage frames after a handshake
+
+Every `interval` seconds the harness records the server's RSS and open fds (from /proc,
+so Linux only), the allocation sites that grew most (SIGUSR1 alloc report) and the
+latency percentiles of that interval's steady traffic. Samples after `warmup` are then
+compared head (first quarter) against tail (last quarter); growth past a threshold fails
+the run with exit status 1. tracemalloc slows the server and each report stalls it
+briefly, which shows up in every interval's latency alike; use `--no-tracemalloc` when
+absolute latency matters more than finding the leaking allocation site.
+
+    python -m qasccs.tools.soak --duration 4h --interval 60 --json soak.json
+"""
+from __future__ import annotations
+import argparse, asyncio, contextlib, json, os, random, re, signal, socket, ssl, statistics, subprocess, sys, tempfile, time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from qasccs.secure_channel import protocol
+from qasccs.secure_channel.loadgen import LatencyHistogram
+from qasccs.secure_channel.server import ServerLimits
+from qasccs.tools.gen_certs import generate
+
+ERRORS = (OSError, ssl.SSLError, asyncio.TimeoutError, ConnectionError, protocol.ProtocolError)
+
+@dataclass
+class SoakConfig:
+    duration: float = 3600.0
+    interval: float = 30.0
+    warmup: float = 60.0
+    rate: float = 200.0                # steady requests/s over all steady connections
+    connections: int = 8               # steady kept-alive connections (half raw, half framed)
+    storm_size: int = 32               # new connections per storm
+    storm_every: float = 5.0
+    large_size: int = 512 << 10
+    large_every: float = 1.0
+    hostile_rate: float = 20.0         # aborted + malformed connections/s
+    timeout: float = 5.0
+    max_rss_growth_mb: float = 64.0
+    max_fd_growth: int = 16
+    max_p99_ratio: float = 2.0         # tail p99 / head p99
+    p99_floor_ms: float = 20.0         # p99 below this never fails
+    max_error_rate: float = 0.001      # failed / attempted storm, steady and large requests
+    tracemalloc: bool = True
+    certs: Optional[str] = None        # gen_certs directory (default: generated in workdir)
+    workdir: Optional[str] = None      # server log, alloc reports (default: a temp dir)
+    server_args: list[str] = field(default_factory=list)
+    seed: Optional[int] = None
+
+@dataclass
+class Sample:
+    t: float
+    rss_kb: int
+    fds: int
+    requests: int                      # completed legitimate requests, cumulative
+    errors: int
+    latency: dict                      # steady traffic this interval (LatencyHistogram.summary)
+    hostile: dict                      # hostile connections by kind, cumulative
+    top_growth: list                   # [site, KiB] since the baseline report
+
+@dataclass
+class SoakReport:
+    config: SoakConfig
+    workdir: str
+    samples: list[Sample] = field(default_factory=list)
+    failures: list[str] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def passed(self) -> bool:
+        return not self.failures
+
+    def to_dict(self) -> dict:
+        return {"config": asdict(self.config), "workdir": self.workdir, "elapsed_s": self.elapsed,
+                "passed": self.passed, "failures": self.failures, "samples": [asdict(s) for s in self.samples]}
+
+    def write_json(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+def evaluate(samples: list[Sample], cfg: SoakConfig) -> list[str]:
+    """Compare the first and last quarter of post-warmup samples against the thresholds."""
+    steady = [s for s in samples if s.t >= cfg.warmup]
+    if len(steady) < 2:
+        return [f"only {len(steady)} samples after warmup; run longer or sample more often"]
+    n = max(1, len(steady) // 4)
+    head, tail = steady[:n], steady[-n:]
+    failures = []
+    rss = (statistics.mean(s.rss_kb for s in tail) - statistics.mean(s.rss_kb for s in head)) / 1024
+    if rss > cfg.max_rss_growth_mb:
+        top = ", ".join(f"{site} +{kib:.0f} KiB" for site, kib in tail[-1].top_growth[:3])
+        failures.append(f"RSS grew {rss:.1f} MiB (limit {cfg.max_rss_growth_mb:g})" + (f"; top growth: {top}" if top else ""))
+    # Storm bursts hold fds briefly, so compare the quietest samples.
+    fds = min(s.fds for s in tail) - min(s.fds for s in head)
+    if fds > cfg.max_fd_growth:
+        failures.append(f"open fds grew by {fds} (limit {cfg.max_fd_growth})")
+    p99_head = statistics.median(s.latency["p99_us"] for s in head)
+    p99_tail = statistics.median(s.latency["p99_us"] for s in tail)
+    if p99_tail > max(p99_head * cfg.max_p99_ratio, cfg.p99_floor_ms * 1000):
+        failures.append(f"p99 latency drifted from {p99_head / 1000:.1f} ms to {p99_tail / 1000:.1f} ms "
+                        f"(limit {cfg.max_p99_ratio:g}x, floor {cfg.p99_floor_ms:g} ms)")
+    attempted = (steady[-1].requests + steady[-1].errors) - (head[0].requests + head[0].errors)
+    errors = steady[-1].errors - head[0].errors
+    if attempted and errors / attempted > cfg.max_error_rate:
+        failures.append(f"{errors} of {attempted} legitimate requests failed (limit {cfg.max_error_rate:.2%})")
+    return failures
+
+def client_hello(ctx: ssl.SSLContext, server_hostname: str = "localhost") -> bytes:
+    """The bytes of a real ClientHello, for truncation and mutation."""
+    out = ssl.MemoryBIO()
+    obj = ctx.wrap_bio(ssl.MemoryBIO(), out, server_hostname=server_hostname)
+    with contextlib.suppress(ssl.SSLWantReadError):
+        obj.do_handshake()
+    return out.read()
+
+def process_stats(pid: int) -> tuple[int, int]:
+    """(RSS in KiB, open fds) of a process, from /proc."""
+    rss = 0
+    with open(f"/proc/{pid}/status", encoding="ascii") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                rss = int(line.split()[1])
+                break
+    return rss, len(os.listdir(f"/proc/{pid}/fd"))
+
+_ALLOC_LINE = re.compile(r"^\s*([\d.]+) KiB\s+(.+)$")
+
+def parse_alloc_report(text: str) -> dict[str, float]:
+    """{site: KiB} from a `profiling` alloc report."""
+    return {m.group(2): float(m.group(1)) for m in map(_ALLOC_LINE.match, text.splitlines()) if m}
+
+class _Traffic:
+    def __init__(self, cfg: SoakConfig, port: int, ctx: ssl.SSLContext):
+        self.cfg = cfg
+        self.port = port
+        self.ctx = ctx
+        self.rng = random.Random(cfg.seed)
+        self.window = LatencyHistogram()
+        self.requests = 0
+        self.errors = 0
+        self.hostile: Counter = Counter()
+        self.hellos = [client_hello(ctx) for _ in range(8)]
+
+    async def _open(self, framed: bool):
+        if framed:
+            return await protocol.open_channel("127.0.0.1", self.port, self.ctx, "localhost")
+        return await asyncio.open_connection("127.0.0.1", self.port, ssl=self.ctx, server_hostname="localhost")
+
+    async def _request(self, conn, payload: bytes):
+        if isinstance(conn, protocol.Channel):
+            await protocol.request(conn, payload)
+            return
+        reader, writer = conn
+        writer.write(payload)
+        await writer.drain()
+        if not await reader.read(4096):
+            raise ConnectionError("server closed connection")
+
+    @staticmethod
+    def _close(conn):
+        if conn is not None:
+            (conn if isinstance(conn, protocol.Channel) else conn[1]).close()
+
+    async def _paced(self, every: float, framed: bool, payload, record: bool = False):
+        """Send on one kept-alive connection every `every` seconds, reconnecting after errors."""
+        conn, next_at = None, time.perf_counter()
+        try:
+            while True:
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                intended, next_at = next_at, next_at + every
+                try:
+                    if conn is None:
+                        conn = await asyncio.wait_for(self._open(framed), self.cfg.timeout)
+                    await asyncio.wait_for(self._request(conn, payload()), self.cfg.timeout)
+                except ERRORS:
+                    self.errors += 1
+                    self._close(conn)
+                    conn = None
+                    continue
+                self.requests += 1
+                if record:
+                    self.window.record(int((time.perf_counter() - intended) * 1e6))
+        finally:
+            self._close(conn)
+
+    async def _one_shot(self):
+        conn = None
+        try:
+            conn = await asyncio.wait_for(self._open(False), self.cfg.timeout)
+            await asyncio.wait_for(self._request(conn, b"storm"), self.cfg.timeout)
+            self.requests += 1
+        except ERRORS:
+            self.errors += 1
+        finally:
+            self._close(conn)
+
+    async def storms(self):
+        while True:
+            await asyncio.sleep(self.cfg.storm_every)
+            await asyncio.gather(*(self._one_shot() for _ in range(self.cfg.storm_size)))
+
+    async def _hostile_one(self):
+        kind = self.rng.choice(("aborted", "mutated_hello", "random_bytes", "bad_frames"))
+        self.hostile[kind] += 1
+        writer = None
+        try:
+            if kind == "bad_frames":
+                reader, writer = await asyncio.wait_for(self._open(False), self.cfg.timeout)
+                writer.write(protocol.MAGIC + self.rng.randbytes(self.rng.randint(1, 256)))
+            else:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection("127.0.0.1", self.port), self.cfg.timeout)
+                hello = self.rng.choice(self.hellos)
+                if kind == "aborted":
+                    data = hello[:self.rng.randint(1, len(hello) - 1)]
+                elif kind == "mutated_hello":
+                    data = bytearray(hello)
+                    for _ in range(self.rng.randint(1, 8)):
+                        data[self.rng.randrange(len(data))] = self.rng.randrange(256)
+                    data = bytes(data)
+                else:
+                    data = self.rng.randbytes(self.rng.randint(1, 2048))
+                writer.write(data)
+            await writer.drain()
+            if kind != "aborted":
+                # The server should answer with an alert or close; never hang.
+                await asyncio.wait_for(reader.read(4096), self.cfg.timeout)
+        except ERRORS:
+            pass
+        finally:
+            if writer is not None:
+                writer.close()
+
+    async def hostiles(self):
+        tasks: set[asyncio.Task] = set()
+        try:
+            while True:
+                await asyncio.sleep(self.rng.expovariate(self.cfg.hostile_rate))
+                t = asyncio.create_task(self._hostile_one())
+                tasks.add(t)
+                t.add_done_callback(tasks.discard)
+        finally:
+            for t in tasks:
+                t.cancel()
+
+    def tasks(self) -> list:
+        cfg = self.cfg
+        sizes = (64, 256, 1024, 4096)
+        steady = [self._paced(cfg.connections / cfg.rate, i % 2 == 1,
+                              lambda: self.rng.randbytes(self.rng.choice(sizes)), record=True)
+                  for i in range(cfg.connections)]
+        extra = [self.hostiles()] if cfg.hostile_rate > 0 else []
+        if cfg.storm_size > 0:
+            extra.append(self.storms())
+        if cfg.large_size > 0:
+            extra.append(self._paced(cfg.large_every, True, lambda: self.rng.randbytes(cfg.large_size)))
+        return steady + extra
+
+class Soak:
+    def __init__(self, cfg: SoakConfig):
+        self.cfg = cfg
+        self.workdir = Path(cfg.workdir or tempfile.mkdtemp(prefix="qasccs-soak-"))
+        self.workdir.mkdir(parents=True, exist_ok=True)
+        self.certs = Path(cfg.certs) if cfg.certs else generate(self.workdir / "certs")
+        self.report = SoakReport(cfg, str(self.workdir))
+        self.alloc_path = self.workdir / "alloc.txt"
+        self.proc: Optional[subprocess.Popen] = None
+        self.port = 0
+        self._baseline: Optional[dict[str, float]] = None
+        self._baseline_warm = False
+
+    def start_server(self):
+        sock = socket.create_server(("127.0.0.1", 0), backlog=ServerLimits().backlog)
+        r, w = os.pipe()
+        cmd = [sys.executable, "-m", "qasccs.secure_channel.server", "--listen-fd", str(sock.fileno()),
+               "--ready-fd", str(w), "--cert", str(self.certs / "server.crt"), "--key", str(self.certs / "server.key"),
+               "--log-level", "WARNING"]
+        if self.cfg.tracemalloc:
+            cmd += ["--profile", "alloc", "--profile-out", str(self.alloc_path)]
+        with open(self.workdir / "server.log", "ab") as log:
+            self.proc = subprocess.Popen(cmd + self.cfg.server_args, pass_fds=(sock.fileno(), w),
+                                         stdout=log, stderr=subprocess.STDOUT)
+        os.close(w)
+        try:
+            ready = os.read(r, 16)
+        finally:
+            os.close(r)
+        self.port = sock.getsockname()[1]
+        sock.close()
+        if not ready:
+            raise RuntimeError(f"server exited with {self.proc.wait()}; see {self.workdir / 'server.log'}")
+
+    def stop_server(self):
+        if self.proc is None or self.proc.poll() is not None:
+            return
+        self.proc.send_signal(signal.SIGTERM)
+        try:
+            self.proc.wait(30)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+
+    def _alloc_report(self) -> dict[str, float]:
+        before = self.alloc_path.stat().st_mtime_ns if self.alloc_path.exists() else 0
+        self.proc.send_signal(signal.SIGUSR1)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if self.alloc_path.exists() and self.alloc_path.stat().st_mtime_ns != before:
+                time.sleep(0.05)                      # let the writer finish
+                return parse_alloc_report(self.alloc_path.read_text(encoding="utf-8"))
+            time.sleep(0.02)
+        return {}
+
+    def _sample_server(self, t: float) -> tuple[int, int, list]:
+        rss, fds = process_stats(self.proc.pid)
+        top = []
+        if self.cfg.tracemalloc:
+            alloc = self._alloc_report()
+            # Growth is measured from the first report after warmup (the very first until then).
+            if self._baseline is None or (t >= self.cfg.warmup and not self._baseline_warm):
+                self._baseline, self._baseline_warm = alloc, t >= self.cfg.warmup
+            growth = {site: kib - self._baseline.get(site, 0.0) for site, kib in alloc.items()}
+            top = [[site, round(kib, 1)] for site, kib in Counter(growth).most_common(5) if kib > 0]
+        return rss, fds, top
+
+    async def _sampler(self, traffic: _Traffic, t0: float):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.cfg.interval)
+            if self.proc.poll() is not None:
+                self.report.failures.append(f"server exited with {self.proc.returncode} during the run")
+                return
+            t = time.perf_counter() - t0
+            window, traffic.window = traffic.window, LatencyHistogram()
+            rss, fds, top = await loop.run_in_executor(None, self._sample_server, t)
+            s = Sample(round(t, 2), rss, fds, traffic.requests, traffic.errors, window.summary(),
+                       dict(traffic.hostile), top)
+            self.report.samples.append(s)
+            print(f"[soak] t={s.t:.0f}s rss={rss / 1024:.1f}MiB fds={fds} p99={s.latency['p99_us'] / 1000:.1f}ms "
+                  f"requests={s.requests} errors={s.errors}", file=sys.stderr)
+
+    async def _run(self):
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        ctx.load_verify_locations(cafile=str(self.certs / "ca.crt"))
+        traffic = _Traffic(self.cfg, self.port, ctx)
+        t0 = time.perf_counter()
+        tasks = [asyncio.create_task(c) for c in traffic.tasks()]
+        sampler = asyncio.create_task(self._sampler(traffic, t0))
+        try:
+            await asyncio.wait_for(asyncio.shield(sampler), self.cfg.duration)
+        except asyncio.TimeoutError:
+            sampler.cancel()
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, sampler, return_exceptions=True)
+        self.report.elapsed = time.perf_counter() - t0
+
+    def run(self) -> SoakReport:
+        self.start_server()
+        try:
+            asyncio.run(self._run())
+        finally:
+            self.stop_server()
+        if not self.report.failures:
+            self.report.failures = evaluate(self.report.samples, self.cfg)
+        return self.report
+
+def run_soak(cfg: SoakConfig) -> SoakReport:
+    return Soak(cfg).run()
+
+def _seconds(text: str) -> float:
+    """'90', '90s', '15m' or '4h' in seconds."""
+    units = {"s": 1, "m": 60, "h": 3600}
+    return float(text[:-1]) * units[text[-1]] if text[-1:] in units else float(text)
+
+def main():
+    d = SoakConfig()
+    ap = argparse.ArgumentParser(description="Soak the secure channel server on loopback and check for drift")
+    ap.add_argument("--duration", type=_seconds, default=d.duration, help="Run length, e.g. 3600, 30m, 4h.")
+    ap.add_argument("--interval", type=_seconds, default=d.interval, help="Seconds between samples.")
+    ap.add_argument("--warmup", type=_seconds, default=d.warmup, help="Ignore samples taken before this.")
+    ap.add_argument("--rate", type=float, default=d.rate, help="Steady requests/s.")
+    ap.add_argument("--connections", type=int, default=d.connections, help="Steady kept-alive connections.")
+    ap.add_argument("--storm-size", type=int, default=d.storm_size)
+    ap.add_argument("--storm-every", type=float, default=d.storm_every)
+    ap.add_argument("--large-size", type=int, default=d.large_size, help="Large frame size, bytes (0 = off).")
+    ap.add_argument("--large-every", type=float, default=d.large_every)
+    ap.add_argument("--hostile-rate", type=float, default=d.hostile_rate, help="Aborted/malformed connections/s.")
+    ap.add_argument("--max-rss-growth-mb", type=float, default=d.max_rss_growth_mb)
+    ap.add_argument("--max-fd-growth", type=int, default=d.max_fd_growth)
+    ap.add_argument("--max-p99-ratio", type=float, default=d.max_p99_ratio)
+    ap.add_argument("--p99-floor-ms", type=float, default=d.p99_floor_ms)
+    ap.add_argument("--max-error-rate", type=float, default=d.max_error_rate)
+    ap.add_argument("--no-tracemalloc", dest="tracemalloc", action="store_false",
+                    help="Skip allocation tracking (it slows the server and inflates RSS).")
+    ap.add_argument("--certs", default=None, help="gen_certs directory (default: generate into the workdir).")
+    ap.add_argument("--workdir", default=None, help="Keep the server log and alloc reports here.")
+    ap.add_argument("--server-arg", dest="server_args", action="append", default=[],
+                    help="Extra server argument (repeatable), e.g. --server-arg=--max-handshakes=128.")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--json", dest="json_out", default=None)
+    args = ap.parse_args()
+
+    cfg = SoakConfig(**{k: v for k, v in vars(args).items() if k != "json_out"})
+    report = run_soak(cfg)
+    if args.json_out:
+        report.write_json(args.json_out)
+    for failure in report.failures:
+        print(f"[soak] FAIL: {failure}", file=sys.stderr)
+    print(f"[soak] {'PASS' if report.passed else 'FAIL'} after {report.elapsed:.0f}s "
+          f"({len(report.samples)} samples; logs in {report.workdir})")
+    sys.exit(0 if report.passed else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import pytest
+import ssl
+import sys
+from unittest.mock import patch
+
+from qasccs import metrics
+from qasccs.tools.gen_certs import main as gen_certs_main
+
+
+@pytest.fixture
+def temp_certs(tmp_path):
+    """Dev CA, server certificate and keys from gen_certs in a per-test directory"""
+    cert_dir = tmp_path / "certs"
+    with patch.object(sys, 'argv', ["prog", "--out", str(cert_dir)]):
+        gen_certs_main()
+    return cert_dir
+
+
+@pytest.fixture
+def contexts(temp_certs):
+    """(server, client) SSLContexts for the temp_certs server certificate and CA"""
+    server_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    server_ctx.load_cert_chain(str(temp_certs / "server.crt"), str(temp_certs / "server.key"))
+    client_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    client_ctx.load_verify_locations(cafile=str(temp_certs / "ca.crt"))
+    return server_ctx, client_ctx
+
+
+@pytest.fixture
+def enabled_metrics():
+    """Enable collection for one test and reset afterwards"""
+    metrics.REGISTRY.reset()
+    metrics.enable()
+    yield metrics.REGISTRY
+    metrics.enable(False)
+    metrics.REGISTRY.reset()
@@ -0,0 +1,107 @@
+import pytest
+import os
+import socket
+
+from qasccs.secure_channel.archive import ArchiveWriter, load_key, replay, read_segment, _segments
+from qasccs.secure_channel.server import BackgroundServer
+
+KEY = bytes(range(32))
+
+
+@pytest.mark.parametrize("cipher", ["aes-256-gcm", "chacha20-poly1305"])
+def test_roundtrip_with_chunking(tmp_path, cipher):
+    """Test frames (including multi-record ones) replay in order"""
+    frames = [b"hello", b"", os.urandom(200_000), b"x" * 65536]
+    with ArchiveWriter(tmp_path, KEY, cipher, chunk_size=65536) as w:
+        for i, f in enumerate(frames):
+            w.append(f, conn=i)
+    got = list(replay(tmp_path, KEY))
+    assert [fr.data for fr in got] == frames
+    assert [fr.conn for fr in got] == [0, 1, 2, 3]
+    assert b"hello" not in (tmp_path / "00000000.qarc").read_bytes()
+
+
+def test_rotation_and_reopen(tmp_path):
+    """Test segments rotate by size and a reopened writer starts a new segment"""
+    with ArchiveWriter(tmp_path, KEY, segment_bytes=4096) as w:
+        for i in range(50):
+            w.append(b"%d" % i * 100)
+    with ArchiveWriter(tmp_path, KEY) as w:
+        w.append(b"after restart")
+    segs = _segments(tmp_path)
+    assert len(segs) > 2
+    got = [fr.data for fr in replay(tmp_path, KEY)]
+    assert got == [b"%d" % i * 100 for i in range(50)] + [b"after restart"]
+
+
+def test_group_commit_resolves_waiters(tmp_path):
+    """Test durable() futures resolve after a shared fsync"""
+    with ArchiveWriter(tmp_path, KEY, commit_interval=0.01) as w:
+        seqs = [w.append(b"m%d" % i) for i in range(100)]
+        futs = [w.durable(s) for s in seqs]
+        assert all(f.result(timeout=5) >= s for f, s in zip(futs, seqs))
+        assert w.durable(seqs[0]).done()
+
+
+def test_tampering_detected_and_torn_tail_tolerated(tmp_path):
+    """Test a flipped byte fails authentication; a truncated tail is skipped"""
+    w = ArchiveWriter(tmp_path, KEY)
+    w.append(b"first")
+    w.append(b"second")
+    w.sync()
+    path = tmp_path / "00000000.qarc"
+    data = path.read_bytes()
+    w.close()
+    path.write_bytes(data[:-3])
+    assert [fr.data for fr in read_segment(path, KEY)] == [b"first"]
+    bad = bytearray(data)
+    bad[30] ^= 1
+    path.write_bytes(bytes(bad))
+    with pytest.raises(ValueError):
+        list(read_segment(path, KEY))
+    with pytest.raises(ValueError):
+        list(read_segment(tmp_path / "00000000.qarc", bytes(32)))
+
+
+def test_zero_filled_tail_tolerated_only_in_newest_segment(tmp_path):
+    """Test a zeroed or zero-padded last record ends replay quietly; in an older segment it raises"""
+    w = ArchiveWriter(tmp_path, KEY)
+    w.append(b"first")
+    w.append(b"second")
+    w.sync()
+    path = tmp_path / "00000000.qarc"
+    data = path.read_bytes()
+    w.close()
+    second = len(data) - (5 + 12 + len(b"second") + 16)    # record header, meta, payload, tag
+    for torn in (data[:second] + bytes(len(data) - second),  # record zeroed in place
+                 data[:second + 5] + bytes(4096),            # header written, body zero-padded
+                 data[:second] + bytes(5)):                  # zero header with an empty body
+        path.write_bytes(torn)
+        assert [fr.data for fr in replay(tmp_path, KEY)] == [b"first"]
+    with ArchiveWriter(tmp_path, KEY) as w:
+        w.append(b"later")
+    with pytest.raises(ValueError, match="failed authentication"):
+        list(replay(tmp_path, KEY))
+
+
+def test_load_key_creates_private_file(tmp_path):
+    """Test key file creation and reload"""
+    key = load_key(tmp_path / "k", create=True)
+    assert len(key) == 32
+    assert (tmp_path / "k").stat().st_mode & 0o077 == 0
+    assert load_key(tmp_path / "k") == key
+
+
+def test_server_archives_before_ack(contexts, tmp_path):
+    """Test the server persists payloads before acknowledging them"""
+    server_ctx, client_ctx = contexts
+    archive = ArchiveWriter(tmp_path / "archive", KEY)
+    with BackgroundServer(server_ctx, archive=archive) as srv:
+        with socket.create_connection(("127.0.0.1", srv.port)) as raw:
+            with client_ctx.wrap_socket(raw, server_hostname="localhost") as tls:
+                for msg in (b"one", b"two"):
+                    tls.sendall(msg)
+                    assert tls.recv(4096).startswith(b"ACK")
+                # Acknowledged means durable: visible to a reader before close.
+                assert [fr.data for fr in replay(tmp_path / "archive", KEY)] == [b"one", b"two"]
+    archive.close()
@@ -0,0 +1,105 @@
+import pytest
+import datetime
+import json
+import ssl
+import socket
+import sys
+import time
+from unittest.mock import patch
+
+from qasccs.tools.gen_certs import main as gen_certs_main
+from qasccs.secure_channel import certwatch
+from qasccs.secure_channel.certwatch import CertificateError, CertWatcher, validate
+from qasccs.secure_channel.server import BackgroundServer
+
+
+def _gen(out):
+    with patch.object(sys, 'argv', ["prog", "--out", str(out)]):
+        gen_certs_main()
+    return out
+
+
+def _client(ca):
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    ctx.load_verify_locations(cafile=str(ca))
+    return ctx
+
+
+def _ack(port, client_ctx):
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        with client_ctx.wrap_socket(sock, server_hostname="localhost") as tls:
+            tls.sendall(b"ping")
+            return tls.recv(1024)
+
+
+def _rotate(certs, tmp_path):
+    """Replace cert, key and CA the way a deploy would: write aside, then rename"""
+    fresh = _gen(tmp_path / "fresh")
+    for name in ("ca.crt", "server.key", "server.crt"):
+        (fresh / name).replace(certs / name)
+
+
+def test_validate_checks_key_chain_and_expiry(temp_certs, tmp_path):
+    """Test each pre-validation check rejects the matching defect"""
+    other = _gen(tmp_path / "other")
+    info = validate(temp_certs / "server.crt", temp_certs / "server.key", temp_certs / "ca.crt")
+    assert "qasccs.local" in info.subject and "Dev CA" in info.issuer
+    with pytest.raises(CertificateError, match="does not match"):
+        validate(temp_certs / "server.crt", other / "server.key")
+    with pytest.raises(CertificateError, match="chain to the CA"):
+        validate(temp_certs / "server.crt", temp_certs / "server.key", other / "ca.crt")
+    later = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=900)
+    with pytest.raises(CertificateError, match="not valid now"):
+        validate(temp_certs / "server.crt", temp_certs / "server.key", now=later)
+    (temp_certs / "server.crt").write_text("-----BEGIN CERTIFICATE-----\ntrunc")
+    with pytest.raises(CertificateError, match="cannot load"):
+        validate(temp_certs / "server.crt", temp_certs / "server.key")
+
+
+def test_rotation_swaps_context_for_new_handshakes(temp_certs, tmp_path, enabled_metrics):
+    """Test a valid rotation is served through the SNI callback and a broken one is ignored"""
+    old_client = _client(temp_certs / "ca.crt")
+    watcher = CertWatcher(temp_certs / "server.crt", temp_certs / "server.key", temp_certs / "ca.crt")
+    with BackgroundServer(watcher.front) as srv:
+        assert _ack(srv.port, old_client) == b"ACK (secure): 4 bytes"
+        assert not watcher.check()                                  # unchanged files
+        _rotate(temp_certs, tmp_path)
+        assert watcher.check()
+        new_client = _client(temp_certs / "ca.crt")
+        assert _ack(srv.port, new_client) == b"ACK (secure): 4 bytes"
+        with pytest.raises(ssl.SSLCertVerificationError):
+            _ack(srv.port, old_client)
+
+        (temp_certs / "server.key").write_bytes((tmp_path / "fresh" / "ca.key").read_bytes())
+        assert not watcher.check()
+        assert _ack(srv.port, new_client) == b"ACK (secure): 4 bytes"
+    assert certwatch.RELOADS.value(outcome="ok") == 1
+    assert certwatch.RELOADS.value(outcome="invalid") == 1
+    assert certwatch.NOT_AFTER.value() > time.time()
+
+
+def test_watcher_thread_picks_up_changes(temp_certs, tmp_path):
+    """Test the polling thread reloads without being asked"""
+    with CertWatcher(temp_certs / "server.crt", temp_certs / "server.key", interval=0.02) as watcher:
+        first = watcher.ctx
+        _rotate(temp_certs, tmp_path)
+        deadline = time.monotonic() + 5
+        while watcher.swaps == 0 and time.monotonic() < deadline:
+            time.sleep(0.02)
+    assert watcher.swaps == 1 and watcher.ctx is not first
+
+
+def test_invalid_certificates_fail_at_startup(temp_certs, tmp_path):
+    """Test the watcher refuses to start on a bad pair"""
+    other = _gen(tmp_path / "other")
+    with pytest.raises(CertificateError):
+        CertWatcher(temp_certs / "server.crt", other / "server.key")
+
+
+def test_cli_reports_certificate(temp_certs, capsys):
+    """Test the validation CLI prints the certificate summary"""
+    with patch.object(sys, 'argv', ["prog", str(temp_certs / "server.crt"), str(temp_certs / "server.key"),
+                                    "--ca", str(temp_certs / "ca.crt")]):
+        certwatch.main()
+    out = capsys.readouterr().out
+    assert json.loads(out[out.index("{"):])["subject"].endswith("O=QASCS-Dev,C=AL")
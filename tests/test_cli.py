@@ -154,3 +154,12 @@ def test_cli_invalid_scenario():
     with patch.object(sys, 'argv', test_args):
         with pytest.raises(SystemExit):
             main()
+
+
+def test_cli_as_of_year(capsys):
+    """Test CLI evaluates relative to --as-of-year"""
+    test_args = ["prog", "--algorithm", "AES-256", "--data-lifetime-years", "10", "--as-of-year", "2030"]
+    with patch.object(sys, 'argv', test_args):
+        main()
+    output = json.loads(capsys.readouterr().out)
+    assert output["quantum_safe_until_year"] == 2040
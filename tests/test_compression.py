@@ -0,0 +1,90 @@
+import pytest
+import asyncio
+import json
+import os
+
+from qasccs.secure_channel import compression, protocol
+from qasccs.secure_channel.archive import ArchiveWriter, replay
+from qasccs.secure_channel.compression import Compressor, build_dictionary
+from qasccs.secure_channel.server import BackgroundServer
+
+MESSAGE = json.dumps({"algorithm": "RSA-2048", "data_lifetime_years": 15, "data_classification": "high",
+                      "scenario": "moderate", "risk": "HIGH", "recommended_mode": "hybrid"}).encode()
+
+
+def test_dictionary_shrinks_small_json(enabled_metrics):
+    """Test the preset dictionary beats plain deflate on a small message and round-trips"""
+    with_dict, plain = Compressor(), Compressor(b"", max_ratio=1.0)
+    packed, compressed = with_dict.compress(MESSAGE)
+    assert compressed
+    assert compression.SAVED.value() == len(MESSAGE) - len(packed)
+    assert len(packed) < len(plain.compress(MESSAGE)[0]) < len(MESSAGE)
+    assert with_dict.decompress(packed) == MESSAGE
+    assert compression.FRAMES.value(outcome="compressed") == 2
+
+
+def test_small_and_incompressible_frames_skip(enabled_metrics):
+    """Test the size threshold and the ratio check"""
+    comp = Compressor(threshold=64)
+    assert comp.compress(b"tiny") == (b"tiny", False)
+    noise = os.urandom(512)
+    assert comp.compress(noise) == (noise, False)
+    assert compression.FRAMES.value(outcome="small") == 1
+    assert compression.FRAMES.value(outcome="poor_ratio") == 1
+
+
+def test_decompression_is_bounded():
+    """Test a frame inflating past the limit is rejected"""
+    comp = Compressor(max_size=1000)
+    bomb, _ = Compressor().compress(bytes(100000))
+    with pytest.raises(ValueError, match="inflates"):
+        comp.decompress(bomb)
+    with pytest.raises(ValueError):
+        comp.decompress(b"not deflate")
+
+
+def test_build_dictionary_puts_common_samples_last():
+    """Test dictionary building orders by frequency and respects the size"""
+    d = build_dictionary([b"rare", b"common", b"common", b"x" * 100], size=20)
+    assert d.endswith(b"common")
+    assert len(d) <= 20
+
+
+@pytest.mark.parametrize("kem", [None, "stub"])
+def test_negotiated_compression_over_channel(contexts, tmp_path, kem, enabled_metrics):
+    """Test compressed frames are restored before archiving, sealed or not"""
+    server_ctx, client_ctx = contexts
+    archive = ArchiveWriter(tmp_path / "archive", bytes(32))
+
+    async def run(port):
+        ch = await protocol.open_channel("127.0.0.1", port, client_ctx, "localhost", kem=kem,
+                                         compressor=Compressor())
+        try:
+            assert ch.compressor is not None
+            return [await protocol.request(ch, p) for p in (MESSAGE, b"short")]
+        finally:
+            ch.close()
+
+    with BackgroundServer(server_ctx, archive=archive, kems=["stub"], compressor=Compressor()) as srv:
+        acks = asyncio.run(run(srv.port))
+    archive.close()
+    assert acks == [(1, len(MESSAGE)), (2, 5)]
+    assert [f.data for f in replay(tmp_path / "archive", bytes(32))] == [MESSAGE, b"short"]
+    assert compression.FRAMES.value(outcome="compressed") == 1
+
+
+def test_dictionary_mismatch_falls_back_to_plain(contexts):
+    """Test a server with another dictionary declines and frames go uncompressed"""
+    server_ctx, client_ctx = contexts
+
+    async def run(port):
+        ch = await protocol.open_channel("127.0.0.1", port, client_ctx, "localhost", compressor=Compressor())
+        try:
+            return ch.compressor, await protocol.request(ch, MESSAGE)
+        finally:
+            ch.close()
+
+    with BackgroundServer(server_ctx, compressor=Compressor(b"another dictionary")) as srv:
+        negotiated, ack = asyncio.run(run(srv.port))
+    assert negotiated is None
+    assert ack == (1, len(MESSAGE))
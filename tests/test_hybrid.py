@@ -0,0 +1,84 @@
+import pytest
+import time
+
+from qasccs.secure_channel.hybrid import (
+    KeypairPool, Sealer, StubKEM, X448StandInKEM, available_kems, benchmark,
+    client_finish, client_start, kem_for, server_respond,
+)
+
+
+@pytest.mark.parametrize("kem", [StubKEM(), X448StandInKEM()])
+def test_both_sides_derive_the_same_keys(kem):
+    """Test the X25519 + KEM key schedule agrees and differs per direction"""
+    kp, msg = client_start(kem)
+    reply, server_keys = server_respond(kem, msg)
+    client_keys = client_finish(kem, kp, msg, reply)
+    assert client_keys == server_keys
+    assert client_keys.client_to_server != client_keys.server_to_client
+
+
+def test_kem_halves_round_trip():
+    """Test the X448 stand-in encapsulates to the decapsulated secret"""
+    kem = X448StandInKEM()
+    pk, sk = kem.generate_keypair()
+    ct, ss = kem.encapsulate(pk)
+    assert kem.decapsulate(sk, ct) == ss
+
+
+def test_sealers_are_directional_and_authenticated():
+    """Test counter-nonce sealing in both directions and tamper detection"""
+    kem = StubKEM()
+    kp, msg = client_start(kem)
+    reply, keys = server_respond(kem, msg)
+    c_out, c_in = keys.sealers(initiator=True)
+    s_out, s_in = keys.sealers(initiator=False)
+    for i in range(3):
+        assert s_in.open(c_out.seal(b"req%d" % i, b"hdr"), b"hdr") == b"req%d" % i
+    assert c_in.open(s_out.seal(b"ack")) == b"ack"
+    sealed = bytearray(c_out.seal(b"x"))
+    sealed[0] ^= 1
+    with pytest.raises(ValueError):
+        s_in.open(bytes(sealed))
+
+
+def test_tampered_kex_breaks_agreement():
+    """Test a modified KEX reply yields different keys"""
+    kem = StubKEM()
+    kp, msg = client_start(kem)
+    reply, server_keys = server_respond(kem, msg)
+    bad = reply[:-1] + bytes([reply[-1] ^ 1])
+    assert client_finish(kem, kp, msg, bad) != server_keys
+
+
+def test_keypair_pool_prefills_and_falls_back():
+    """Test the pool serves pre-generated keypairs and counts misses"""
+    pool = KeypairPool(StubKEM(), size=4)
+    pool.get()
+    assert pool.misses == 1
+    pool.start()
+    deadline = time.time() + 5
+    while len(pool) < 4 and time.time() < deadline:
+        time.sleep(0.01)
+    assert len(pool) == 4
+    kp = pool.get()
+    assert kp.kem_public is not None and pool.misses == 1
+    pool.close()
+
+
+def test_keypair_pool_sizes():
+    """Test a single-keypair pool is valid and an empty one is refused"""
+    pool = KeypairPool(StubKEM(), size=1).start()
+    assert pool.get().kem_public is not None
+    pool.close()
+    with pytest.raises(ValueError, match="at least 1"):
+        KeypairPool(StubKEM(), size=0)
+
+
+def test_kem_registry_and_benchmark():
+    """Test KEM lookup and the overhead benchmark"""
+    assert {"x448-standin", "stub"} <= set(available_kems())
+    with pytest.raises(ValueError):
+        kem_for("no-such-kem")
+    report = benchmark("stub", n=5)
+    assert report["kem"] == "stub"
+    assert report["handshake_pooled"]["median_us"] > 0
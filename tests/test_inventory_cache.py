@@ -0,0 +1,115 @@
+import pytest
+import os
+import sys
+import threading
+from pathlib import Path
+from unittest.mock import patch
+
+from qasccs.tools.gen_certs import main as gen_certs_main
+import qasccs.inventory.cache as cache_mod
+import qasccs.inventory.scanner as scanner
+from qasccs.inventory import ParseCache, scan
+
+
+@pytest.fixture
+def store(tmp_path):
+    """gen_certs output as a certificate store"""
+    out = tmp_path / "store"
+    with patch.object(sys, 'argv', ["prog", "--out", str(out)]):
+        gen_certs_main()
+    return out
+
+
+def _summary(items):
+    return sorted((Path(i.path).name, i.kind, i.algorithm, i.not_after) for i in items)
+
+
+def test_rescan_of_unchanged_store_hits_cache(store, tmp_path):
+    """Test second scan serves every file from the cache without reparsing"""
+    db = tmp_path / "cache.db"
+    with ParseCache(db) as cache:
+        first = list(scan([store], workers=2, cache=cache))
+        assert cache.misses == 4
+    with ParseCache(db) as cache, patch.object(scanner, "scan_file", side_effect=AssertionError("reparsed")):
+        second = list(scan([store], workers=2, cache=cache))
+        assert cache.hits == 4
+        assert cache.misses == 0
+    assert _summary(first) == _summary(second)
+
+
+def test_touched_file_hits_by_content_hash(store, tmp_path):
+    """Test an mtime change with identical content is a content-hash hit"""
+    with ParseCache(tmp_path / "cache.db") as cache:
+        list(scan([store], cache=cache))
+        st = os.stat(store / "server.crt")
+        os.utime(store / "server.crt", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        cache.hits = cache.misses = 0
+        list(scan([store], cache=cache))
+        assert cache.hits == 4
+        assert cache.misses == 0
+
+
+def test_changed_content_is_reparsed(store, tmp_path):
+    """Test modified files miss and are re-cached"""
+    with ParseCache(tmp_path / "cache.db") as cache:
+        list(scan([store], cache=cache))
+        (store / "server.crt").write_bytes((store / "ca.crt").read_bytes() * 2)
+        cache.hits = cache.misses = 0
+        items = [i for i in scan([store], cache=cache) if i.path.endswith("server.crt")]
+        assert cache.misses == 1
+        assert len(items) == 2
+
+
+def test_copied_file_shares_entry_with_new_path(store, tmp_path):
+    """Test content addressing: a copy is served from the original's entry"""
+    with ParseCache(tmp_path / "cache.db") as cache:
+        list(scan([store], cache=cache))
+        copy = store / "sub" / "copy.crt"
+        copy.parent.mkdir()
+        copy.write_bytes((store / "ca.crt").read_bytes())
+        cache.hits = cache.misses = 0
+        [item] = [i for i in scan([store], cache=cache) if i.path.endswith("copy.crt")]
+        assert item.path == str(copy)
+        assert cache.misses == 0
+        assert len(cache) == 4
+
+
+def test_lru_eviction_by_entries(store, tmp_path):
+    """Test the cache is bounded by entry count"""
+    with ParseCache(tmp_path / "cache.db", max_entries=2) as cache:
+        list(scan([store], cache=cache))
+        assert len(cache) == 2
+
+
+def test_lru_eviction_by_bytes(store, tmp_path):
+    """Test the cache is bounded by stored payload size"""
+    with ParseCache(tmp_path / "cache.db", max_bytes=1) as cache:
+        list(scan([store], cache=cache))
+        assert len(cache) == 0
+
+
+def test_cold_scan_hashes_in_pool_and_streams(store, tmp_path):
+    """Test a cold scan hashes misses off the calling thread and yields before the walk ends"""
+    for i in range(30):
+        (store / f"copy{i}.crt").write_bytes((store / "ca.crt").read_bytes())
+    walked, hashed_on = [], set()
+    real_digest, real_iter = cache_mod._digest, cache_mod.iter_files
+
+    def digest(path):
+        hashed_on.add(threading.get_ident())
+        return real_digest(path)
+
+    def iter_files(*args):
+        for path in real_iter(*args):
+            walked.append(path)
+            yield path
+
+    with ParseCache(tmp_path / "cache.db") as cache, \
+            patch.object(cache_mod, "_digest", digest), patch.object(cache_mod, "iter_files", iter_files):
+        it = scan([store], workers=1, cache=cache)
+        next(it)
+        assert len(walked) < 34
+        rest = list(it)
+    assert len(rest) == 33 and len(walked) == 34
+    assert hashed_on and threading.get_ident() not in hashed_on
+    assert cache.misses == 4 and cache.hits == 30          # copies of ca.crt are parsed once
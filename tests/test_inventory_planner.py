@@ -0,0 +1,71 @@
+import pytest
+import sys
+from datetime import datetime, UTC
+from unittest.mock import patch
+
+from qasccs.tools.gen_certs import main as gen_certs_main
+from qasccs.quantum_risk_engine.models import RiskResponse
+from qasccs.inventory import scan, evaluate_inventory
+from qasccs.inventory.scanner import InventoryItem
+from qasccs.inventory.planner import MigrationPlan, plan_task
+
+
+def _resp(year, risk="HIGH"):
+    return RiskResponse(risk=risk, recommended_mode="hybrid", quantum_safe_until_year=year, rationale="r")
+
+
+def _item(name, expiry_year=None):
+    not_after = datetime(expiry_year, 6, 1, tzinfo=UTC) if expiry_year else None
+    return InventoryItem(name, kind="certificate" if expiry_year else "private_key",
+                         algorithm="RSA-2048", not_after=not_after)
+
+
+def test_deadline_is_earlier_of_expiry_and_quantum_year():
+    """Test task deadline and driver"""
+    renew = plan_task(_item("a", 2028), _resp(2037))
+    assert (renew.deadline_year, renew.driver) == (2028, "renewal")
+    quantum = plan_task(_item("b", 2040), _resp(2031))
+    assert (quantum.deadline_year, quantum.driver) == (2031, "quantum")
+    key_only = plan_task(_item("c"), _resp(2037))
+    assert (key_only.deadline_year, key_only.driver) == (2037, "quantum")
+
+
+def test_plan_queries_are_sorted_and_bounded():
+    """Test due_before / due_between on the sorted index"""
+    pairs = [(_item(f"a{y}", y), _resp(2040)) for y in (2035, 2027, 2031, 2027, 2033)]
+    pairs.append((_item("unmodeled"), None))
+    plan = MigrationPlan.from_assessments(pairs)
+    assert len(plan) == 5
+    assert plan.unassessed == 1
+    assert [t.deadline_year for t in plan] == [2027, 2027, 2031, 2033, 2035]
+    assert plan.count_due_before(2031) == 2
+    assert [t.deadline_year for t in plan.due_before(2032)] == [2027, 2027, 2031]
+    assert [t.deadline_year for t in plan.due_between(2031, 2035)] == [2031, 2033]
+    assert plan.due_before(2000) == []
+
+
+def test_add_keeps_order_and_workload_histogram():
+    """Test incremental insertion and per-year workload"""
+    plan = MigrationPlan()
+    for y in (2030, 2028, 2030):
+        plan.add(plan_task(_item("x", y), _resp(2045)))
+    plan.add(plan_task(_item("k"), _resp(2029)))
+    assert [t.deadline_year for t in plan] == [2028, 2029, 2030, 2030]
+    assert plan.workload_by_year() == {2028: 1, 2029: 1, 2030: 2}
+    assert plan.workload_by_year_and_driver()[2029] == {"quantum": 1}
+
+
+def test_plan_from_gen_certs_lifetimes(tmp_path):
+    """Test the 825-day leaf renews before the 3650-day CA under a conservative scenario"""
+    with patch.object(sys, 'argv', ["prog", "--out", str(tmp_path)]):
+        gen_certs_main()
+    pairs = evaluate_inventory(scan([tmp_path / "ca.crt", tmp_path / "server.crt"]),
+                               data_lifetime_years=30, scenario="conservative")
+    plan = MigrationPlan.from_assessments(pairs)
+    leaf, ca = list(plan)
+    assert leaf.path.endswith("server.crt")
+    assert leaf.driver == "renewal"
+    assert ca.deadline_year >= leaf.deadline_year
+    summary = plan.summary(before=ca.deadline_year + 1)
+    assert summary["planned"] == 2
+    assert len(summary["schedule"]) == 2
@@ -0,0 +1,101 @@
+import pytest
+import asyncio
+import socket
+
+from qasccs.secure_channel.server import BackgroundServer
+from qasccs.inventory.prober import Prober, ProbeResult, evaluate_probe, parse_target
+
+
+@pytest.fixture
+def server(contexts):
+    """Local secure_channel server with gen_certs certificates"""
+    with BackgroundServer(contexts[0]) as srv:
+        yield srv
+
+
+def _closed_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_parse_target():
+    """Test host:port parsing with defaults and IPv6"""
+    assert parse_target("Example.com") == ("example.com", 443)
+    assert parse_target("example.com:8443") == ("example.com", 8443)
+    assert parse_target("[::1]:9000") == ("::1", 9000)
+    for bad in ("example.com:0", "example.com:65536", "example.com:https", "example.com:", "[::1]:-1", ":443"):
+        with pytest.raises(ValueError):
+            parse_target(bad)
+
+
+def test_bad_target_reported_per_target(server):
+    """Test an unparsable target gets an error result and the rest of the batch still runs"""
+    results = asyncio.run(Prober().probe_many(["example.com:99999", f"127.0.0.1:{server.port}", "example.com:99999"]))
+    assert len(results) == 2
+    assert results[0].error and "invalid port" in results[0].error and not results[0].ok
+    assert results[1].ok, results[1].error
+
+
+def test_probe_local_server(server):
+    """Test probing the local secure_channel server"""
+    [res] = asyncio.run(Prober().probe_many([f"127.0.0.1:{server.port}"]))
+    assert res.ok, res.error
+    assert res.protocol in ("TLSv1.2", "TLSv1.3")
+    assert res.cert_key_type == "RSA"
+    assert res.cert_algorithm == "RSA-2048"
+    assert res.key_exchange is not None
+    assert "localhost" in res.sans
+
+
+def test_probe_maps_to_risk_requests(server):
+    """Test probe results feed evaluate_risk per component"""
+    [res] = asyncio.run(Prober().probe_many([f"127.0.0.1:{server.port}"]))
+    reqs = res.risk_requests(data_lifetime_years=20, scenario="aggressive")
+    assert reqs["certificate"].algorithm == "RSA-2048"
+    assert reqs["cipher"].algorithm in ("AES-128", "AES-256")
+    assessed = evaluate_probe(res, data_lifetime_years=20, scenario="aggressive")
+    assert assessed["certificate"].risk == "HIGH"
+    assert assessed["key_exchange"].risk == "HIGH"
+
+
+def test_unreachable_target_reports_error():
+    """Test connection failures are recorded, not raised"""
+    [res] = asyncio.run(Prober(timeout=2).probe_many([f"127.0.0.1:{_closed_port()}"]))
+    assert not res.ok
+    assert res.error
+
+
+def test_duplicate_targets_probed_once(server):
+    """Test deduplication and per-host result caching"""
+    prober = Prober()
+    calls = []
+    original = prober._connect
+
+    async def counting(host, port):
+        calls.append((host, port))
+        return await original(host, port)
+
+    prober._connect = counting
+    target = f"127.0.0.1:{server.port}"
+    results = asyncio.run(prober.probe_many([target, target, f" {target} "]))
+    assert len(results) == 1
+    again = asyncio.run(prober.probe_many([target]))
+    assert again[0] is results[0]
+    assert len(calls) == 1
+
+
+def test_many_targets_bounded_concurrency(server):
+    """Test a batch of targets with a small concurrency bound"""
+    targets = [f"127.0.0.1:{server.port}", f"localhost:{server.port}", f"127.0.0.1:{_closed_port()}"]
+    results = asyncio.run(Prober(concurrency=1, timeout=2).probe_many(targets))
+    assert [r.ok for r in results] == [True, True, False]
+
+
+def test_kx_mapping_for_hybrid_group():
+    """Test a hybrid group maps to the hybrid algorithm"""
+    res = ProbeResult("h", 443, ok=True, key_exchange="X25519MLKEM768", cipher="TLS_AES_256_GCM_SHA384")
+    reqs = res.risk_requests(10)
+    assert reqs["key_exchange"].algorithm == "HYBRID-ECDHE+KYBER"
+    assert reqs["cipher"].algorithm == "AES-256"
+    assert "certificate" not in reqs
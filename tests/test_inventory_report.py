@@ -0,0 +1,80 @@
+import pytest
+import json
+import sys
+from unittest.mock import patch
+
+from qasccs.quantum_risk_engine.models import RiskResponse
+from qasccs.quantum_risk_engine.resultfile import json_to_bin
+from qasccs.inventory.report import FleetReport, UnitMap, assessments, iter_rows, main
+
+
+def _row(path, alg, risk, year, mode="hybrid"):
+    resp = {"risk": risk, "recommended_mode": mode, "quantum_safe_until_year": year, "rationale": "r", "notes": None}
+    return {"path": path, "algorithm": alg, "assessment": resp}
+
+
+ROWS = [
+    _row("/srv/payments/a.crt", "RSA-2048", "HIGH", 2031),
+    _row("/srv/payments/b.crt", "ECC-P256", "HIGH", 2029),
+    _row("/srv/web/c.crt", "ECC-P384", "MEDIUM", 2040),
+    _row("/srv/web/d.key", "AES-256", "LOW", 2050, mode="classical"),
+    {"path": "/srv/web/weak.pub", "algorithm": None, "assessment": None},
+]
+
+
+def test_counts_units_and_quantiles():
+    """Test one-pass counters, per-unit earliest year and year quantiles"""
+    units = UnitMap({"/srv/payments/": "payments", "/srv/": "platform"})
+    d = FleetReport(unit_map=units).consume(assessments(ROWS, "high")).to_dict()
+    assert d["assets"] == 4
+    assert d["by_risk"] == {"HIGH": 2, "MEDIUM": 1, "LOW": 1}
+    assert d["by_classification"] == {"high": 4}
+    assert d["business_units"]["payments"] == {"assets": 2, "high": 2, "earliest_safe_until": 2029,
+                                               "earliest_asset": "/srv/payments/b.crt"}
+    assert d["business_units"]["platform"]["earliest_safe_until"] == 2040
+    assert (d["safe_until"]["min"], d["safe_until"]["p50"], d["safe_until"]["max"]) == (2029, 2031, 2050)
+
+
+def test_top_offenders_are_bounded_and_ordered():
+    """Test the top-K heap keeps the worst assets, HIGH and earliest first"""
+    rows = [_row(f"/a{y}", "RSA-2048", "HIGH" if y % 2 else "MEDIUM", y) for y in range(2030, 2060)]
+    report = FleetReport(top=3).consume(assessments(rows))
+    assert len(report._heap) == 3
+    assert [o["quantum_safe_until_year"] for o in report.offenders()] == [2031, 2033, 2035]
+
+
+def test_prober_rows_and_bare_responses():
+    """Test prober components and plain RiskResponse rows are both accepted"""
+    resp = RiskResponse(risk="HIGH", recommended_mode="hybrid", quantum_safe_until_year=2031, rationale="r").model_dump()
+    probe = {"host": "example.com", "port": 443, "target": "example.com:443", "ok": True,
+             "cipher": "TLS_AES_256_GCM_SHA384", "key_exchange": "X25519", "cert_algorithm": "RSA-2048",
+             "assessment": {"certificate": resp, "key_exchange": resp, "cipher": resp}}
+    got = list(assessments([probe, resp]))
+    assert [a.asset for a in got] == ["example.com:443#certificate", "example.com:443#key_exchange",
+                                      "example.com:443#cipher", None]
+    assert [a.algorithm for a in got[:3]] == ["RSA-2048", "ECC-P256", "AES-256"]
+
+
+def test_iter_rows_streams_lines_and_arrays(tmp_path):
+    """Test JSON lines and JSON arrays are both read"""
+    (tmp_path / "a.jsonl").write_text("\n".join(json.dumps(r) for r in ROWS) + "\n")
+    (tmp_path / "a.json").write_text(json.dumps(ROWS, indent=2))
+    assert list(iter_rows(str(tmp_path / "a.jsonl"))) == ROWS
+    assert list(iter_rows(str(tmp_path / "a.json"))) == ROWS
+
+
+def test_cli_markdown_and_qrsk(tmp_path, capsys):
+    """Test the CLI renders Markdown from JSON lines and JSON from a .qrsk file"""
+    src = tmp_path / "scan.jsonl"
+    src.write_text("\n".join(json.dumps(r) for r in ROWS) + "\n")
+    with patch.object(sys, 'argv', ["prog", str(src)]):
+        main()
+    md = capsys.readouterr().out
+    assert md.startswith("# Fleet quantum risk report")
+    assert "| HIGH | 2 |" in md
+    json_to_bin(str(src), str(tmp_path / "r.qrsk"))
+    with patch.object(sys, 'argv', ["prog", str(tmp_path / "r.qrsk"), "--qrsk", "--format", "json"]):
+        main()
+    d = json.loads(capsys.readouterr().out)
+    assert d["assets"] == 4
+    assert d["top_offenders"][0]["asset"] == "/srv/payments/b.crt"
@@ -0,0 +1,124 @@
+import pytest
+import base64
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import dh, dsa, ec, ed25519, rsa
+
+from qasccs.tools.gen_certs import main as gen_certs_main
+import qasccs.inventory.scanner as scanner
+from qasccs.inventory import scan, scan_file, evaluate_inventory, algorithm_for_key
+
+
+def _pem_public(key):
+    return key.public_key().public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+
+
+@pytest.fixture
+def store(tmp_path):
+    """A small certificate store: gen_certs output plus assorted keys"""
+    with patch.object(sys, 'argv', ["prog", "--out", str(tmp_path / "dev")]):
+        gen_certs_main()
+    keys = tmp_path / "keys"
+    keys.mkdir()
+    (keys / "p384.pub").write_bytes(_pem_public(ec.generate_private_key(ec.SECP384R1())))
+    (keys / "ed.pub").write_bytes(_pem_public(ed25519.Ed25519PrivateKey.generate()))
+    (keys / "weak.pub").write_bytes(_pem_public(rsa.generate_private_key(65537, 1024)))
+    ca_der = scanner.x509.load_pem_x509_certificate((tmp_path / "dev" / "ca.crt").read_bytes())
+    (keys / "ca.der").write_bytes(ca_der.public_bytes(serialization.Encoding.DER))
+    (keys / "notes.txt").write_text("not a cert")
+    return tmp_path
+
+
+def test_algorithm_mapping():
+    """Test public keys map to the risk engine's Algorithm literals"""
+    assert algorithm_for_key(rsa.generate_private_key(65537, 3072).public_key())[2] == "RSA-3072"
+    assert algorithm_for_key(ec.generate_private_key(ec.SECP256R1()).public_key()) == ("EC:secp256r1", 256, "ECC-P256")
+    assert algorithm_for_key(ed25519.Ed25519PrivateKey.generate().public_key())[2] == "ECC-P256"
+
+
+def test_weak_and_legacy_keys_are_rated_conservatively():
+    """Test short RSA, DSA, DH and unlisted curves map to a classical profile instead of None"""
+    assert algorithm_for_key(rsa.generate_private_key(65537, 1024).public_key()) == ("RSA", 1024, "RSA-2048")
+    assert algorithm_for_key(dsa.generate_private_key(1024).public_key()) == ("DSA", 1024, "RSA-2048")
+    assert algorithm_for_key(dsa.generate_private_key(3072))[2] == "RSA-3072"
+    # RFC 2409 group 2 (1024-bit MODP) so no parameter generation is needed.
+    p = int("FFFFFFFFFFFFFFFFC90FDAA22168C234C4C6628B80DC1CD129024E088A67CC74020BBEA63B139B22514A08798E3404DD"
+            "EF9519B3CD3A431B302B0A6DF25F14374FE1356D6D51C245E485B576625E7EC6F44C42E9A637ED6B0BFF5CB6F406B7ED"
+            "EE386BFB5A899FA5AE9F24117C4B1FE649286651ECE65381FFFFFFFFFFFFFFFF", 16)
+    dh_key = dh.DHParameterNumbers(p, 2).parameters().generate_private_key()
+    assert algorithm_for_key(dh_key.public_key()) == ("DH", 1024, "RSA-2048")
+    assert algorithm_for_key(ec.generate_private_key(ec.SECP192R1()).public_key())[2] == "ECC-P256"
+
+
+def test_scan_file_certificate_fields(store):
+    """Test certificate metadata extraction"""
+    [item] = scan_file(store / "dev" / "server.crt")
+    assert item.kind == "certificate"
+    assert item.algorithm == "RSA-2048"
+    assert "localhost" in item.sans
+    assert "127.0.0.1" in item.sans
+    assert item.not_after is not None
+
+
+def test_scan_directory_in_parallel(store):
+    """Test walking a store with a thread pool"""
+    items = list(scan([store], workers=4))
+    by_name = {Path(i.path).name: i for i in items}
+    assert set(by_name) == {"ca.crt", "ca.key", "server.crt", "server.key", "p384.pub", "ed.pub", "weak.pub", "ca.der"}
+    assert by_name["p384.pub"].algorithm == "ECC-P384"
+    assert by_name["ca.der"].kind == "certificate"
+    assert by_name["ca.key"].kind == "private_key"
+    assert (by_name["weak.pub"].key_size, by_name["weak.pub"].algorithm) == (1024, "RSA-2048")
+
+
+def test_scan_with_process_pool(store):
+    """Test process-pool parsing yields the same inventory"""
+    threaded = sorted(i.path for i in scan([store], workers=2))
+    forked = sorted(i.path for i in scan([store], workers=2, processes=True))
+    assert threaded == forked
+
+
+def test_large_bundle_uses_mmap(store, tmp_path, monkeypatch):
+    """Test multi-certificate bundles above the mmap threshold"""
+    pem = (store / "dev" / "server.crt").read_bytes()
+    bundle = tmp_path / "bundle.pem"
+    bundle.write_bytes(pem * 50)
+    monkeypatch.setattr(scanner, "MMAP_THRESHOLD", 1024)
+    items = scan_file(bundle)
+    assert len(items) == 50
+    assert [i.index for i in items] == list(range(50))
+
+
+def test_corrupt_block_reported_not_raised(tmp_path):
+    """Test a broken PEM block becomes an error item"""
+    bad = tmp_path / "bad.pem"
+    bad.write_bytes(b"-----BEGIN CERTIFICATE-----\nAAAA\n-----END CERTIFICATE-----\n")
+    [item] = scan_file(bad)
+    assert item.error
+
+
+def test_unsupported_key_type_reported_not_raised(store, tmp_path):
+    """Test a certificate with an unknown public key algorithm is an error item, not a failed scan"""
+    cert = scanner.x509.load_pem_x509_certificate((store / "dev" / "server.crt").read_bytes())
+    der = cert.public_bytes(serialization.Encoding.DER)
+    # rsaEncryption -> 1.2.840.113549.1.1.127, which has no key type.
+    der = der.replace(bytes.fromhex("06092a864886f70d010101"), bytes.fromhex("06092a864886f70d01017f"))
+    odd = tmp_path / "odd"
+    odd.mkdir()
+    (odd / "odd.der").write_bytes(der)
+    pem = b"-----BEGIN CERTIFICATE-----\n" + base64.encodebytes(der) + b"-----END CERTIFICATE-----\n"
+    (odd / "odd.pem").write_bytes(pem + (store / "dev" / "ca.crt").read_bytes())
+    items = sorted(scan([odd], workers=2), key=lambda i: (i.path, i.index))
+    assert [(Path(i.path).name, bool(i.error)) for i in items] == [("odd.der", True), ("odd.pem", True), ("odd.pem", False)]
+    assert "Unknown key type" in items[0].error
+
+
+def test_evaluate_inventory_streams_risk(store):
+    """Test scanned items feed evaluate_risk"""
+    results = list(evaluate_inventory(scan([store / "keys"]), data_lifetime_years=20, scenario="aggressive"))
+    assessed = [(i, r) for i, r in results if r is not None]
+    assert len(assessed) == len(results) == 4
+    assert all(r.risk == "HIGH" for _, r in assessed)
@@ -0,0 +1,91 @@
+import pytest
+import itertools
+import threading
+
+from qasccs import keyfactory
+from qasccs.keyfactory import KeyFactory, standard_generators
+
+
+def test_pool_fills_to_high_watermark_and_items_are_unique():
+    """Test workers fill a pool to its high watermark and get() hands each item out once"""
+    counter = itertools.count()
+    with KeyFactory() as kf:
+        kf.register("n", lambda: next(counter), low=2, high=6)
+        assert kf.wait_ready("n", timeout=5)
+        assert kf.depth("n") == 6
+        taken = [kf.get("n") for _ in range(4)]
+    assert len(set(taken)) == 4
+    assert kf.stats()["n"]["starved"] == 0
+
+
+def test_refill_waits_for_low_watermark():
+    """Test hysteresis: no refill until depth drops to the low watermark"""
+    gate = threading.Event()
+    counter = itertools.count()
+
+    def generate():
+        gate.wait(5)
+        return next(counter)
+
+    with KeyFactory() as kf:
+        kf.register("n", generate, low=2, high=5)
+        gate.set()
+        assert kf.wait_ready("n", timeout=5)
+        gate.clear()
+        kf.get("n")
+        kf.get("n")
+        assert kf.stats()["n"]["generated"] == 5          # depth 3 > low: still idle
+        kf.get("n")                                       # depth 2 == low: refill starts
+        gate.set()
+        assert kf.wait_ready("n", timeout=5)
+        assert kf.stats()["n"]["generated"] == 8
+
+
+def test_empty_pool_generates_inline_and_counts_starvation(enabled_metrics):
+    """Test get() on an empty pool falls back to inline generation"""
+    kf = KeyFactory()
+    kf.register("n", lambda: "k", low=1, high=4)
+    assert kf.get("n") == "k"
+    assert kf.stats()["n"]["starved"] == 1
+    assert keyfactory.STARVED.value(pool="n") == 1
+
+
+def test_slow_pool_does_not_starve_fast_pool():
+    """Test the emptiest pool is refilled first"""
+    release = threading.Event()
+
+    with KeyFactory(workers=1) as kf:
+        kf.register("slow", lambda: release.wait(5) or "s", low=1, high=4)
+        kf.register("fast", lambda: "f", low=1, high=4)
+        # The single worker is blocked on "slow"; once released it must interleave.
+        release.set()
+        assert kf.wait_ready("fast", timeout=5)
+        assert kf.wait_ready("slow", timeout=5)
+
+
+def test_generation_errors_do_not_kill_the_worker():
+    """Test a failing generator stops its own pool only"""
+    def broken():
+        raise RuntimeError("no entropy")
+
+    with KeyFactory(workers=1) as kf:
+        kf.register("broken", broken, low=1, high=4)
+        kf.register("ok", lambda: 1, low=1, high=4)
+        assert kf.wait_ready("ok", timeout=5)
+        assert kf.depth("broken") == 0
+
+
+def test_metrics_and_standard_generators(enabled_metrics):
+    """Test depth/generated metrics with a real key type"""
+    with KeyFactory() as kf:
+        kf.register("x25519", standard_generators()["x25519"], low=1, high=3)
+        assert kf.wait_ready("x25519", timeout=5)
+        kf.get("x25519")
+    assert keyfactory.GENERATED.value(pool="x25519") == 3
+    assert keyfactory.DEPTH.value(pool="x25519") == 2
+
+
+def test_invalid_watermarks_rejected():
+    """Test low must be below high"""
+    with pytest.raises(ValueError):
+        KeyFactory().register("n", lambda: 1, low=4, high=4)
@@ -0,0 +1,163 @@
+import pytest
+import asyncio
+import csv
+import json
+import re
+import ssl
+
+from qasccs.secure_channel.compression import Compressor
+from qasccs.secure_channel.server import BackgroundServer
+from qasccs.secure_channel.loadgen import LatencyHistogram, LoadConfig, _Conn, run_load
+
+
+@pytest.fixture
+def tls_server(contexts):
+    """Background SecureServer on an ephemeral port"""
+    ctx, client_ctx = contexts
+    with BackgroundServer(ctx, compressor=Compressor()) as srv:
+        yield srv.port, client_ctx
+
+
+def test_histogram_percentiles_within_precision():
+    """Test log-linear buckets keep percentiles within relative error"""
+    h = LatencyHistogram()
+    for v in range(1, 10001):
+        h.record(v)
+    assert h.total == 10000
+    assert abs(h.percentile(50) - 5000) / 5000 < 0.02
+    assert abs(h.percentile(99) - 9900) / 9900 < 0.02
+    assert h.percentile(100) == 10000
+
+
+def test_histogram_coordinated_omission_correction():
+    """Test a stalled sample back-fills the requests that were never sent"""
+    h = LatencyHistogram()
+    h.record_corrected(1000, 100)
+    # 1000, 900, 800, ..., 100
+    assert h.total == 10
+    assert h.min == 100
+
+
+def test_closed_loop_reuses_connections(temp_certs, tls_server):
+    """Test closed-loop run with connection reuse"""
+    port, ctx = tls_server
+    cfg = LoadConfig(port=port, model="closed", concurrency=2, requests=20, duration=10,
+                     message_sizes=[32, 128], reuse=True, seed=1)
+    result = run_load(cfg, ctx)
+    assert result.completed == 20
+    assert result.errors == 0
+    assert result.connections <= 2
+    assert result.bytes_sent > 0
+
+
+def test_raw_request_waits_for_every_chunk_ack(tls_server):
+    """Test a raw payload over the server's 4096-byte read gets all its ACKs before the next request"""
+    port, ctx = tls_server
+
+    async def run():
+        conn = _Conn(*await asyncio.open_connection("127.0.0.1", port, ssl=ctx, server_hostname="localhost"))
+        first = await conn.request(bytes(16000))
+        second = await conn.request(bytes(10))
+        await conn.close()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert sum(map(int, re.findall(rb"(\d+) bytes", first))) == 16000
+    assert second == b"ACK (secure): 10 bytes"
+
+
+def test_open_loop_new_connection_per_request(temp_certs, tls_server):
+    """Test open-loop Poisson arrivals with a new connection per request"""
+    port, ctx = tls_server
+    cfg = LoadConfig(port=port, model="open", arrival="poisson", rate=200, requests=10,
+                     duration=10, reuse=False, seed=2)
+    result = run_load(cfg, ctx)
+    assert result.completed == 10
+    assert result.connections == 10
+    assert result.latency.total == 10
+
+
+def test_results_written_as_json_and_csv(temp_certs, tls_server, tmp_path):
+    """Test JSON and CSV result outputs"""
+    port, ctx = tls_server
+    result = run_load(LoadConfig(port=port, requests=5, duration=10, concurrency=1), ctx)
+    result.write_json(tmp_path / "r.json")
+    result.write_csv(tmp_path / "r.csv")
+    data = json.loads((tmp_path / "r.json").read_text())
+    assert data["completed"] == 5
+    assert "p99_us" in data["latency"]
+    rows = list(csv.reader(open(tmp_path / "r.csv")))
+    assert rows[0] == ["percentile", "latency_us", "service_time_us"]
+    assert len(rows) > 1
+
+
+@pytest.mark.parametrize("proto", ["framed", "hybrid"])
+def test_framed_and_hybrid_protocols(temp_certs, tls_server, proto):
+    """Test the load generator over the framed protocol, with and without the hybrid exchange"""
+    port, ctx = tls_server
+    cfg = LoadConfig(port=port, concurrency=2, requests=20, duration=10, protocol=proto, kem="x448-standin")
+    result = run_load(cfg, ctx)
+    assert result.completed == 20
+    assert result.errors == 0
+    assert result.to_dict()["config"]["protocol"] == proto
+
+
+def test_sessions_multiplexed_over_few_connections(temp_certs, tls_server):
+    """Test closed-loop sessions running as streams over shared connections"""
+    port, ctx = tls_server
+    cfg = LoadConfig(port=port, concurrency=8, requests=40, duration=10, protocol="framed", mux_connections=2)
+    result = run_load(cfg, ctx)
+    assert result.completed == 40
+    assert result.errors == 0
+    assert result.connections == 2
+
+
+def test_pipelined_sessions_share_connections(temp_certs, tls_server):
+    """Test sessions pipelining frames over shared framed connections"""
+    port, ctx = tls_server
+    cfg = LoadConfig(port=port, concurrency=16, requests=200, duration=10, protocol="framed", pipeline=8)
+    result = run_load(cfg, ctx)
+    assert result.completed == 200
+    assert result.errors == 0
+    assert result.connections == 2
+
+
+def test_compressed_payload_file(temp_certs, tls_server, tmp_path):
+    """Test the load generator replaying JSON lines with compression offered"""
+    port, ctx = tls_server
+    lines = tmp_path / "messages.jsonl"
+    lines.write_text("".join(json.dumps({"algorithm": "RSA-2048", "data_lifetime_years": i}) + "\n" for i in range(5)))
+    cfg = LoadConfig(port=port, concurrency=2, requests=10, duration=10, protocol="framed",
+                     compression=True, payload_file=str(lines))
+    result = run_load(cfg, ctx)
+    assert result.completed == 10
+    assert result.errors == 0
+
+
+def test_transport_settings_recorded_for_client_and_server(temp_certs):
+    """Test loadgen output carries both ends' transport tuning"""
+    from qasccs import metrics
+    from qasccs.secure_channel.tuning import TransportTuning
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ctx.load_cert_chain(str(temp_certs / "server.crt"), str(temp_certs / "server.key"))
+    client_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    client_ctx.load_verify_locations(cafile=str(temp_certs / "ca.crt"))
+    metrics.REGISTRY.reset()
+    metrics.enable()
+    httpd = metrics.serve_prometheus("127.0.0.1", 0)
+    try:
+        with BackgroundServer(ctx, tuning=TransportTuning(nodelay=False, rcvbuf=1 << 17)) as srv:
+            cfg = LoadConfig(port=srv.port, concurrency=2, requests=10, duration=10,
+                             transport=TransportTuning(write_buffer=1 << 16),
+                             server_metrics=f"http://127.0.0.1:{httpd.server_port}/metrics")
+            result = run_load(cfg, client_ctx)
+    finally:
+        httpd.shutdown()
+        metrics.enable(False)
+        metrics.REGISTRY.reset()
+    assert result.completed == 10
+    transport = result.to_dict()["transport"]
+    assert transport["client"]["write_buffer"] == 1 << 16
+    assert transport["server"]["nodelay"] == "False"
+    assert int(transport["server"]["effective_rcvbuf"]) >= 1 << 17
+    assert transport["server"]["loop"] == "asyncio"
@@ -0,0 +1,91 @@
+import pytest
+import json
+import logging
+import logging.handlers
+import urllib.request
+
+from qasccs import metrics
+from qasccs.quantum_risk_engine.models import RiskRequest
+from qasccs.quantum_risk_engine.policy import evaluate_risk
+
+
+def test_disabled_metrics_record_nothing():
+    """Test instruments are no-ops while collection is disabled"""
+    c = metrics.counter("test_disabled_total")
+    h = metrics.histogram("test_disabled_seconds")
+    c.inc()
+    h.observe(0.1)
+    assert c.value() == 0
+    assert h.count() == 0
+
+
+def test_counter_gauge_histogram(enabled_metrics):
+    """Test basic instrument semantics with labels"""
+    c = metrics.counter("test_requests_total", "Requests")
+    g = metrics.gauge("test_in_flight")
+    h = metrics.histogram("test_latency_seconds", buckets=(0.1, 1.0))
+    c.inc(role="a")
+    c.inc(2, role="a")
+    g.inc()
+    g.inc()
+    g.dec()
+    h.observe(0.05)
+    h.observe(0.5)
+    h.observe(5.0)
+    assert c.value(role="a") == 3
+    assert g.value() == 1
+    assert h.count() == 3
+
+
+def test_registry_rejects_kind_conflict():
+    """Test a name can only be registered as one metric kind"""
+    metrics.counter("test_conflict")
+    with pytest.raises(ValueError):
+        metrics.gauge("test_conflict")
+
+
+def test_prometheus_text_rendering(enabled_metrics):
+    """Test Prometheus exposition format"""
+    metrics.counter("test_render_total", "Rendered").inc(risk="HIGH")
+    metrics.histogram("test_render_seconds", buckets=(1.0,)).observe(0.5)
+    text = enabled_metrics.render_prometheus()
+    assert "# TYPE test_render_total counter" in text
+    assert 'test_render_total{risk="HIGH"} 1' in text
+    assert 'test_render_seconds_bucket{le="1.0"} 1' in text
+    assert 'test_render_seconds_bucket{le="+Inf"} 1' in text
+    assert "test_render_seconds_count 1" in text
+
+
+def test_prometheus_endpoint(enabled_metrics):
+    """Test the HTTP endpoint serves the registry"""
+    metrics.counter("test_http_total").inc()
+    httpd = metrics.serve_prometheus("127.0.0.1", 0)
+    try:
+        port = httpd.server_address[1]
+        body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5).read().decode()
+        assert "test_http_total 1" in body
+    finally:
+        httpd.shutdown()
+
+
+def test_json_dumper(enabled_metrics, tmp_path):
+    """Test periodic JSON dump writes a snapshot"""
+    metrics.counter("test_json_total").inc(5)
+    out = tmp_path / "metrics.json"
+    metrics.JsonDumper(str(out), interval=60).start().stop()
+    data = json.loads(out.read_text())
+    assert data["metrics"]["test_json_total"][0]["value"] == 5
+
+
+def test_risk_evaluations_counted(enabled_metrics):
+    """Test evaluate_risk is instrumented"""
+    evaluate_risk(RiskRequest(algorithm="AES-256", data_lifetime_years=5))
+    assert metrics.counter("qasccs_risk_evaluations_total").value(risk="LOW") == 1
+
+
+def test_queue_logging_is_non_blocking():
+    """Test qasccs loggers go through a QueueHandler"""
+    listener = metrics.setup_logging()
+    assert listener is metrics.setup_logging()
+    handlers = logging.getLogger("qasccs").handlers
+    assert any(isinstance(h, logging.handlers.QueueHandler) for h in handlers)
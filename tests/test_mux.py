@@ -0,0 +1,155 @@
+import pytest
+import asyncio
+
+from qasccs.secure_channel import mux, protocol
+from qasccs.secure_channel.archive import ArchiveWriter, replay
+from qasccs.secure_channel.server import BackgroundServer
+
+
+class _FakeChannel:
+    """Records sent frames; never receives anything"""
+
+    def __init__(self, window=1 << 20):
+        self.mux = {"window": window, "max_streams": 16}
+        self.sent = []
+
+    def send(self, ftype, payload=b"", flags=0, stream=0):
+        self.sent.append((ftype, stream, len(payload)))
+
+    async def drain(self):
+        await asyncio.sleep(0)
+
+    async def recv(self):
+        await asyncio.Event().wait()
+
+    def close(self):
+        pass
+
+
+def test_many_streams_share_one_sealed_connection(contexts, tmp_path):
+    """Test per-stream ordering and ACK counts over one hybrid-sealed connection"""
+    server_ctx, client_ctx = contexts
+    archive = ArchiveWriter(tmp_path / "archive", bytes(32))
+
+    async def run(port):
+        conn = await mux.open_mux("127.0.0.1", port, client_ctx, "localhost", kem="stub")
+        streams = [conn.open_stream() for _ in range(50)]
+
+        async def session(s):
+            return [await s.request(b"%d:%d" % (s.id, i)) for i in range(3)]
+
+        acks = await asyncio.gather(*(session(s) for s in streams))
+        sealed = conn.ch.sealed
+        await conn.close()
+        return sealed, acks
+
+    with BackgroundServer(server_ctx, archive=archive, kems=["stub"], durable_ack=False) as srv:
+        sealed, acks = asyncio.run(run(srv.port))
+    archive.close()
+    assert sealed
+    assert all([n for n, _ in a] == [1, 2, 3] for a in acks)
+    frames = [f.data for f in replay(tmp_path / "archive", bytes(32))]
+    assert len(frames) == 150
+    for sid in (1, 25, 50):
+        assert [f for f in frames if f.startswith(b"%d:" % sid)] == [b"%d:%d" % (sid, i) for i in range(3)]
+
+
+def test_stalled_stream_does_not_block_others(contexts):
+    """Test per-stream windows: a stream whose frames are not processed runs out of credit alone"""
+    server_ctx, client_ctx = contexts
+    release = None
+
+    async def run(port):
+        nonlocal release
+        conn = await mux.open_mux("127.0.0.1", port, client_ctx, "localhost")
+        slow, fast = conn.open_stream(), conn.open_stream()
+        stuck = [await slow.send(b"slow" + bytes(60)), await slow.send(b"slow" + bytes(60))]
+        assert slow.credit == 0
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(slow.send(b"slow" + bytes(60)), 0.2)
+        acks = [await asyncio.wait_for(fast.request(b"fast"), 2) for _ in range(20)]
+        srv.loop.call_soon_threadsafe(release.set)
+        await asyncio.gather(*stuck)
+        assert (await slow.request(b"slow again"))[0] == 3
+        await conn.close()
+        return acks
+
+    with BackgroundServer(server_ctx, stream_window=128) as srv:
+        persist = srv.server._persist
+        release = asyncio.run_coroutine_threadsafe(_make_event(), srv.loop).result()
+
+        async def gated(batch, conn):
+            if any(data.startswith(b"slow") and data != b"slow again" for data in batch):
+                await release.wait()
+            await persist(batch, conn)
+
+        srv.server._persist = gated
+        acks = asyncio.run(run(srv.port))
+    assert [n for n, _ in acks] == list(range(1, 21))
+
+
+async def _make_event():
+    return asyncio.Event()
+
+
+def test_stream_closed_without_data(contexts):
+    """Test opening and closing a stream that never sent anything completes"""
+    server_ctx, client_ctx = contexts
+
+    async def run(port):
+        conn = await mux.open_mux("127.0.0.1", port, client_ctx, "localhost")
+        idle, busy = conn.open_stream(), conn.open_stream()
+        await asyncio.wait_for(idle.close(), 2)
+        assert (await busy.request(b"x"))[0] == 1
+        conn.open_stream()                                  # left idle; closed with the connection
+        await asyncio.wait_for(conn.close(), 2)
+
+    with BackgroundServer(server_ctx) as srv:
+        asyncio.run(run(srv.port))
+
+
+def test_window_violation_closes_connection(contexts):
+    """Test the server enforces the advertised per-stream window"""
+    server_ctx, client_ctx = contexts
+
+    async def run(port):
+        ch = await protocol.open_channel("127.0.0.1", port, client_ctx, "localhost", mux=True)
+        assert ch.mux == {"window": 64, "max_streams": 4}
+        ch.send(protocol.DATA, bytes(65), stream=1)
+        await ch.drain()
+        try:
+            return await ch.recv()
+        finally:
+            ch.close()
+
+    with BackgroundServer(server_ctx, stream_window=64, max_streams=4) as srv:
+        assert asyncio.run(run(srv.port)) is None
+
+
+def test_server_without_multiplexing_refuses(contexts):
+    """Test a client asking for streams fails cleanly when multiplexing is off"""
+    server_ctx, client_ctx = contexts
+    with BackgroundServer(server_ctx, max_streams=0) as srv:
+        with pytest.raises(protocol.ProtocolError, match="multiplexing"):
+            asyncio.run(mux.open_mux("127.0.0.1", srv.port, client_ctx, "localhost"))
+
+
+def test_deficit_round_robin_interleaves_streams():
+    """Test a stream of large frames cannot starve a stream of small frames"""
+    async def run():
+        ch = _FakeChannel()
+        conn = mux.MuxConnection(ch, quantum=1000)
+        big, small = conn.open_stream(), conn.open_stream()
+        for _ in range(4):
+            await big.send(bytes(1000))
+        for _ in range(8):
+            await small.send(bytes(250))
+        while conn._active:
+            await asyncio.sleep(0)
+        for t in conn._tasks:
+            t.cancel()
+        return ch.sent
+
+    sent = asyncio.run(run())
+    order = [sid for _, sid, _ in sent]
+    assert order == [1, 2, 2, 2, 2, 1, 2, 2, 2, 2, 1, 1]
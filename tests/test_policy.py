@@ -1,3 +1,5 @@
+import pytest
+from pydantic import ValidationError
 from qasccs.quantum_risk_engine.models import RiskRequest
 from qasccs.quantum_risk_engine.policy import evaluate_risk
 
@@ -16,3 +18,15 @@ def test_pqc_mode():
     req = RiskRequest(algorithm="KYBER-768", data_lifetime_years=10, data_classification="critical", scenario="moderate")
     resp = evaluate_risk(req)
     assert resp.recommended_mode in ("pqc", "hybrid")
+
+def test_identical_decisions_share_one_response():
+    req = RiskRequest(algorithm="RSA-2048", data_lifetime_years=30, data_classification="high", scenario="aggressive")
+    a = evaluate_risk(req)
+    b = evaluate_risk(RiskRequest(algorithm="ECC-P384", data_lifetime_years=25, data_classification="high", scenario="aggressive"))
+    assert a is evaluate_risk(req)
+    assert a is b
+
+def test_responses_are_immutable():
+    resp = evaluate_risk(RiskRequest(algorithm="AES-256", data_lifetime_years=5))
+    with pytest.raises(ValidationError):
+        resp.risk = "HIGH"
@@ -1,7 +1,7 @@
 import pytest
 from datetime import datetime, UTC
 from qasccs.quantum_risk_engine.models import RiskRequest
-from qasccs.quantum_risk_engine.policy import evaluate_risk, SCENARIO_SHOR_YEAR
+from qasccs.quantum_risk_engine.policy import EvaluationContext, evaluate_risk, SCENARIO_SHOR_YEAR
 
 
 def test_rsa_2048_conservative_short_lifetime():
@@ -287,3 +287,27 @@ def test_response_includes_notes():
     resp = evaluate_risk(req)
     assert resp.notes is not None
     assert "tunable" in resp.notes.lower()
+
+
+def test_evaluation_context_as_of_year():
+    """Test evaluating as of a historic year is reproducible"""
+    req = RiskRequest(algorithm="RSA-2048", data_lifetime_years=5, scenario="moderate")
+    ctx = EvaluationContext.create(reference_year=2030)
+    resp = evaluate_risk(req, ctx)
+    assert resp.risk == "LOW"
+    assert resp.quantum_safe_until_year == 2035
+    assert evaluate_risk(req, EvaluationContext.create(reference_year=2034)).risk == "HIGH"
+
+
+def test_evaluation_context_clock_and_tables():
+    """Test the clock is read once and custom scenario tables are honoured"""
+    calls = []
+    ctx = EvaluationContext.create(clock=lambda: calls.append(1) or 2026,
+                                   scenario_shor_year={"conservative": 2045, "moderate": 2030, "aggressive": 2028})
+    req = RiskRequest(algorithm="ECC-P256", data_lifetime_years=10)
+    for _ in range(3):
+        resp = evaluate_risk(req, ctx)
+    assert len(calls) == 1
+    assert resp.quantum_safe_until_year == 2029
+    assert ctx == EvaluationContext.create(reference_year=2026, scenario_shor_year=dict(ctx.scenario_shor_year))
+    assert hash(ctx) == hash(EvaluationContext.create(reference_year=2026, scenario_shor_year=dict(ctx.scenario_shor_year)))
@@ -0,0 +1,83 @@
+import pytest
+import shutil
+import ssl
+
+from qasccs.tools.pqc_tls import Endpoint, EndpointPool, classical_stand_in
+
+pytestmark = pytest.mark.skipif(shutil.which("openssl") is None, reason="openssl binary not available")
+
+
+def _client_ctx(cert_dir):
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    ctx.load_verify_locations(cafile=str(cert_dir / "ca.crt"))
+    return ctx
+
+
+def test_classical_stand_in_mapping():
+    """Test hybrid groups map to their classical component"""
+    assert classical_stand_in("x25519_kyber768") == "X25519"
+    assert classical_stand_in("p256_kyber768") == "P-256"
+    assert classical_stand_in("p384_kyber768") == "P-384"
+    assert classical_stand_in("kyber768") == "X25519"
+
+
+def test_pool_reuses_prewarmed_endpoints(temp_certs):
+    """Test endpoints are started once and handed out round-robin"""
+    with EndpointPool(["x25519_kyber768"], per_group=2, cert=temp_certs / "server.crt",
+                      key=temp_certs / "server.key", use_oqs=False) as pool:
+        a = pool.acquire("x25519_kyber768")
+        b = pool.acquire("x25519_kyber768")
+        c = pool.acquire("x25519_kyber768")
+        assert a is not b
+        assert a is c
+        assert a.served_group == "X25519"
+
+
+def test_pool_measures_handshakes_per_group(temp_certs):
+    """Test handshake timings are recorded per group"""
+    with EndpointPool(["x25519_kyber768", "p256_kyber768"], cert=temp_certs / "server.crt",
+                      key=temp_certs / "server.key", use_oqs=False) as pool:
+        ctx = _client_ctx(temp_certs)
+        for g in pool.groups:
+            pool.measure(g, 3, ctx=ctx)
+        report = pool.report()
+        assert report["oqsprovider"] is False
+        for g in pool.groups:
+            assert report["groups"][g]["count"] == 3
+            assert report["groups"][g]["failures"] == 0
+
+
+def test_pool_restarts_dead_endpoint(temp_certs):
+    """Test health check replaces an endpoint whose process died"""
+    with EndpointPool(["x25519_kyber768"], cert=temp_certs / "server.crt",
+                      key=temp_certs / "server.key", use_oqs=False) as pool:
+        ep = pool.acquire("x25519_kyber768")
+        ep.proc.kill()
+        ep.proc.wait()
+        pool.health_check()
+        fresh = pool.acquire("x25519_kyber768")
+        assert fresh is not ep
+        assert fresh.restarts == 1
+        assert fresh.healthy()
+        pool.connect("x25519_kyber768", ctx=_client_ctx(temp_certs)).close()
+
+
+def test_failed_start_stops_endpoints_already_running(temp_certs, monkeypatch):
+    """Test a pool whose second endpoint fails to start leaves no s_server behind"""
+    started, real_start = [], Endpoint.start
+
+    def start(ep, *args, **kwargs):
+        if started:
+            raise RuntimeError("second endpoint failed")
+        real_start(ep, *args, **kwargs)
+        started.append(ep)
+
+    monkeypatch.setattr(Endpoint, "start", start)
+    pool = EndpointPool(["x25519_kyber768"], per_group=2, cert=temp_certs / "server.crt",
+                        key=temp_certs / "server.key", use_oqs=False)
+    with pytest.raises(RuntimeError, match="second endpoint"):
+        with pool:
+            pass
+    [ep] = started
+    assert ep.proc.poll() is not None
+    assert not pool.endpoints
@@ -0,0 +1,117 @@
+import pytest
+import json
+import pstats
+import sys
+import tracemalloc
+from unittest.mock import patch
+
+from qasccs.profiling import Profiler
+from qasccs.quantum_risk_engine.cli import main as risk_main
+
+
+def _work():
+    return sum(i * i for i in range(2000))
+
+
+def test_cpu_profile_whole_run(tmp_path):
+    """Test continuous CPU profiling writes pstats and a text report"""
+    out = tmp_path / "cpu.prof"
+    with Profiler("cpu", str(out)):
+        _work()
+    stats = pstats.Stats(str(out))
+    assert any(fn[2] == "_work" for fn in stats.stats)
+    assert "_work" in (tmp_path / "cpu.prof.txt").read_text()
+
+
+def test_cpu_profile_samples_every_nth(tmp_path):
+    """Test sampling only profiles every Nth block"""
+    p = Profiler("cpu", str(tmp_path / "cpu.prof"), every=3).start()
+    for _ in range(7):
+        with p.sample():
+            _work()
+    p.stop()
+    assert p.samples == 2
+
+
+def test_alloc_profile_reports_top_sites(tmp_path):
+    """Test allocation profiling reports retained allocation sites"""
+    out = tmp_path / "alloc.txt"
+    keep = []
+    with Profiler("alloc", str(out)):
+        keep.append([bytearray(1024) for _ in range(200)])
+    text = out.read_text()
+    assert text.startswith("Top 25 allocation sites")
+    assert "test_profiling.py" in text
+
+
+def test_alloc_profile_sampled(tmp_path):
+    """Test sampled allocation profiling accumulates across samples"""
+    p = Profiler("alloc", str(tmp_path / "alloc.txt"), every=2).start()
+    keep = []
+    for _ in range(4):
+        with p.sample():
+            keep.append(bytearray(4096))
+    p.stop()
+    assert p.samples == 2
+    assert "test_profiling.py" in (tmp_path / "alloc.txt").read_text()
+
+
+@pytest.mark.parametrize("mode", ["cpu", "alloc"])
+def test_overlapping_samples(tmp_path, mode):
+    """Test a sampled block finishing first does not stop profiling under an overlapping one"""
+    out = tmp_path / f"{mode}.out"
+    prof = Profiler(mode, out=str(out), every=2).start()
+    blocks = [prof.sample() for _ in range(4)]          # calls 2 and 4 are sampled
+    for b in blocks:
+        b.__enter__()
+    keep = [bytearray(4096) for _ in range(64)]
+    for b in blocks:                                    # 2 exits while 4 is still running
+        b.__exit__(None, None, None)
+    prof.stop()
+    assert prof.samples == 2
+    assert not tracemalloc.is_tracing()
+    assert (tmp_path / f"{mode}.out").exists()
+    del keep
+
+
+def test_profiler_rejects_unknown_mode():
+    """Test invalid profile mode"""
+    with pytest.raises(ValueError):
+        Profiler("wall")
+
+
+def test_risk_cli_profile_flag(tmp_path, capsys):
+    """Test --profile cpu on the risk CLI"""
+    out = tmp_path / "risk.prof"
+    test_args = ["prog", "--algorithm", "RSA-2048", "--data-lifetime-years", "10",
+                 "--profile", "cpu", "--profile-out", str(out)]
+    with patch.object(sys, 'argv', test_args):
+        risk_main()
+    assert json.loads(capsys.readouterr().out)["risk"]
+    assert out.exists()
+
+
+def test_risk_cli_sampled_profile_without_samples(tmp_path, capsys):
+    """Test --profile-every above the number of records writes a 'no samples' report"""
+    out = tmp_path / "risk.prof"
+    test_args = ["prog", "--algorithm", "AES-256", "--data-lifetime-years", "5",
+                 "--profile", "cpu", "--profile-every", "2", "--profile-out", str(out)]
+    with patch.object(sys, 'argv', test_args):
+        risk_main()
+    assert json.loads(capsys.readouterr().out)["risk"]
+    assert not out.exists()
+    assert "No samples taken" in (tmp_path / "risk.prof.txt").read_text()
+
+
+def test_dump_during_sample_keeps_profiling(tmp_path):
+    """Test a signal-time dump inside a sampled block does not switch the profiler off"""
+    out = tmp_path / "cpu.prof"
+    prof = Profiler("cpu", out=str(out), every=2).start()
+    with prof.sample():
+        pass
+    with prof.sample():
+        prof.dump()
+        _work()
+    prof.stop()
+    stats = pstats.Stats(str(out))
+    assert any(name == "_work" for _, _, name in stats.stats)
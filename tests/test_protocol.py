@@ -0,0 +1,131 @@
+import pytest
+import asyncio
+import socket
+
+from qasccs.secure_channel import protocol
+from qasccs.secure_channel.archive import ArchiveWriter, replay
+from qasccs.secure_channel.server import BackgroundServer
+
+
+async def _session(port, ctx, payloads, kem=None):
+    ch = await protocol.open_channel("127.0.0.1", port, ctx, "localhost", kem=kem)
+    try:
+        return ch.sealed, [await protocol.request(ch, p) for p in payloads]
+    finally:
+        ch.close()
+
+
+def test_frame_reader_cuts_frames_from_one_buffer():
+    """Test several frames delivered in one read are parsed without extra I/O"""
+    async def run():
+        reader = asyncio.StreamReader()
+        data = b"".join(protocol.encode_frame(protocol.DATA, b"m%d" % i, stream=i) for i in range(3))
+        reader.feed_data(data[:5])
+        reader.feed_data(data[5:])
+        reader.feed_eof()
+        fr = protocol.FrameReader(reader)
+        first = await fr.read_frame()
+        assert fr.has_frame()
+        rest = [await fr.read_frame(), await fr.read_frame(), await fr.read_frame()]
+        return first, rest
+    first, rest = asyncio.run(run())
+    assert (first.payload, first.stream) == (b"m0", 0)
+    assert [f.payload for f in rest[:2]] == [b"m1", b"m2"]
+    assert rest[2] is None
+
+
+def test_magic_prefix_detection():
+    """Test negotiation sniffing for full and partial magic"""
+    assert protocol.is_magic_prefix(protocol.MAGIC + b"rest")
+    assert protocol.is_magic_prefix(protocol.MAGIC[:3])
+    assert not protocol.is_magic_prefix(b"hello")
+
+
+def test_framed_and_legacy_clients_share_a_server(contexts):
+    """Test framed sessions get ACK frames while raw clients keep the legacy reply"""
+    server_ctx, client_ctx = contexts
+    with BackgroundServer(server_ctx) as srv:
+        sealed, acks = asyncio.run(_session(srv.port, client_ctx, [b"a", b"bb", b"ccc"]))
+        assert not sealed
+        assert acks == [(1, 1), (2, 2), (3, 3)]
+        with socket.create_connection(("127.0.0.1", srv.port)) as raw:
+            with client_ctx.wrap_socket(raw, server_hostname="localhost") as tls:
+                tls.sendall(b"legacy")
+                assert tls.recv(4096) == b"ACK (secure): 6 bytes"
+
+
+@pytest.mark.parametrize("kem", ["stub", "x448-standin"])
+def test_hybrid_session_seals_frames(contexts, tmp_path, kem):
+    """Test the application-layer hybrid exchange and sealed payload delivery"""
+    server_ctx, client_ctx = contexts
+    archive = ArchiveWriter(tmp_path / "archive", bytes(32))
+    with BackgroundServer(server_ctx, archive=archive, kems=["stub", "x448-standin"]) as srv:
+        sealed, acks = asyncio.run(_session(srv.port, client_ctx, [b"secret one", b"secret two"], kem))
+    archive.close()
+    assert sealed
+    assert acks == [(1, 10), (2, 10)]
+    assert [f.data for f in replay(tmp_path / "archive", bytes(32))] == [b"secret one", b"secret two"]
+
+
+def test_server_rejects_unaccepted_kem_and_enforces_hybrid(contexts):
+    """Test KEM allow-list and --require-hybrid"""
+    server_ctx, client_ctx = contexts
+    with BackgroundServer(server_ctx, kems=["x448-standin"], require_hybrid=True) as srv:
+        with pytest.raises(protocol.ProtocolError, match="not accepted"):
+            asyncio.run(_session(srv.port, client_ctx, [b"x"], kem="stub"))
+        with pytest.raises(protocol.ProtocolError, match="requires"):
+            asyncio.run(_session(srv.port, client_ctx, [b"x"]))
+        sealed, _ = asyncio.run(_session(srv.port, client_ctx, [b"x"], kem="x448-standin"))
+        assert sealed
+
+
+def test_pipelined_frames_get_cumulative_batched_acks(contexts, tmp_path):
+    """Test pipelined DATA frames are persisted in order and acknowledged in batches"""
+    server_ctx, client_ctx = contexts
+    archive = ArchiveWriter(tmp_path / "archive", bytes(32))
+    payloads = [b"msg-%04d" % i for i in range(500)]
+
+    async def run(port):
+        ch = await protocol.open_channel("127.0.0.1", port, client_ctx, "localhost", kem="stub")
+        pipe = protocol.Pipeline(ch, max_in_flight=200)
+        acks = [await pipe.send(p) for p in payloads]
+        await pipe.wait()
+        results = [a.result() for a in acks]
+        await pipe.close()
+        return results
+
+    with BackgroundServer(server_ctx, archive=archive, kems=["stub"]) as srv:
+        results = asyncio.run(run(srv.port))
+    archive.close()
+    covered = sorted({n for n, _ in results})
+    assert covered[-1] == 500
+    assert len(covered) < 500                                # several frames per ACK
+    assert all(n >= i + 1 for i, (n, _) in enumerate(results))
+    assert sum(nbytes for _, nbytes in set(results)) == sum(map(len, payloads))
+    assert [f.data for f in replay(tmp_path / "archive", bytes(32))] == payloads
+
+
+def test_channel_coalesces_frames_sent_in_one_turn():
+    """Test frames queued in the same loop turn reach the transport in one write"""
+    class Writer:
+        def __init__(self):
+            self.writes = []
+
+        def write(self, data):
+            self.writes.append(data)
+
+        async def drain(self):
+            pass
+
+    async def run():
+        w = Writer()
+        ch = protocol.Channel(protocol.FrameReader(asyncio.StreamReader()), w)
+        for i in range(10):
+            ch.send(protocol.DATA, b"x%d" % i)
+        assert w.writes == []
+        await asyncio.sleep(0)
+        return w.writes
+
+    writes = asyncio.run(run())
+    assert len(writes) == 1
+    assert writes[0] == b"".join(protocol.encode_frame(protocol.DATA, b"x%d" % i) for i in range(10))
@@ -0,0 +1,154 @@
+import pytest
+import json
+
+from qasccs.quantum_risk_engine.models import RiskRequest, RiskResponse
+from qasccs.quantum_risk_engine.policy import evaluate_risk
+from qasccs.quantum_risk_engine.resultfile import (
+    ResultReader, ResultWriter, write_results, json_to_bin, bin_to_json,
+)
+
+
+def _responses():
+    out = []
+    for alg in ("RSA-2048", "ECC-P256", "AES-128", "AES-256", "KYBER-768", "HYBRID-ECDHE+KYBER"):
+        for years in (1, 10, 30):
+            for cls in ("low", "critical"):
+                out.append(evaluate_risk(RiskRequest(algorithm=alg, data_lifetime_years=years,
+                                                     data_classification=cls, scenario="aggressive")))
+    return out
+
+
+def test_roundtrip_preserves_responses(tmp_path):
+    """Test write then read yields identical responses"""
+    resps = _responses()
+    path = str(tmp_path / "r.qrsk")
+    assert write_results(path, resps) == len(resps)
+    with ResultReader(path) as r:
+        assert len(r) == len(resps)
+        assert list(r) == resps
+
+
+def test_rationale_strings_are_interned(tmp_path):
+    """Test repeated strings are stored once and rows stay compact"""
+    resps = _responses() * 100
+    path = tmp_path / "r.qrsk"
+    write_results(str(path), resps)
+    json_size = sum(len(json.dumps(r.model_dump())) for r in resps)
+    assert path.stat().st_size * 5 < json_size
+    with ResultReader(str(path)) as r:
+        assert len(r.strings) < 20
+
+
+def test_filter_without_materializing(tmp_path):
+    """Test column filters match a naive scan"""
+    resps = _responses()
+    path = str(tmp_path / "r.qrsk")
+    write_results(path, resps)
+    with ResultReader(path) as r:
+        high = list(r.filter(risk="HIGH"))
+        assert high == [i for i, x in enumerate(resps) if x.risk == "HIGH"]
+        both = list(r.filter(risk="MEDIUM", mode="hybrid", year_before=2040))
+        assert both == [i for i, x in enumerate(resps)
+                        if x.risk == "MEDIUM" and x.recommended_mode == "hybrid" and x.quantum_safe_until_year < 2040]
+        assert r.count(mode="classical") == sum(1 for x in resps if x.recommended_mode == "classical")
+        assert r.count(year_from=2040) == sum(1 for x in resps if x.quantum_safe_until_year >= 2040)
+
+
+def test_json_conversion_roundtrip(tmp_path):
+    """Test JSON array -> qrsk -> JSON lines"""
+    resps = _responses()
+    src = tmp_path / "in.json"
+    src.write_text(json.dumps([r.model_dump() for r in resps], indent=2))
+    assert json_to_bin(str(src), str(tmp_path / "r.qrsk")) == len(resps)
+    bin_to_json(str(tmp_path / "r.qrsk"), str(tmp_path / "out.jsonl"))
+    rows = [json.loads(l) for l in (tmp_path / "out.jsonl").read_text().splitlines()]
+    assert [RiskResponse(**row) for row in rows] == resps
+
+
+def test_scanner_rows_keep_asset_ids(tmp_path):
+    """Test scanner JSON lines convert with asset ids and skip unassessed rows"""
+    resp = _responses()[0].model_dump()
+    lines = [{"path": "/a.crt", "assessment": resp}, {"path": "/b.key", "assessment": None},
+             {"path": "/c.crt", "assessment": resp}]
+    src = tmp_path / "scan.jsonl"
+    src.write_text("\n".join(json.dumps(l) for l in lines))
+    assert json_to_bin(str(src), str(tmp_path / "r.qrsk")) == 2
+    with ResultReader(str(tmp_path / "r.qrsk")) as r:
+        assert [r.asset_id(i) for i in range(len(r))] == ["/a.crt", "/c.crt"]
+
+
+def test_missing_asset_ids_are_backfilled(tmp_path):
+    """Test rows without an asset id next to rows with one read back as None"""
+    resp = _responses()[0]
+    with ResultWriter(str(tmp_path / "r.qrsk")) as w:
+        w.append(resp)
+        w.append(resp, asset="x")
+        w.append(resp)
+    with ResultReader(str(tmp_path / "r.qrsk")) as r:
+        assert [r.asset_id(i) for i in range(len(r))] == [None, "x", None]
+
+
+def test_asset_ids_survive_json_roundtrip(tmp_path):
+    """Test qrsk -> JSON -> qrsk keeps asset ids, also when bare and scanner rows are mixed"""
+    resps = _responses()
+    with ResultWriter(str(tmp_path / "a.qrsk")) as w:
+        for i, resp in enumerate(resps):
+            w.append(resp, asset=f"/srv/{i}.crt")
+    bin_to_json(str(tmp_path / "a.qrsk"), str(tmp_path / "a.jsonl"))
+    assert json_to_bin(str(tmp_path / "a.jsonl"), str(tmp_path / "b.qrsk")) == len(resps)
+    with ResultReader(str(tmp_path / "b.qrsk")) as r:
+        assert [r.asset_id(i) for i in range(len(r))] == [f"/srv/{i}.crt" for i in range(len(resps))]
+        assert [r[i] for i in range(len(r))] == resps
+
+    mixed = tmp_path / "mixed.jsonl"
+    mixed.write_text("\n".join(json.dumps(row) for row in [
+        resps[0].model_dump(), {"path": "/a.crt", "assessment": resps[1].model_dump()}]))
+    assert json_to_bin(str(mixed), str(tmp_path / "c.qrsk")) == 2
+    with ResultReader(str(tmp_path / "c.qrsk")) as r:
+        assert [r.asset_id(i) for i in range(len(r))] == [None, "/a.crt"]
+
+
+def test_rejects_foreign_file(tmp_path):
+    """Test reader validates the magic"""
+    bad = tmp_path / "bad.qrsk"
+    bad.write_bytes(b"\0" * 128)
+    with pytest.raises(ValueError):
+        ResultReader(str(bad))
+
+
+def test_prober_rows_expand_per_component(tmp_path):
+    """Test prober JSON lines convert one row per assessed component"""
+    resp = _responses()[0].model_dump()
+    row = {"target": "example.com:443", "assessment": {"certificate": resp, "cipher": resp}}
+    src = tmp_path / "probe.jsonl"
+    src.write_text(json.dumps(row) + "\n")
+    assert json_to_bin(str(src), str(tmp_path / "r.qrsk")) == 2
+    with ResultReader(str(tmp_path / "r.qrsk")) as r:
+        assert [r.asset_id(i) for i in range(len(r))] == ["example.com:443#certificate", "example.com:443#cipher"]
+
+
+def test_asset_ids_stay_out_of_the_string_table(tmp_path):
+    """Test per-row asset ids are stored as an indexed column and decoded on demand"""
+    resps = _responses()
+    path = str(tmp_path / "r.qrsk")
+    with ResultWriter(path) as w:
+        for i, resp in enumerate(resps):
+            w.append(resp, asset=None if i == 3 else f"/etc/ssl/host-{i}.crt")
+    with ResultReader(path) as r:
+        assert len(r.strings) < 20
+        assert r.asset_id(0) == "/etc/ssl/host-0.crt"
+        assert r.asset_id(3) is None
+        assert r.asset_id(len(r) - 1) == f"/etc/ssl/host-{len(resps) - 1}.crt"
+        with pytest.raises(IndexError):
+            r.asset_id(len(r))
+
+
+def test_json_input_is_streamed(tmp_path):
+    """Test arrays and JSON lines split across read chunks decode value by value"""
+    from qasccs.quantum_risk_engine.resultfile import _iter_json
+    rows = [{"path": f"/k{i}", "assessment": None} for i in range(50)]
+    arr, lines = tmp_path / "a.json", tmp_path / "l.jsonl"
+    arr.write_text(json.dumps(rows, indent=2))
+    lines.write_text("\n".join(json.dumps(r) for r in rows))
+    assert list(_iter_json(str(arr), chunk=16)) == rows
+    assert list(_iter_json(str(lines), chunk=16)) == rows
@@ -1,34 +1,12 @@
 import pytest
-import tempfile
-import shutil
 import socket
 import ssl
 import threading
 import time
-from pathlib import Path
-from unittest.mock import patch
-import sys
 
-from qasccs.tools.gen_certs import main as gen_certs_main
 from qasccs.secure_channel.common import make_server_context, make_client_context
 
 
-@pytest.fixture
-def temp_certs():
-    """Create temporary certificates for testing"""
-    temp_dir = tempfile.mkdtemp()
-    cert_dir = Path(temp_dir) / "certs"
-    cert_dir.mkdir()
-    
-    # Generate test certificates
-    test_args = ["prog", "--out", str(cert_dir)]
-    with patch.object(sys, 'argv', test_args):
-        gen_certs_main()
-    
-    yield cert_dir
-    shutil.rmtree(temp_dir)
-
-
 def test_make_server_context_with_certs(temp_certs):
     """Test creating server SSL context"""
     # Temporarily patch the CERT_DIR to use test certs
@@ -0,0 +1,208 @@
+import pytest
+import os
+import re
+import signal
+import socket
+import ssl
+import subprocess
+import sys
+import threading
+import time
+from unittest.mock import patch
+
+from qasccs.tools.gen_certs import main as gen_certs_main
+from qasccs.secure_channel.common import make_server_context
+from qasccs.secure_channel.server import (BackgroundServer, ServerLimits, TokenBucket, REJECTED, RELOADS, TIMEOUTS,
+                                          _handoff_argv)
+
+
+def _connect(port, client_ctx):
+    sock = socket.create_connection(("127.0.0.1", port), timeout=5)
+    return client_ctx.wrap_socket(sock, server_hostname="localhost")
+
+
+def _wait_for(cond, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        time.sleep(0.01)
+    return cond()
+
+
+def test_token_bucket_refills():
+    """Test token bucket burst and refill"""
+    b = TokenBucket(rate=10, burst=2, now=0.0)
+    assert b.take(0.0)
+    assert b.take(0.0)
+    assert not b.take(0.0)
+    assert b.take(0.1)
+
+
+def test_server_acks_payloads(contexts):
+    """Test the async server ACKs each payload on a kept-alive connection"""
+    server_ctx, client_ctx = contexts
+    with BackgroundServer(server_ctx) as srv:
+        with _connect(srv.port, client_ctx) as tls:
+            for msg in (b"one", b"three"):
+                tls.sendall(msg)
+                assert tls.recv(1024) == f"ACK (secure): {len(msg)} bytes".encode()
+
+
+def test_max_connections_sheds_excess(contexts, enabled_metrics):
+    """Test connections over the cap are rejected before the TLS handshake"""
+    server_ctx, client_ctx = contexts
+    with BackgroundServer(server_ctx, limits=ServerLimits(max_connections=1)) as srv:
+        with _connect(srv.port, client_ctx) as first:
+            first.sendall(b"hold")
+            first.recv(1024)
+            with pytest.raises((ssl.SSLError, OSError)):
+                _connect(srv.port, client_ctx).recv(1024)
+            assert REJECTED.value(limit="max_connections") == 1
+
+
+def test_max_handshakes_holds_for_a_queued_burst(contexts, enabled_metrics):
+    """Test a burst already in the backlog cannot exceed max_handshakes"""
+    server_ctx, _ = contexts
+    limits = ServerLimits(max_handshakes=2, handshake_timeout=2)
+    with BackgroundServer(server_ctx, limits=limits) as srv:
+        gate = threading.Event()
+        srv.loop.call_soon_threadsafe(gate.wait, 5)           # stall accepts while the burst queues
+        socks = [socket.create_connection(("127.0.0.1", srv.port), timeout=5) for _ in range(30)]
+        gate.set()
+        assert _wait_for(lambda: REJECTED.value(limit="max_handshakes") == 28)
+        assert srv.server.handshaking == 2
+        for s in socks:
+            s.close()
+        assert _wait_for(lambda: srv.server.handshaking == 0, timeout=5)
+
+
+def test_rate_limit_per_ip(contexts, enabled_metrics):
+    """Test per-IP token bucket rejects a burst"""
+    server_ctx, client_ctx = contexts
+    limits = ServerLimits(rate_per_ip=0.01, burst_per_ip=1)
+    with BackgroundServer(server_ctx, limits=limits) as srv:
+        _connect(srv.port, client_ctx).close()
+        with pytest.raises((ssl.SSLError, OSError)):
+            _connect(srv.port, client_ctx).recv(1024)
+        assert REJECTED.value(limit="rate_per_ip") == 1
+
+
+def test_read_timeout_closes_silent_client(contexts, enabled_metrics):
+    """Test a client that never sends is disconnected after read_timeout"""
+    server_ctx, client_ctx = contexts
+    with BackgroundServer(server_ctx, limits=ServerLimits(read_timeout=0.2)) as srv:
+        with _connect(srv.port, client_ctx) as tls:
+            assert tls.recv(1024) == b""
+        assert _wait_for(lambda: TIMEOUTS.value(kind="read") == 1)
+        assert _wait_for(lambda: srv.server.active == 0)
+
+
+def test_handshake_timeout(contexts, enabled_metrics):
+    """Test a client that never starts TLS is dropped after handshake_timeout"""
+    server_ctx, _ = contexts
+    with BackgroundServer(server_ctx, limits=ServerLimits(handshake_timeout=0.2)) as srv:
+        with socket.create_connection(("127.0.0.1", srv.port), timeout=5) as raw:
+            assert raw.recv(1024) == b""
+        assert _wait_for(lambda: TIMEOUTS.value(kind="handshake") == 1)
+
+
+def test_reload_rotates_certificate_without_dropping_connections(temp_certs, contexts, enabled_metrics):
+    """Test reload serves new certs to new handshakes while established connections continue"""
+    server_ctx, old_client = contexts
+    factory = lambda: make_server_context(temp_certs / "server.crt", temp_certs / "server.key")
+    with BackgroundServer(server_ctx, context_factory=factory) as srv:
+        with _connect(srv.port, old_client) as tls:
+            tls.sendall(b"before")
+            tls.recv(1024)
+            with patch.object(sys, 'argv', ["prog", "--out", str(temp_certs)]):
+                gen_certs_main()                                    # new CA and server cert
+            assert srv.server.reload()
+            tls.sendall(b"after")
+            assert tls.recv(1024) == b"ACK (secure): 5 bytes"
+        new_client = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        new_client.load_verify_locations(cafile=str(temp_certs / "ca.crt"))
+        with pytest.raises(ssl.SSLCertVerificationError):
+            _connect(srv.port, old_client)
+        with _connect(srv.port, new_client) as tls:
+            tls.sendall(b"new")
+            assert tls.recv(1024) == b"ACK (secure): 3 bytes"
+
+        (temp_certs / "server.key").write_text("not a key")
+        assert not srv.server.reload()
+        with _connect(srv.port, new_client) as tls:
+            tls.sendall(b"still")
+            assert tls.recv(1024) == b"ACK (secure): 5 bytes"
+    assert RELOADS.value(outcome="ok") == 1
+    assert RELOADS.value(outcome="error") == 1
+
+
+def test_handoff_keeps_in_flight_and_new_connections(contexts):
+    """Test a server inheriting the listening socket takes over while the old one drains"""
+    server_ctx, client_ctx = contexts
+    with BackgroundServer(server_ctx) as old:
+        held = _connect(old.port, client_ctx)
+        held.sendall(b"old")
+        held.recv(1024)
+        with BackgroundServer(server_ctx, sock=old.server._sock.dup()) as new:
+            drained = []
+            t = threading.Thread(target=lambda: drained.append(old.drain(timeout=5)))
+            t.start()
+            assert _wait_for(lambda: old.server._sock is None)
+            for _ in range(10):
+                with _connect(new.port, client_ctx) as tls:
+                    tls.sendall(b"new")
+                    assert tls.recv(1024) == b"ACK (secure): 3 bytes"
+            held.sendall(b"still old")
+            assert held.recv(1024) == b"ACK (secure): 9 bytes"
+            assert t.is_alive()
+            held.close()
+            t.join(5)
+            assert drained == [0]
+
+
+def test_handoff_argv_replaces_inherited_fds():
+    """Test the replacement command line carries the new fds only"""
+    argv = _handoff_argv(["--port", "9000", "--listen-fd", "3", "--ready-fd=4", "--kem", "stub"], 5, 6)
+    assert argv[1:3] == ["-m", "qasccs.secure_channel.server"]
+    assert argv[3:] == ["--port", "9000", "--kem", "stub", "--listen-fd", "5", "--ready-fd", "6"]
+
+
+def _read_until(stream, pattern, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        line = stream.readline()
+        if not line:
+            break
+        m = re.search(pattern, line)
+        if m:
+            return m
+    raise AssertionError(f"server never logged {pattern!r}")
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGUSR2"), reason="POSIX signals")
+def test_sigusr2_hands_off_to_a_new_process(temp_certs, contexts):
+    """Test the CLI re-execs itself on SIGUSR2 and the old process exits after draining"""
+    _, client_ctx = contexts
+    cmd = [sys.executable, "-m", "qasccs.secure_channel.server", "--port", "0", "--cert", str(temp_certs / "server.crt"),
+           "--key", str(temp_certs / "server.key"), "--max-streams", "0", "--drain-timeout", "5"]
+    old = subprocess.Popen(cmd, stderr=subprocess.PIPE, text=True, env={**os.environ, "PYTHONUNBUFFERED": "1"})
+    new_pid = None
+    try:
+        port = int(_read_until(old.stderr, r"Listening on 127.0.0.1:(\d+)").group(1))
+        with _connect(port, client_ctx) as held:
+            held.sendall(b"x")
+            held.recv(1024)
+            old.send_signal(signal.SIGUSR2)
+            new_pid = int(_read_until(old.stderr, r"to pid (\d+)").group(1))
+            held.sendall(b"yy")
+            assert held.recv(1024) == b"ACK (secure): 2 bytes"
+        assert old.wait(10) == 0
+        with _connect(port, client_ctx) as tls:
+            tls.sendall(b"zzz")
+            assert tls.recv(1024) == b"ACK (secure): 3 bytes"
+    finally:
+        old.kill()
+        if new_pid is not None:
+            os.kill(new_pid, signal.SIGTERM)
+        old.wait()
@@ -0,0 +1,72 @@
+import pytest
+import sys
+
+from qasccs.profiling import Profiler
+from qasccs.tools.soak import Sample, SoakConfig, evaluate, parse_alloc_report, run_soak
+
+
+def _samples(rss_kb, p99_ms, fds=None, errors=None, top=None):
+    n = len(rss_kb)
+    fds = fds or [20] * n
+    errors = errors or [0] * n
+    return [Sample(float(i), rss_kb[i], fds[i], 100 * (i + 1), errors[i], {"p99_us": int(p99_ms[i] * 1000)},
+                   {}, top or []) for i in range(n)]
+
+
+def test_flat_run_passes():
+    """Test stable memory, fds and latency produce no failures"""
+    cfg = SoakConfig(warmup=0)
+    assert evaluate(_samples([50000, 51000, 50500, 50800], [10, 12, 11, 10]), cfg) == []
+
+
+def test_memory_growth_fails_and_names_the_site():
+    """Test RSS growth past the limit fails with the top allocation site"""
+    cfg = SoakConfig(warmup=0, max_rss_growth_mb=16)
+    samples = _samples([50000, 60000, 70000, 90000], [10] * 4, top=[["server.py:42", 30000.0]])
+    [failure] = evaluate(samples, cfg)
+    assert "RSS grew" in failure and "server.py:42" in failure
+
+
+def test_latency_drift_fd_leak_and_errors_fail():
+    """Test p99 drift beyond ratio and floor, fd growth and legitimate errors each fail"""
+    cfg = SoakConfig(warmup=1, max_p99_ratio=2, p99_floor_ms=20)
+    samples = _samples([50000] * 5, [999, 10, 12, 15, 60], fds=[99, 20, 25, 30, 60], errors=[0, 0, 0, 0, 50])
+    failures = evaluate(samples, cfg)
+    assert len(failures) == 3
+    assert any("p99" in f for f in failures)
+    assert any("fds" in f for f in failures)
+    assert any("legitimate requests failed" in f for f in failures)
+    # Below the floor, a doubling is noise.
+    assert evaluate(_samples([50000] * 4, [1, 1, 1, 5]), SoakConfig(warmup=0)) == []
+
+
+def test_too_few_samples_fail():
+    """Test a run too short to compare head and tail is not reported as a pass"""
+    assert evaluate(_samples([50000, 50000], [1, 1]), SoakConfig(warmup=1))
+
+
+def test_parse_alloc_report(tmp_path):
+    """Test the profiling alloc report is parsed into sites and sizes"""
+    with Profiler("alloc", out=str(tmp_path / "alloc.txt"), top=50) as prof:
+        keep = [bytearray(1 << 16) for _ in range(4)]
+        report = prof.report()
+    sites = parse_alloc_report(report)
+    assert sites and all(isinstance(v, float) for v in sites.values())
+    assert any("test_soak.py:" in site and kib >= 256 for site, kib in sites.items())
+    del keep
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads /proc")
+def test_short_soak_exercises_all_traffic(tmp_path):
+    """Test a brief soak against a real server process samples it and passes"""
+    cfg = SoakConfig(duration=3, interval=0.5, warmup=0.5, rate=50, connections=4, storm_size=8, storm_every=0.5,
+                     large_size=64 << 10, large_every=0.3, hostile_rate=30, p99_floor_ms=5000,
+                     max_rss_growth_mb=256, seed=1, workdir=str(tmp_path / "soak"))
+    report = run_soak(cfg)
+    assert report.passed, report.failures
+    assert len(report.samples) >= 4
+    last = report.samples[-1]
+    assert last.requests > 100 and last.errors == 0
+    assert set(last.hostile) == {"aborted", "mutated_hello", "random_bytes", "bad_frames"}
+    assert last.rss_kb > 0 and last.fds > 0
+    assert (tmp_path / "soak" / "alloc.txt").exists()
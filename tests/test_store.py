@@ -0,0 +1,69 @@
+import pytest
+import json
+import sys
+from unittest.mock import patch
+
+from qasccs.quantum_risk_engine.models import RiskRequest
+from qasccs.quantum_risk_engine.policy import EvaluationContext, evaluate_risk
+from qasccs.quantum_risk_engine.store import ResultStore
+from qasccs.quantum_risk_engine.cli import main
+
+
+def _fill(store):
+    ctx = EvaluationContext.create(reference_year=2026)
+    for i, alg in enumerate(["RSA-2048", "ECC-P256", "ECC-P384", "AES-256", "KYBER-768"] * 20):
+        req = RiskRequest(algorithm=alg, data_lifetime_years=20, data_classification="high", scenario="aggressive")
+        store.add(evaluate_risk(req, ctx), req, asset=f"/certs/{i}.crt", not_after=f"{2027 + i % 15}-06-01T00:00:00+00:00")
+
+
+def test_bulk_insert_and_indexed_query(tmp_path):
+    """Test batched inserts and the HIGH-ECC-expiring-before query"""
+    with ResultStore(tmp_path / "fleet.db", batch_size=7) as store:
+        _fill(store)
+        assert len(store) == 100
+        rows = list(store.query(risk="HIGH", algorithm="ECC", expires_before=2035))
+        assert rows and all(r["algorithm"].startswith("ECC") and r["not_after"] < "2035" for r in rows)
+        assert store.count(risk="HIGH", algorithm="ECC", expires_before=2035) == len(rows)
+        assert store.count(algorithm="AES-256") == 20
+        assert store.count(safe_until_before=2032) == store.count(risk="HIGH")
+        assert rows[0]["rationale"].startswith("Shor-vulnerable")
+        plan = store._db.execute("EXPLAIN QUERY PLAN SELECT COUNT(*) FROM assessments a WHERE a.risk = 'HIGH' "
+                                 "AND a.algorithm GLOB 'ECC*' AND a.not_after < '2035-01-01'").fetchall()
+        assert "USING" in str(plan) and "INDEX" in str(plan)
+
+
+def test_rationale_strings_interned_and_persisted(tmp_path):
+    """Test text table dedup and reopening the store"""
+    with ResultStore(tmp_path / "fleet.db") as store:
+        _fill(store)
+        texts = store._db.execute("SELECT COUNT(*) FROM texts").fetchone()[0]
+        assert texts < 10
+    with ResultStore(tmp_path / "fleet.db") as store:
+        _fill(store)
+        assert len(store) == 200
+        assert store._db.execute("SELECT COUNT(*) FROM texts").fetchone()[0] == texts
+
+
+def test_cli_import_and_query(tmp_path, capsys):
+    """Test risk CLI import/query subcommands and --db on a single evaluation"""
+    db = str(tmp_path / "fleet.db")
+    resp = {"risk": "HIGH", "recommended_mode": "hybrid", "quantum_safe_until_year": 2031, "rationale": "r"}
+    rows = [{"path": "/a.crt", "algorithm": "ECC-P256", "not_after": "2030-01-01T00:00:00+00:00", "assessment": resp},
+            {"path": "/b.key", "algorithm": None, "assessment": None},
+            {"path": "/c.crt", "algorithm": "RSA-2048", "not_after": "2040-01-01T00:00:00+00:00", "assessment": resp}]
+    src = tmp_path / "scan.jsonl"
+    src.write_text("\n".join(json.dumps(r) for r in rows))
+    with patch.object(sys, 'argv', ["prog", "import", str(src), "--db", db]):
+        main()
+    assert capsys.readouterr().out.strip() == "2"
+    with patch.object(sys, 'argv', ["prog", "query", "--db", db, "--risk", "HIGH", "--algorithm", "ECC",
+                                    "--expires-before", "2035"]):
+        main()
+    [row] = [json.loads(l) for l in capsys.readouterr().out.splitlines()]
+    assert row["asset"] == "/a.crt"
+    with patch.object(sys, 'argv', ["prog", "--algorithm", "AES-128", "--data-lifetime-years", "5", "--db", db]):
+        main()
+    capsys.readouterr()
+    with patch.object(sys, 'argv', ["prog", "query", "--db", db, "--count"]):
+        main()
+    assert capsys.readouterr().out.strip() == "3"
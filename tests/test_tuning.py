@@ -0,0 +1,44 @@
+import pytest
+import asyncio
+import socket
+
+from qasccs.secure_channel import tuning
+from qasccs.secure_channel.tuning import TransportTuning
+
+
+def test_uvloop_falls_back_to_asyncio_when_missing(monkeypatch):
+    """Test a uvloop request without uvloop installed runs (and reports) asyncio"""
+    monkeypatch.setattr(tuning, "uvloop_available", lambda: False)
+    t = TransportTuning(loop="uvloop")
+    assert t.loop_name == "asyncio"
+    assert t.describe()["loop"] == "asyncio"
+    assert t.run(asyncio.sleep(0, "done")) == "done"
+
+
+def test_listen_socket_options_are_reported():
+    """Test buffer sizes and SO_REUSEPORT on the listening socket, as the kernel applied them"""
+    t = TransportTuning(sndbuf=64 << 10, rcvbuf=128 << 10, reuseport=True)
+    with t.listen("127.0.0.1", 0, backlog=16) as sock:
+        d = t.describe(sock)
+        assert sock.getsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT) == 1
+    assert d["effective_sndbuf"] >= 64 << 10
+    assert d["effective_rcvbuf"] >= 128 << 10
+    assert d["reuseport"] is True
+
+
+def test_apply_sets_nodelay_and_write_buffer():
+    """Test transport tuning overrides asyncio's TCP_NODELAY default"""
+    async def run():
+        server = await asyncio.start_server(lambda r, w: None, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        _, writer = await asyncio.open_connection("127.0.0.1", port)
+        TransportTuning(nodelay=False, write_buffer=4096).apply(writer.transport)
+        sock = writer.transport.get_extra_info("socket")
+        result = sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY), writer.transport.get_write_buffer_limits()
+        writer.close()
+        server.close()
+        return result
+
+    nodelay, (low, high) = asyncio.run(run())
+    assert nodelay == 0
+    assert high == 4096
@@ -0,0 +1,109 @@
+import pytest
+import socket
+import ssl
+
+from qasccs.secure_channel import vhost
+from qasccs.secure_channel.certwatch import CertWatcher
+from qasccs.secure_channel.common import make_server_context
+from qasccs.secure_channel.server import BackgroundServer
+from qasccs.secure_channel.vhost import DirectoryTenants, VirtualHosts
+
+
+@pytest.fixture
+def tenants(temp_certs, tmp_path):
+    store = DirectoryTenants(tmp_path / "tenants")
+    for host in ("a.example", "b.example", "c.example"):
+        store.add(host, *vhost.issue(temp_certs, host))
+    return store
+
+
+def _client(certs, check_hostname=True):
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    ctx.load_verify_locations(cafile=str(certs / "ca.crt"))
+    ctx.check_hostname = check_hostname
+    return ctx
+
+
+def _peer_cn(port, client_ctx, hostname):
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        with client_ctx.wrap_socket(sock, server_hostname=hostname) as tls:
+            tls.sendall(b"hi")
+            assert tls.recv(1024) == b"ACK (secure): 2 bytes"
+            return dict(x[0] for x in tls.getpeercert()["subject"])["commonName"]
+
+
+def test_sni_selects_tenant_certificate(temp_certs, tenants):
+    """Test each SNI name is served its own tenant chain; other names get the default cert"""
+    front = make_server_context(temp_certs / "server.crt", temp_certs / "server.key")
+    hosts = VirtualHosts(tenants)
+    hosts.install(front)
+    with BackgroundServer(front) as srv:
+        client = _client(temp_certs)
+        assert _peer_cn(srv.port, client, "a.example") == "a.example"
+        assert _peer_cn(srv.port, client, "b.example") == "b.example"
+        assert _peer_cn(srv.port, client, "localhost") == "qasccs.local"
+    assert len(hosts) == 2
+
+
+def test_strict_refuses_unknown_names(temp_certs, tenants):
+    """Test strict mode aborts handshakes for names without a tenant"""
+    front = make_server_context(temp_certs / "server.crt", temp_certs / "server.key")
+    VirtualHosts(tenants, strict=True).install(front)
+    with BackgroundServer(front) as srv:
+        client = _client(temp_certs)
+        assert _peer_cn(srv.port, client, "c.example") == "c.example"
+        with pytest.raises((ssl.SSLError, OSError)):
+            _peer_cn(srv.port, client, "nobody.example")
+
+
+def test_strict_applies_in_front_of_a_cert_watcher(temp_certs, tenants):
+    """Test strict mode still refuses unknown names when the front context is a CertWatcher's"""
+    watcher = CertWatcher(temp_certs / "server.crt", temp_certs / "server.key")
+    VirtualHosts(tenants, strict=True).install(watcher.front)
+    with BackgroundServer(watcher.front) as srv:
+        client = _client(temp_certs)
+        assert _peer_cn(srv.port, client, "a.example") == "a.example"
+        with pytest.raises((ssl.SSLError, OSError)):
+            _peer_cn(srv.port, _client(temp_certs, check_hostname=False), "nobody.example")
+
+
+def test_unknown_name_flood_does_not_evict_tenants(tenants, enabled_metrics):
+    """Test negative entries live in their own bounded map and leave tenant contexts cached"""
+    hosts = VirtualHosts(tenants, max_size=2, negative_size=50)
+    a, b = hosts.get("a.example"), hosts.get("b.example")
+    for i in range(500):
+        assert hosts.get(f"random-{i}.example") is None
+    assert len(hosts) == 2 and len(hosts._unknown) == 50
+    assert hosts.get("a.example") is a and hosts.get("b.example") is b
+    assert vhost.EVICTIONS.value() == 0
+
+
+def test_cache_is_bounded_lru(tenants, enabled_metrics):
+    """Test the cache evicts the least recently used tenant and counts hits"""
+    hosts = VirtualHosts(tenants, max_size=2)
+    a = hosts.get("a.example")
+    hosts.get("b.example")
+    assert hosts.get("A.Example.") is a                   # hit refreshes a
+    hosts.get("c.example")                                # evicts b
+    assert len(hosts) == 2
+    assert hosts.get("a.example") is a
+    assert hosts.get("b.example") is not None             # reloaded
+    assert vhost.LOOKUPS.value(outcome="hit") == 2
+    assert vhost.LOOKUPS.value(outcome="miss") == 4
+    assert vhost.EVICTIONS.value() == 2
+    assert vhost.CACHED.value() == 2
+
+
+def test_unknown_and_invalid_names_are_not_loaded(tenants, enabled_metrics):
+    """Test negative caching, and that hostnames cannot escape the tenant directory"""
+    hosts = VirtualHosts(tenants, negative_ttl=60)
+    assert hosts.get("new.example") is None
+    tenants.add("new.example", *vhost.issue(tenants.root.parent / "certs", "new.example"))
+    assert hosts.get("new.example") is None               # still negatively cached
+    hosts.invalidate("new.example")
+    assert hosts.get("new.example") is not None
+    assert tenants.paths("../certs") is None
+    assert hosts.get("../certs") is None
+    assert len(hosts) == 1
+    with pytest.raises(ValueError):
+        tenants.add("a/../../b", b"", b"")